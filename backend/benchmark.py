@@ -0,0 +1,297 @@
+"""
+Benchmarks for the analytics hot paths, run offline on seeded synthetic OHLCV.
+
+Usage (from the repo root):
+    python -m backend.benchmark                    # run every case, compare with the saved baseline
+    python -m backend.benchmark --save             # run and record the results as the new baseline
+    python -m backend.benchmark --quick            # skip the 500-symbol cases
+    python -m backend.benchmark --only features,backtest_universe
+
+Each case reports the median and best wall time of --repeat runs, throughput
+in bars (symbols x trading days) per second, and peak traced memory from one
+extra tracemalloc run. When a baseline exists, the run exits with status 1 if
+any case's best time (the least noisy statistic) or peak memory exceeds the
+baseline's by more than --tolerance.
+Baselines are machine-specific: record one on the machine that compares against it.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+# Offline, reproducible data and throwaway state, set before the backend modules read their config
+_WORK_DIR = tempfile.mkdtemp(prefix="alphacross-bench-")
+os.environ.update({
+    "MARKET_DATA_PROVIDER": "synthetic",
+    "SYNTHETIC_SEED": "42",
+    "SYNTHETIC_END_DATE": "2025-06-30",
+    "OHLCV_STORE": "0",
+    "SCHEDULER_ENABLED": "0",
+    "SNAPSHOT_DIR": os.path.join(_WORK_DIR, "snapshots"),
+    "MODEL_REGISTRY_DIR": os.path.join(_WORK_DIR, "models"),
+    "JOB_DIR": os.path.join(_WORK_DIR, "jobs"),
+})
+
+import pandas as pd  # noqa: E402
+
+from backend.ml.backtest import run_advanced_backtest  # noqa: E402
+from backend.ml.data_fetch import fetch_many, fetch_stock_data  # noqa: E402
+from backend.ml.engine import StrategyEngine  # noqa: E402
+from backend.ml.features import calculate_features, calculate_panel_features, close_panel  # noqa: E402
+from backend.ml.model_xgb import train_and_predict  # noqa: E402
+from backend.ml.nse500_fetcher import fetch_nse500_symbols  # noqa: E402
+from backend.ml.parallel import COMPUTE_MODE  # noqa: E402
+
+BASE_DIR = Path(__file__).resolve().parent
+BASELINE_PATH = Path(os.getenv("BENCHMARK_BASELINE", BASE_DIR / "data" / "benchmarks" / "baseline.json"))
+
+SIGNAL_CONFIG = {"strategy_type": "double", "ma_type": "EMA", "short_period": 20, "long_period": 50}
+EXIT_CONFIG = {"stop_loss_pct": 5, "take_profit_pct": 15, "max_holding_days": 30}
+
+# Slowdowns smaller than this are treated as timer noise, whatever the ratio
+MIN_DELTA_SECONDS = 0.01
+MIN_DELTA_MB = 1.0
+
+
+@contextlib.contextmanager
+def _quiet():
+    """The pipeline logs with print (and pandas warns); keep both out of the report"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+def _symbols(n: int) -> list:
+    return [stock["Symbol"] for stock in fetch_nse500_symbols()[:n]]
+
+
+def _frames(n_symbols: int, period: str) -> dict:
+    return fetch_many(_symbols(n_symbols), period=period)
+
+
+def _bars(frames: dict) -> int:
+    return sum(len(df) for df in frames.values())
+
+
+# ---------- CASES ----------
+# Each setup runs once, untimed, and returns (run, bars): run() is the timed call
+
+def features_case(n_symbols: int, period: str):
+    frames = _frames(n_symbols, period)
+
+    def run():
+        for df in frames.values():
+            calculate_features(df)
+    return run, _bars(frames)
+
+
+def panel_features_case(n_symbols: int, period: str):
+    frames = _frames(n_symbols, period)
+    return (lambda: calculate_panel_features(close_panel(frames))), _bars(frames)
+
+
+def signals_case(n_symbols: int, period: str):
+    frames = _frames(n_symbols, period)
+
+    def run():
+        for df in frames.values():
+            StrategyEngine.generate_signals(df, SIGNAL_CONFIG)
+    return run, _bars(frames)
+
+
+def advanced_backtest_case(n_symbols: int, period: str):
+    frames = _frames(n_symbols, period)
+    signals = {symbol: StrategyEngine.generate_signals(df, SIGNAL_CONFIG) for symbol, df in frames.items()}
+
+    def run():
+        for symbol, df in signals.items():
+            run_advanced_backtest(df, symbol, EXIT_CONFIG)
+    return run, _bars(frames)
+
+
+def train_and_predict_case(n_symbols: int, period: str):
+    with _quiet():
+        featured = {symbol: calculate_features(fetch_stock_data(symbol, period)) for symbol in _symbols(n_symbols)}
+
+    def run():
+        for df in featured.values():
+            train_and_predict(df)
+    return run, _bars(featured)
+
+
+def _client():
+    from fastapi.testclient import TestClient
+    from backend.main import app
+    return TestClient(app)
+
+
+def screen_universe_case(n_symbols: int, period: str):
+    client = _client()
+    body = {"max_stocks": n_symbols, "with_model": False, "force_refresh": True}
+
+    def run():
+        response = client.post("/screen/universe", json=body)
+        response.raise_for_status()
+    return run, n_symbols * len(fetch_stock_data(_symbols(1)[0], period))
+
+
+def backtest_universe_case(n_symbols: int, period: str):
+    client = _client()
+    body = {"max_stocks": n_symbols, "period": period, "force_refresh": True}
+
+    def run():
+        response = client.post("/backtest/universe", json=body)
+        response.raise_for_status()
+        if response.json().get("status") == "error":
+            raise RuntimeError(response.json()["message"])
+    return run, n_symbols * len(fetch_stock_data(_symbols(1)[0], period))
+
+
+# (group, setup, symbols, period); the screen always covers the last 3 months
+CASES = [
+    ("features", features_case, 1, "1y"),
+    ("features", features_case, 1, "10y"),
+    ("features", features_case, 50, "10y"),
+    ("features_panel", panel_features_case, 500, "10y"),
+    ("signals", signals_case, 1, "1y"),
+    ("signals", signals_case, 1, "10y"),
+    ("signals", signals_case, 50, "10y"),
+    ("advanced_backtest", advanced_backtest_case, 1, "1y"),
+    ("advanced_backtest", advanced_backtest_case, 1, "10y"),
+    ("advanced_backtest", advanced_backtest_case, 50, "10y"),
+    ("train_and_predict", train_and_predict_case, 1, "1y"),
+    ("train_and_predict", train_and_predict_case, 1, "10y"),
+    ("screen_universe", screen_universe_case, 50, "3mo"),
+    ("screen_universe", screen_universe_case, 500, "3mo"),
+    ("backtest_universe", backtest_universe_case, 50, "1y"),
+    ("backtest_universe", backtest_universe_case, 500, "1y"),
+    ("backtest_universe", backtest_universe_case, 500, "10y"),
+]
+
+
+def run_case(setup, n_symbols: int, period: str, repeat: int, memory: bool) -> dict:
+    with _quiet():
+        run, bars = setup(n_symbols, period)
+        run()  # warm-up: imports, lazily built caches, first-call allocations
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+
+        peak_mb = None
+        if memory:
+            tracemalloc.start()
+            try:
+                run()
+                peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+            finally:
+                tracemalloc.stop()
+
+    seconds = statistics.median(timings)
+    return {
+        "seconds": round(seconds, 5),
+        "min_seconds": round(min(timings), 5),
+        "bars": bars,
+        "bars_per_second": round(bars / seconds) if seconds > 0 else None,
+        "peak_mb": round(peak_mb, 2) if peak_mb is not None else None,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regression messages for cases slower / heavier than baseline x (1 + tolerance)"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if base is None:
+            continue
+        seconds, base_seconds = result["min_seconds"], base["min_seconds"]
+        if seconds > base_seconds * (1 + tolerance) and seconds - base_seconds > MIN_DELTA_SECONDS:
+            regressions.append(
+                f"{name}: {seconds:.4f}s vs baseline {base_seconds:.4f}s "
+                f"(+{(seconds / base_seconds - 1) * 100:.0f}%)"
+            )
+        if result["peak_mb"] is not None and base.get("peak_mb") is not None:
+            mem_limit = base["peak_mb"] * (1 + tolerance)
+            if result["peak_mb"] > mem_limit and result["peak_mb"] - base["peak_mb"] > MIN_DELTA_MB:
+                regressions.append(f"{name}: peak {result['peak_mb']:.1f} MB vs baseline {base['peak_mb']:.1f} MB")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="AlphaCross hot-path benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--quick", action="store_true", help="skip the 500-symbol cases")
+    parser.add_argument("--only", default="", help="comma-separated case groups to run")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="baseline JSON path")
+    parser.add_argument("--save", action="store_true", help="write the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=float(os.getenv("BENCHMARK_TOLERANCE", "0.25")),
+                        help="allowed slowdown as a fraction of the baseline (default 0.25)")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    args = parser.parse_args(argv)
+
+    groups = {group for group in args.only.split(",") if group}
+    cases = [
+        case for case in CASES
+        if (not groups or case[0] in groups) and not (args.quick and case[2] >= 500)
+    ]
+
+    print(f"{'case':<36}{'median s':>10}{'min s':>10}{'Mbars/s':>10}{'peak MB':>10}")
+    results = {}
+    for group, setup, n_symbols, period in cases:
+        name = f"{group}/{n_symbols}x{period}"
+        result = run_case(setup, n_symbols, period, args.repeat, not args.no_memory)
+        results[name] = result
+        throughput = result["bars_per_second"] / 1e6 if result["bars_per_second"] else 0
+        peak = f"{result['peak_mb']:.1f}" if result["peak_mb"] is not None else "-"
+        print(f"{name:<36}{result['seconds']:>10.4f}{result['min_seconds']:>10.4f}{throughput:>10.3f}{peak:>10}")
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "compute_mode": COMPUTE_MODE,
+        "repeat": args.repeat,
+        "cases": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.save:
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {"cases": {}}
+        # Merge, so a partial (--only / --quick) run updates just the cases it ran
+        report["cases"] = {**baseline.get("cases", {}), **results}
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"\nBaseline saved to {baseline_path}")
+        return 0
+
+    if not baseline_path.exists():
+        print(f"\nNo baseline at {baseline_path}; run with --save to record one")
+        return 0
+
+    regressions = compare(results, json.loads(baseline_path.read_text()), args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%} of the baseline:")
+        for message in regressions:
+            print(f"   {message}")
+        return 1
+    print(f"\n✅ No regressions beyond {args.tolerance:.0%} of the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""
+pytest setup: offline, reproducible market data and throwaway state directories,
+set before any backend module reads its configuration.
+Run from the repo root: python -m pytest backend
+"""
+import os
+import tempfile
+
+_WORK_DIR = tempfile.mkdtemp(prefix="alphacross-tests-")
+os.environ.update({
+    "MARKET_DATA_PROVIDER": "synthetic",
+    "SYNTHETIC_SEED": "42",
+    "SYNTHETIC_END_DATE": "2025-06-30",
+    "SCHEDULER_ENABLED": "0",
+    "OHLCV_STORE_DIR": os.path.join(_WORK_DIR, "ohlcv"),
+    "SNAPSHOT_DIR": os.path.join(_WORK_DIR, "snapshots"),
+    "MODEL_REGISTRY_DIR": os.path.join(_WORK_DIR, "models"),
+    "JOB_DIR": os.path.join(_WORK_DIR, "jobs"),
+    "INDICATOR_STATE_PATH": os.path.join(_WORK_DIR, "indicator_state.json"),
+})
+
+# The end-to-end smoke script runs at import time; it is run directly, not collected
+collect_ignore = ["test_backend.py"]
@@ -1,18 +1,43 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from typing import Dict, Any, List
+from contextlib import asynccontextmanager
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import numpy as np
 import pandas as pd
 
 # ===== INTERNAL IMPORTS (REQUIRED) =====
-from backend.ml.data_fetch import fetch_stock_data
-from backend.ml.features import calculate_features
+from backend.ml.async_data import fetch_features_async, fetch_many_async, fetch_stock_data_async, run_compute
+from backend.ml import materialized, metrics, tracing
+from backend.ml.backtest import backtest_crossover
+from backend.ml.downsample import lttb_indices
+from backend.ml.encoding import encoded_response
+from backend.ml.jobs import get_job_manager, public_view, shutdown_job_manager
+from backend.ml.model_registry import predict_symbol
+from backend.ml.model_xgb import PREDICTION_LABELS
+from backend.ml.ohlcv_store import period_start, slice_period
+from backend.ml.walk_forward import walk_forward
 from backend.ml.nse500_fetcher import fetch_nse500_symbols, get_nse500_status
+from backend.ml.scheduler import start_scheduler, stop_scheduler
+from backend.ml.streaming import indicator_cache
+from backend.ml.universe_screen import screen_latest
 
 # =====================================
 
-app = FastAPI(title="AlphaCross API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Precompute end-of-day universe results at startup and after every NSE close
+    indicator_cache.load()
+    get_job_manager()
+    start_scheduler()
+    yield
+    stop_scheduler()
+    shutdown_job_manager()
+
+app = FastAPI(title="AlphaCross API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,6 +46,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Tracing runs inside the metrics middleware and reuses its endpoint label
+app.add_middleware(tracing.TracingMiddleware, endpoint_var=metrics.ENDPOINT)
+app.add_middleware(metrics.MetricsMiddleware, routes=app.router.routes)
 
 # Helper function to safely convert Series to float
 def safe_float(value):
@@ -29,6 +57,124 @@ def safe_float(value):
         return float(value.iloc[0])
     return float(value)
 
+# ---------- RESPONSE BUILDERS ----------
+# Shared by the per-section endpoints and /snapshot; all take calculate_features output
+
+def build_stock_data(symbol: str, df: pd.DataFrame):
+    latest = df.iloc[-1]
+    return {
+        "symbol": symbol,
+        "close": round(safe_float(latest["Close"]), 2),
+        "ema20": round(safe_float(latest["EMA_20"]), 2),
+        "ema50": round(safe_float(latest["EMA_50"]), 2),
+        "rsi": round(safe_float(latest["RSI"]), 2),
+        "date": str(latest.name.date())
+    }
+
+CHART_FORMATS = ["rows", "columns"]
+
+def _chart_column(df: pd.DataFrame, name: str) -> np.ndarray:
+    column = df[name]
+    if isinstance(column, pd.DataFrame):
+        column = column.iloc[:, 0]
+    return column.to_numpy(dtype=float)
+
+def build_chart_columns(df: pd.DataFrame, max_points: int = None):
+    """
+    Chart series as parallel arrays built straight from the NumPy columns.
+    `max_points` downsamples with LTTB on the close price.
+    """
+    close = _chart_column(df, "Close")
+    keep = lttb_indices(close, max_points) if max_points else slice(None)
+    return {
+        "date": df.index[keep].strftime("%Y-%m-%d").tolist(),
+        "close": [round(v, 2) for v in close[keep].tolist()],
+        "ema_20": [round(v, 2) for v in _chart_column(df, "EMA_20")[keep].tolist()],
+        "ema_50": [round(v, 2) for v in _chart_column(df, "EMA_50")[keep].tolist()],
+        "rsi": [round(v, 2) for v in _chart_column(df, "RSI")[keep].tolist()],
+        "volume": _chart_column(df, "Volume")[keep].astype(np.int64).tolist()
+    }
+
+def build_chart_data(df: pd.DataFrame, max_points: int = None, format: str = "rows"):
+    """Chart series: one object per bar ("rows"), or parallel arrays ("columns")"""
+    columns = build_chart_columns(df, max_points)
+    if format == "columns":
+        return columns
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*columns.values())]
+
+def build_prediction(symbol: str, df: pd.DataFrame):
+    latest = df.iloc[-1]
+    
+    # Simple prediction based on EMA crossover
+    ema_20 = safe_float(latest["EMA_20"])
+    ema_50 = safe_float(latest["EMA_50"])
+    ema_20_slope = safe_float(latest["EMA_20_slope"])
+    
+    if ema_20 > ema_50 and ema_20_slope > 0:
+        prediction = "BULLISH"
+        confidence = min(0.85, 0.6 + abs(ema_20_slope) * 10)
+    elif ema_20 < ema_50 and ema_20_slope < 0:
+        prediction = "BEARISH"
+        confidence = min(0.85, 0.6 + abs(ema_20_slope) * 10)
+    else:
+        prediction = "NEUTRAL"
+        confidence = 0.5
+    
+    return {
+        "symbol": symbol,
+        "prediction": prediction,
+        "confidence": round(confidence, 2),
+        "ema_20": round(ema_20, 2),
+        "ema_50": round(ema_50, 2),
+        "rsi": round(safe_float(latest["RSI"]), 2)
+    }
+
+def build_model_prediction(symbol: str, df: pd.DataFrame):
+    """XGBoost prediction served from the model registry (trains only when stale)"""
+    prediction, confidence, meta, cached = predict_symbol(symbol, df)
+    latest = df.iloc[-1]
+    
+    return {
+        "symbol": symbol,
+        "prediction": PREDICTION_LABELS[prediction],
+        "confidence": round(confidence, 2),
+        "ema_20": round(safe_float(latest["EMA_20"]), 2),
+        "ema_50": round(safe_float(latest["EMA_50"]), 2),
+        "rsi": round(safe_float(latest["RSI"]), 2),
+        "model": {
+            "name": "xgb",
+            "kind": meta["kind"],
+            "version": meta["version"],
+            "window_start": meta["window_start"],
+            "window_end": meta["window_end"],
+            "trained_at": datetime.fromtimestamp(meta["trained_at"]).isoformat(),
+            "cached": cached
+        }
+    }
+
+def build_summary(symbol: str, df: pd.DataFrame):
+    latest = df.iloc[-1]
+    
+    ema_20 = safe_float(latest["EMA_20"])
+    ema_50 = safe_float(latest["EMA_50"])
+    rsi = safe_float(latest["RSI"])
+    
+    trend = "upward" if ema_20 > ema_50 else "downward"
+    rsi_status = "overbought" if rsi > 70 else "oversold" if rsi < 30 else "neutral"
+    
+    summary = f"{symbol} is currently in a {trend} trend with RSI indicating {rsi_status} conditions. "
+    summary += f"The 20-day EMA is {'above' if ema_20 > ema_50 else 'below'} the 50-day EMA."
+    
+    return {
+        "symbol": symbol,
+        "summary": summary,
+        "trend": trend,
+        "rsi_status": rsi_status
+    }
+
+MIN_BACKTEST_ROWS = 100
+
 # ---------- BASIC HEALTH ----------
 @app.get("/")
 def root():
@@ -38,32 +184,65 @@ def root():
 def ping():
     return {"pong": True}
 
+@app.get("/metrics")
+def prometheus_metrics():
+    """Request, per-stage latency, cache, upstream error and in-flight metrics in Prometheus text format"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# ---------- DEBUG TRACES ----------
+def _require_debug_token(request: Request):
+    if tracing.DEBUG_TOKEN is None:
+        raise HTTPException(status_code=403, detail="Debug endpoints are disabled; set DEBUG_TOKEN to enable them")
+    if not tracing.authorized(request.headers):
+        raise HTTPException(status_code=403, detail="Missing or invalid X-Debug-Token")
+
+def _debug_trace(request: Request, trace_id: str):
+    _require_debug_token(request)
+    trace = tracing.get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Trace '{trace_id}' not found (it may have left the ring buffer)")
+    return trace
+
+@app.get("/debug/traces")
+def list_traces(request: Request, endpoint: str = None, min_duration_ms: float = None, limit: int = 50):
+    """Recent traced requests, newest first"""
+    _require_debug_token(request)
+    return {
+        "sample_rate": tracing.TRACE_SAMPLE_RATE,
+        "buffer_size": tracing.TRACE_BUFFER_SIZE,
+        "traces": tracing.list_traces(endpoint, min_duration_ms, limit),
+    }
+
+@app.get("/debug/traces/{trace_id}")
+def trace_detail(request: Request, trace_id: str):
+    """Spans (and the profile, if one was taken) of one traced request"""
+    return _debug_trace(request, trace_id).to_dict()
+
+@app.get("/debug/traces/{trace_id}/profile")
+def trace_profile(request: Request, trace_id: str):
+    """Collapsed stacks of a profiled request, for flamegraph.pl / speedscope"""
+    trace = _debug_trace(request, trace_id)
+    if trace.profile is None:
+        raise HTTPException(status_code=404, detail=f"Trace '{trace_id}' was not profiled; send ?profile=1 or X-Profile: 1")
+    return PlainTextResponse(trace.profile["collapsed"])
+
 # ---------- DATA ----------
 @app.get("/data/{symbol}")
-def get_stock_data(symbol: str):
+async def get_stock_data(symbol: str):
     """Get current stock data with technical indicators"""
     try:
-        df = fetch_stock_data(symbol)
+        df, features = await fetch_features_async(symbol)
 
         if df.empty:
             raise HTTPException(status_code=404, detail=f"No data found for {symbol}")
 
-        # Calculate features to get EMAs and RSI
-        df = calculate_features(df)
+        # Features (EMAs and RSI) are shared with concurrent requests for the same symbol
+        df = features
         
         if df.empty:
             raise HTTPException(status_code=404, detail=f"Insufficient data to calculate indicators for {symbol}")
             
-        latest = df.iloc[-1]
-        
-        return {
-            "symbol": symbol,
-            "close": round(safe_float(latest["Close"]), 2),
-            "ema20": round(safe_float(latest["EMA_20"]), 2),
-            "ema50": round(safe_float(latest["EMA_50"]), 2),
-            "rsi": round(safe_float(latest["RSI"]), 2),
-            "date": str(latest.name.date())
-        }
+        return build_stock_data(symbol, df)
     except HTTPException:
         raise
     except Exception as e:
@@ -73,69 +252,59 @@ def get_stock_data(symbol: str):
 
 
 # ---------- CHART DATA ----------
+def validate_chart_options(max_points: int, format: str, period: str = None):
+    if period is not None:
+        try:
+            period_start(period)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Unsupported period '{period}'. Use e.g. 5d, 1mo, 6mo, 1y, 5y, ytd or max")
+    if format not in CHART_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported chart format '{format}'. Use one of: {', '.join(CHART_FORMATS)}")
+    if max_points is not None and max_points < 3:
+        raise HTTPException(status_code=400, detail="max_points must be at least 3")
+
+def chart_table(payload: dict):
+    return payload["data"], None
+
 @app.get("/chart/{symbol}")
-def get_chart_data(symbol: str):
-    """Return historical price data for charting"""
-    df = fetch_stock_data(symbol, period="6mo")
+async def get_chart_data(request: Request, symbol: str, period: str = "6mo", max_points: int = None, format: str = "rows"):
+    """
+    Return historical price data for charting. format=columns returns parallel
+    arrays; max_points downsamples long histories with LTTB.
+    JSON / MessagePack / Arrow by Accept header.
+    """
+    validate_chart_options(max_points, format, period)
+    df, features = await fetch_features_async(symbol, period=period)
     
     if df.empty:
         raise HTTPException(status_code=404, detail="No data found")
     
-    df = calculate_features(df)
+    df = features
     
-    chart_data = []
-    for idx, row in df.iterrows():
-        chart_data.append({
-            "date": str(idx.date()),
-            "close": round(safe_float(row["Close"]), 2),
-            "ema_20": round(safe_float(row["EMA_20"]), 2),
-            "ema_50": round(safe_float(row["EMA_50"]), 2),
-            "rsi": round(safe_float(row["RSI"]), 2),
-            "volume": int(safe_float(row["Volume"]))
-        })
-    
-    return {"data": chart_data}
+    payload = {"data": await run_compute(build_chart_data, df, max_points, format)}
+    return await run_compute(encoded_response, request, payload, chart_table)
 
 # ---------- PREDICTION ----------
 @app.get("/predict/{symbol}")
-def get_prediction(symbol: str):
-    """Get ML prediction for stock"""
+async def get_prediction(symbol: str, model: str = "rule"):
+    """Get ML prediction for stock (model=rule for the EMA rule, model=xgb for the cached XGBoost model)"""
+    if model not in ("rule", "xgb"):
+        raise HTTPException(status_code=400, detail=f"Unknown model: {model}. Choose from rule, xgb")
+    
     try:
-        df = fetch_stock_data(symbol)
+        df, features = await fetch_features_async(symbol)
         
         if df.empty:
             raise HTTPException(status_code=404, detail=f"No data found for {symbol}")
         
-        df = calculate_features(df)
+        df = features
         
         if df.empty:
             raise HTTPException(status_code=404, detail=f"Insufficient data for {symbol}")
-            
-        latest = df.iloc[-1]
         
-        # Simple prediction based on EMA crossover
-        ema_20 = safe_float(latest["EMA_20"])
-        ema_50 = safe_float(latest["EMA_50"])
-        ema_20_slope = safe_float(latest["EMA_20_slope"])
-        
-        if ema_20 > ema_50 and ema_20_slope > 0:
-            prediction = "BULLISH"
-            confidence = min(0.85, 0.6 + abs(ema_20_slope) * 10)
-        elif ema_20 < ema_50 and ema_20_slope < 0:
-            prediction = "BEARISH"
-            confidence = min(0.85, 0.6 + abs(ema_20_slope) * 10)
-        else:
-            prediction = "NEUTRAL"
-            confidence = 0.5
-        
-        return {
-            "symbol": symbol,
-            "prediction": prediction,
-            "confidence": round(confidence, 2),
-            "ema_20": round(ema_20, 2),
-            "ema_50": round(ema_50, 2),
-            "rsi": round(safe_float(latest["RSI"]), 2)
-        }
+        if model == "xgb":
+            return await run_compute(build_model_prediction, symbol, df)
+        return build_prediction(symbol, df)
     except HTTPException:
         raise
     except Exception as e:
@@ -145,141 +314,21 @@ def get_prediction(symbol: str):
 
 # ---------- BACKTEST ----------
 @app.get("/backtest/{symbol}")
-def get_backtest(symbol: str):
+async def get_backtest(symbol: str):
     """Run comprehensive backtest on stock"""
     try:
-        df = fetch_stock_data(symbol, period="1y")
+        df, features = await fetch_features_async(symbol, period="1y")
         
         if df.empty:
             raise HTTPException(status_code=404, detail=f"No data found for {symbol}")
         
-        df = calculate_features(df)
+        df = features
         
-        if df.empty or len(df) < 100:
+        if df.empty or len(df) < MIN_BACKTEST_ROWS:
             raise HTTPException(status_code=404, detail=f"Insufficient data for backtesting {symbol}")
         
-        # Initialize tracking variables
-        initial_capital = 100000
-        capital = initial_capital
-        position = 0
-        entry_price = 0
-        trades = []
-        
-        # Simple strategy: Buy when EMA_20 crosses above EMA_50
-        for i in range(1, len(df)):
-            prev = df.iloc[i-1]
-            curr = df.iloc[i]
-            
-            # Entry signal: EMA 20 crosses above EMA 50
-            if prev["EMA_20"] <= prev["EMA_50"] and curr["EMA_20"] > curr["EMA_50"] and position == 0:
-                # Buy
-                shares = capital // safe_float(curr["Close"])
-                if shares > 0:
-                    position = shares
-                    entry_price = safe_float(curr["Close"])
-                    capital -= shares * entry_price
-                    
-            # Exit signal: EMA 20 crosses below EMA 50
-            elif prev["EMA_20"] >= prev["EMA_50"] and curr["EMA_20"] < curr["EMA_50"] and position > 0:
-                # Sell
-                exit_price = safe_float(curr["Close"])
-                capital += position * exit_price
-                profit = (exit_price - entry_price) * position
-                profit_pct = ((exit_price - entry_price) / entry_price) * 100
-                
-                trades.append({
-                    "stock": symbol,
-                    "entry_date": str(df.index[i-1].date()),
-                    "exit_date": str(curr.name.date()),
-                    "entry_price": round(entry_price, 2),
-                    "exit_price": round(exit_price, 2),
-                    "profit": round(profit, 2),
-                    "profit_pct": round(profit_pct, 2)
-                })
-                
-                position = 0
-                entry_price = 0
-        
-        # Close any open position at the end
-        if position > 0:
-            exit_price = safe_float(df.iloc[-1]["Close"])
-            capital += position * exit_price
-            profit = (exit_price - entry_price) * position
-            profit_pct = ((exit_price - entry_price) / entry_price) * 100
-            
-            trades.append({
-                "stock": symbol,
-                "entry_date": str(df.index[-2].date()),
-                "exit_date": str(df.index[-1].date()),
-                "entry_price": round(entry_price, 2),
-                "exit_price": round(exit_price, 2),
-                "profit": round(profit, 2),
-                "profit_pct": round(profit_pct, 2)
-            })
-        
-        # Calculate summary statistics
-        final_amount = capital
-        total_pnl = final_amount - initial_capital
-        pnl_pct = (total_pnl / initial_capital) * 100
-        
-        if not trades:
-            # No trades executed
-            return {
-                "trade_logs": [],
-                "summary": {
-                    "number_of_trades": 0,
-                    "invested_amount": initial_capital,
-                    "final_amount": initial_capital,
-                    "win_rate_pct": 0,
-                    "risk_reward_ratio": 0,
-                    "avg_profit_pct": 0,
-                    "max_loss_pct": 0,
-                    "max_win_pct": 0,
-                    "profit_factor": 0,
-                    "pnl_pct": 0,
-                    "avg_loss_pct": 0,
-                    "max_drawdown_pct": 0
-                }
-            }
-        
-        winning_trades = [t for t in trades if t["profit"] > 0]
-        losing_trades = [t for t in trades if t["profit"] < 0]
-        
-        win_rate = (len(winning_trades) / len(trades) * 100) if trades else 0
-        avg_profit_pct = sum(t["profit_pct"] for t in trades) / len(trades) if trades else 0
-        
-        max_win = max([t["profit_pct"] for t in trades]) if trades else 0
-        max_loss = min([t["profit_pct"] for t in trades]) if trades else 0
-        
-        avg_win_pct = sum(t["profit_pct"] for t in winning_trades) / len(winning_trades) if winning_trades else 0
-        avg_loss_pct = sum(t["profit_pct"] for t in losing_trades) / len(losing_trades) if losing_trades else 0
-        
-        total_wins = sum(t["profit"] for t in winning_trades)
-        total_losses = abs(sum(t["profit"] for t in losing_trades))
-        profit_factor = total_wins / total_losses if total_losses > 0 else 0
-        
-        risk_reward = abs(avg_win_pct / avg_loss_pct) if avg_loss_pct != 0 else 0
-        
-        # Calculate max drawdown (simplified)
-        max_drawdown_pct = abs(max_loss) if trades else 0
-        
-        return {
-            "trade_logs": trades,
-            "summary": {
-                "number_of_trades": len(trades),
-                "invested_amount": initial_capital,
-                "final_amount": round(final_amount, 2),
-                "win_rate_pct": round(win_rate, 2),
-                "risk_reward_ratio": round(risk_reward, 2),
-                "avg_profit_pct": round(avg_profit_pct, 2),
-                "max_loss_pct": round(max_loss, 2),
-                "max_win_pct": round(max_win, 2),
-                "profit_factor": round(profit_factor, 2),
-                "pnl_pct": round(pnl_pct, 2),
-                "avg_loss_pct": round(avg_loss_pct, 2),
-                "max_drawdown_pct": round(max_drawdown_pct, 2)
-            }
-        }
+        # Vectorized EMA 20/50 crossover backtest
+        return await run_compute(backtest_crossover, df, symbol, initial_capital=100000)
     except HTTPException:
         raise
     except Exception as e:
@@ -288,6 +337,62 @@ def get_backtest(symbol: str):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error backtesting {symbol}: {str(e)}")
 
+# ---------- SNAPSHOT ----------
+SNAPSHOT_SECTIONS = ["data", "prediction", "chart", "summary", "backtest"]
+
+def build_snapshot(symbol: str, raw: pd.DataFrame, df: pd.DataFrame, sections: List[str],
+                   chart_max_points: int = None, chart_format: str = "rows"):
+    """All requested dashboard sections from one 1y fetch and one feature pass"""
+    snapshot = {"symbol": symbol}
+    if "data" in sections:
+        snapshot["data"] = build_stock_data(symbol, df)
+    if "prediction" in sections:
+        snapshot["prediction"] = build_prediction(symbol, df)
+    if "chart" in sections:
+        # Same 6mo window as /chart, sliced from the 1y features
+        snapshot["chart"] = build_chart_data(
+            slice_period(df, "6mo", as_of=raw.index[-1]), chart_max_points, chart_format
+        )
+    if "summary" in sections:
+        snapshot["summary"] = build_summary(symbol, df)
+    if "backtest" in sections:
+        snapshot["backtest"] = (
+            backtest_crossover(df, symbol, initial_capital=100000)
+            if len(df) >= MIN_BACKTEST_ROWS else None
+        )
+    return snapshot
+
+@app.get("/snapshot/{symbol}")
+async def get_snapshot(symbol: str, include: str = None, chart_max_points: int = None, chart_format: str = "rows"):
+    """
+    Dashboard payload for one stock: latest indicators, prediction, chart series,
+    summary and backtest in one response. `include` selects sections, e.g. include=data,chart.
+    chart_format / chart_max_points shape the chart section as on /chart.
+    """
+    validate_chart_options(chart_max_points, chart_format)
+    sections = [p.strip() for p in include.split(",") if p.strip()] if include else SNAPSHOT_SECTIONS
+    unknown = [p for p in sections if p not in SNAPSHOT_SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown snapshot section(s): {', '.join(unknown)}. Choose from {', '.join(SNAPSHOT_SECTIONS)}"
+        )
+
+    try:
+        raw, df = await fetch_features_async(symbol, period="1y")
+
+        if raw.empty:
+            raise HTTPException(status_code=404, detail=f"No data found for {symbol}")
+        if df.empty:
+            raise HTTPException(status_code=404, detail=f"Insufficient data to calculate indicators for {symbol}")
+
+        return await run_compute(build_snapshot, symbol, raw, df, sections, chart_max_points, chart_format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in get_snapshot for {symbol}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error building snapshot for {symbol}: {str(e)}")
+
 # ---------- STOCKS LIST ----------
 @app.get("/stocks")
 def get_stocks():
@@ -311,32 +416,15 @@ def search_stocks(q: str):
 
 # ---------- SUMMARY ----------
 @app.get("/summary/{symbol}")
-def get_summary(symbol: str):
+async def get_summary(symbol: str):
     """Get AI-generated summary for stock"""
-    df = fetch_stock_data(symbol)
+    df, features = await fetch_features_async(symbol)
     
     if df.empty:
         raise HTTPException(status_code=404, detail="No data found")
     
-    df = calculate_features(df)
-    latest = df.iloc[-1]
-    
-    ema_20 = safe_float(latest["EMA_20"])
-    ema_50 = safe_float(latest["EMA_50"])
-    rsi = safe_float(latest["RSI"])
-    
-    trend = "upward" if ema_20 > ema_50 else "downward"
-    rsi_status = "overbought" if rsi > 70 else "oversold" if rsi < 30 else "neutral"
-    
-    summary = f"{symbol} is currently in a {trend} trend with RSI indicating {rsi_status} conditions. "
-    summary += f"The 20-day EMA is {'above' if ema_20 > ema_50 else 'below'} the 50-day EMA."
-    
-    return {
-        "symbol": symbol,
-        "summary": summary,
-        "trend": trend,
-        "rsi_status": rsi_status
-    }
+    df = features
+    return build_summary(symbol, df)
 
 # ---------- SENTIMENT ----------
 @app.get("/sentiment/{symbol}")
@@ -352,7 +440,7 @@ def get_sentiment(symbol: str):
 
 # ---------- TOP MOVERS ----------
 @app.get("/top-movers")
-def get_top_movers():
+async def get_top_movers():
     """Get top gaining and losing stocks from a curated list"""
     try:
         # Use a curated list of liquid stocks for faster processing
@@ -381,9 +469,9 @@ def get_top_movers():
         
         movers = []
         
-        def get_change(stock):
+        async def get_change(stock):
             try:
-                df = fetch_stock_data(stock["Symbol"], period="5d")
+                df = await fetch_stock_data_async(stock["Symbol"], period="5d")
                 if df.empty or len(df) < 2:
                     return None
                     
@@ -402,9 +490,8 @@ def get_top_movers():
                 print(f"Error getting change for {stock['Symbol']}: {str(e)}")
                 return None
         
-        # Process stocks with threading
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            results = list(executor.map(get_change, popular_stocks))
+        # Fetch concurrently; the data layer caps in-flight upstream calls
+        results = await asyncio.gather(*(get_change(stock) for stock in popular_stocks))
         
         # Filter out None results
         movers = [r for r in results if r is not None]
@@ -461,273 +548,132 @@ def nse500_status():
     return get_nse500_status()
 
 @app.get("/nse500/list")
-def nse500_list():
-    return {"stocks": fetch_nse500_symbols()}
+def nse500_list(request: Request):
+    return encoded_response(request, {"stocks": fetch_nse500_symbols()}, lambda payload: (payload["stocks"], None))
 
 # ---------- UNIVERSE SCREEN ----------
-@app.post("/screen/universe")
-def screen_universe(config: Dict[str, Any]):
-    """Screen the entire NSE 500 universe"""
-    stocks = fetch_nse500_symbols()
-    limit = config.get("max_stocks", 500)  # Default to full NSE 500
-    stocks = stocks[:limit]
-    
-    print(f"Screening {len(stocks)} stocks...")  # Debug log
-
-    results = {
-        "bullish": [],
-        "bearish": [],
-        "neutral": []
-    }
-
-    def process(stock):
-        try:
-            symbol = stock["Symbol"]
-            print(f"Processing {symbol}...")  # Debug log
-            df = fetch_stock_data(symbol, period="3mo")  # Use shorter period for speed
+SCREEN_BUCKETS = ["bullish", "bearish", "neutral"]
 
-            if df.empty or len(df) < 60:  # Need at least 60 days for EMA 50
-                return None
-
-            df = calculate_features(df)
-            latest = df.iloc[-1]
-            
-            ema_20 = safe_float(latest["EMA_20"])
-            ema_50 = safe_float(latest["EMA_50"])
+def screen_table(payload: dict):
+    """One row per screened stock with its bucket; counts / timestamp / model as metadata"""
+    rows = [{"bucket": bucket, **item} for bucket in SCREEN_BUCKETS for item in payload[bucket]]
+    return rows, {key: value for key, value in payload.items() if key not in SCREEN_BUCKETS}
 
-            if ema_20 > ema_50:
-                signal = "bullish"
-            elif ema_20 < ema_50:
-                signal = "bearish"
-            else:
-                signal = "neutral"
-
-            return {
-                "symbol": symbol,
-                "sector": stock.get("Industry", "Unknown"),
-                "signal": signal,
-                "ema_20": round(ema_20, 2),
-                "ema_50": round(ema_50, 2),
-                "close": round(safe_float(latest["Close"]), 2)
-            }
-        except Exception as e:
-            print(f"Error processing {stock['Symbol']}: {str(e)}")  # Debug log
-            return None
-
-    # Process stocks with threading
-    with ThreadPoolExecutor(max_workers=20) as executor:  # Increased workers
-        processed = list(executor.map(process, stocks))
-
-    # Filter out None results and categorize
-    for item in processed:
-        if item:
-            results[item["signal"]].append({
-                "symbol": item["symbol"],
-                "sector": item["sector"],
-                "ema_20": item["ema_20"],
-                "ema_50": item["ema_50"],
-                "close": item["close"]
-            })
-
-    print(f"Screening complete: {len(results['bullish'])} bullish, {len(results['bearish'])} bearish, {len(results['neutral'])} neutral")
-
-    return {
-        "bullish": results["bullish"],
-        "bearish": results["bearish"],
-        "neutral": results["neutral"],
-        "counts": {
-            "bullish": len(results["bullish"]),
-            "bearish": len(results["bearish"]),
-            "neutral": len(results["neutral"])
-        },
-        "timestamp": datetime.now().isoformat()
-    }
+@app.post("/screen/universe")
+async def screen_universe(request: Request, config: Dict[str, Any]):
+    """Screen the entire NSE 500 universe (served from the end-of-day snapshot unless force_refresh)"""
+    limit = config.get("max_stocks", 500)  # Default to full NSE 500
+    options = {"max_stocks": limit, "with_model": config.get("with_model"), "force_refresh": config.get("force_refresh", False)}
+    # Download on the io pool (under FETCH_CONCURRENCY), so compute threads never wait on the network
+    fetch = await run_compute(materialized.screen_fetch, **options)
+    frames = await fetch_many_async(*fetch) if fetch else None
+    result = await run_compute(materialized.screen, frames=frames, **options)
+    return await run_compute(encoded_response, request, result, screen_table)
+
+@app.get("/screen/universe/latest")
+async def screen_universe_latest(request: Request, max_stocks: int = 500):
+    """Screen from the streaming indicator state (last full screen plus store appends since)"""
+    result = await run_compute(screen_latest, max_stocks=max_stocks)
+    return await run_compute(encoded_response, request, result, screen_table)
+
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def encode_stream_event(event: dict, format: str) -> str:
+    with metrics.stage("serialize"):
+        if format == "sse":
+            return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        return json.dumps(event) + "\n"
+
+@app.get("/screen/universe/stream")
+def stream_screen_universe(max_stocks: int = 500, with_model: bool = None, force_refresh: bool = False,
+                           format: str = "ndjson"):
+    """
+    Stream universe screen results as they are classified, one event per line
+    (NDJSON) or per Server-Sent Event (format=sse): start, result..., summary
+    """
+    if format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}'. Use one of: {', '.join(STREAM_FORMATS)}")
+
+    events = materialized.stream_screen(max_stocks=max_stocks, with_model=with_model, force_refresh=force_refresh)
+    return StreamingResponse(
+        (encode_stream_event(event, format) for event in events),
+        media_type=STREAM_FORMATS[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # ---------- UNIVERSE BACKTEST ----------
+def backtest_table(payload: dict):
+    """Trade details as rows; the portfolio metrics as metadata"""
+    return payload.get("trade_details", []), {key: value for key, value in payload.items() if key != "trade_details"}
+
 @app.post("/backtest/universe")
-def backtest_universe(config: Dict[str, Any]):
+async def backtest_universe(request: Request, config: Dict[str, Any]):
     """Run backtest across multiple stocks in the universe"""
     try:
-        stocks = fetch_nse500_symbols()
-        max_stocks = config.get("max_stocks", 100)
-        initial_capital = config.get("initial_capital", 100000)
-        position_size = config.get("position_size", 0.1)  # 10% per position
-        stop_loss = config.get("stop_loss", 0.05)  # 5% stop loss
-        take_profit = config.get("take_profit", 0.15)  # 15% take profit
-        
-        # Limit stocks to test
-        stocks = stocks[:max_stocks]
-        print(f"Starting universe backtest on {len(stocks)} stocks...")
-        
-        all_trades = []
-        total_capital = initial_capital
-        active_positions = {}
-        
-        def backtest_single_stock(stock):
-            """Backtest a single stock"""
-            try:
-                symbol = stock["Symbol"]
-                df = fetch_stock_data(symbol, period="6mo")  # Use 6 months for faster processing
-                
-                if df.empty or len(df) < 60:
-                    return None
-                
-                df = calculate_features(df)
-                
-                if df.empty:
-                    return None
-                
-                trades = []
-                position = None
-                
-                for i in range(1, len(df)):
-                    prev = df.iloc[i-1]
-                    curr = df.iloc[i]
-                    
-                    # Entry: EMA 20 crosses above EMA 50
-                    if prev["EMA_20"] <= prev["EMA_50"] and curr["EMA_20"] > curr["EMA_50"] and position is None:
-                        entry_price = safe_float(curr["Close"])
-                        position = {
-                            "entry_date": curr.name,
-                            "entry_price": entry_price,
-                            "symbol": symbol
-                        }
-                    
-                    # Exit conditions
-                    elif position is not None:
-                        current_price = safe_float(curr["Close"])
-                        entry_price = position["entry_price"]
-                        pnl_pct = ((current_price - entry_price) / entry_price)
-                        
-                        # Exit on: crossover, stop loss, or take profit
-                        exit_signal = (
-                            (prev["EMA_20"] >= prev["EMA_50"] and curr["EMA_20"] < curr["EMA_50"]) or  # Crossover
-                            (pnl_pct <= -stop_loss) or  # Stop loss
-                            (pnl_pct >= take_profit)  # Take profit
-                        )
-                        
-                        if exit_signal:
-                            exit_price = current_price
-                            profit_pct = ((exit_price - entry_price) / entry_price) * 100
-                            
-                            trades.append({
-                                "symbol": symbol,
-                                "entry_date": str(position["entry_date"].date()),
-                                "exit_date": str(curr.name.date()),
-                                "entry_price": round(entry_price, 2),
-                                "exit_price": round(exit_price, 2),
-                                "profit_pct": round(profit_pct, 2),
-                                "sector": stock.get("Industry", "Unknown")
-                            })
-                            
-                            position = None
-                
-                return {
-                    "symbol": symbol,
-                    "trades": trades,
-                    "sector": stock.get("Industry", "Unknown")
-                }
-                
-            except Exception as e:
-                print(f"Error backtesting {stock['Symbol']}: {str(e)}")
-                return None
-        
-        # Run backtests in parallel
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            results = list(executor.map(backtest_single_stock, stocks))
-        
-        # Collect all trades
-        for result in results:
-            if result and result["trades"]:
-                all_trades.extend(result["trades"])
-        
-        # Calculate portfolio metrics
-        if not all_trades:
-            return {
-                "status": "completed",
-                "message": "No trades generated. Try different parameters or more stocks.",
-                "total_trades": 0,
-                "win_rate": 0,
-                "total_return": 0,
-                "final_capital": initial_capital,
-                "stocks_tested": len(stocks),
-                "trade_details": []
-            }
-        
-        # Calculate returns
-        winning_trades = [t for t in all_trades if t["profit_pct"] > 0]
-        losing_trades = [t for t in all_trades if t["profit_pct"] < 0]
-        
-        win_rate = (len(winning_trades) / len(all_trades) * 100) if all_trades else 0
-        
-        # Simulate portfolio returns
-        # Each trade uses position_size of capital
-        total_pnl = 0
-        for trade in all_trades:
-            trade_amount = initial_capital * position_size
-            trade_pnl = trade_amount * (trade["profit_pct"] / 100)
-            total_pnl += trade_pnl
-        
-        final_capital = initial_capital + total_pnl
-        total_return = (total_pnl / initial_capital) * 100
-        
-        avg_win = sum(t["profit_pct"] for t in winning_trades) / len(winning_trades) if winning_trades else 0
-        avg_loss = sum(t["profit_pct"] for t in losing_trades) / len(losing_trades) if losing_trades else 0
-        
-        # Best and worst trades
-        best_trade = max(all_trades, key=lambda x: x["profit_pct"]) if all_trades else None
-        worst_trade = min(all_trades, key=lambda x: x["profit_pct"]) if all_trades else None
-        
-        # Sector performance
-        sector_performance = {}
-        for trade in all_trades:
-            sector = trade["sector"]
-            if sector not in sector_performance:
-                sector_performance[sector] = {"trades": 0, "total_pnl": 0}
-            sector_performance[sector]["trades"] += 1
-            sector_performance[sector]["total_pnl"] += trade["profit_pct"]
-        
-        top_sectors = sorted(
-            [{"sector": k, "avg_return": v["total_pnl"]/v["trades"], "trades": v["trades"]} 
-             for k, v in sector_performance.items()],
-            key=lambda x: x["avg_return"],
-            reverse=True
-        )[:5]
-        
-        return {
-            "status": "success",
-            "message": f"Successfully backtested {len(stocks)} stocks",
-            "total_trades": len(all_trades),
-            "win_rate": round(win_rate, 2),
-            "total_return": round(total_return, 2),
-            "final_capital": round(final_capital, 2),
-            "initial_capital": initial_capital,
-            "stocks_tested": len(stocks),
-            "winning_trades": len(winning_trades),
-            "losing_trades": len(losing_trades),
-            "avg_win": round(avg_win, 2),
-            "avg_loss": round(avg_loss, 2),
-            "best_trade": {
-                "symbol": best_trade["symbol"],
-                "profit_pct": best_trade["profit_pct"]
-            } if best_trade else None,
-            "worst_trade": {
-                "symbol": worst_trade["symbol"],
-                "profit_pct": worst_trade["profit_pct"]
-            } if worst_trade else None,
-            "top_sectors": top_sectors,
-            "trade_details": sorted(all_trades, key=lambda x: x["profit_pct"], reverse=True)[:20]  # Top 20 trades
-        }
-        
+        force_refresh = config.get("force_refresh", False)
+        fetch = await run_compute(materialized.backtest_fetch, config, force_refresh)
+        frames = await fetch_many_async(*fetch) if fetch else None
+        result = await run_compute(materialized.universe_backtest, config, force_refresh=force_refresh, frames=frames)
     except Exception as e:
         print(f"Error in universe backtest: {str(e)}")
         import traceback
         traceback.print_exc()
-        return {
+        result = {
             "status": "error",
             "message": f"Error running backtest: {str(e)}",
             "total_trades": 0,
             "win_rate": 0,
             "total_return": 0,
             "final_capital": 0
-        }
\ No newline at end of file
+        }
+    return await run_compute(encoded_response, request, result, backtest_table)
+
+# ---------- WALK-FORWARD ----------
+@app.post("/walkforward")
+async def walk_forward_validation(request: Request, config: Dict[str, Any]):
+    """Rolling train/test validation of the crossover grid (kind="strategy") or the XGBoost model (kind="model")"""
+    try:
+        result = await run_compute(walk_forward, config)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await run_compute(encoded_response, request, result)
+
+# ---------- JOBS ----------
+@app.post("/jobs/backtest/universe", status_code=202)
+def submit_universe_backtest_job(config: Dict[str, Any]):
+    """Queue a universe backtest (same body as /backtest/universe) and return its job id"""
+    job, deduplicated = get_job_manager().submit("universe_backtest", config)
+    return {**public_view(job), "deduplicated": deduplicated}
+
+@app.post("/jobs/walkforward", status_code=202)
+def submit_walk_forward_job(config: Dict[str, Any]):
+    """Queue a walk-forward validation (same body as /walkforward) and return its job id"""
+    job, deduplicated = get_job_manager().submit("walk_forward", config)
+    return {**public_view(job), "deduplicated": deduplicated}
+
+@app.get("/jobs")
+def list_jobs(kind: str = None):
+    return {"jobs": [public_view(job) for job in get_job_manager().list(kind)]}
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return public_view(job)
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' is {job['status']}, no result available")
+    return job["result"]
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return public_view(job)
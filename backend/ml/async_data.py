@@ -0,0 +1,119 @@
+"""
+Asyncio data layer for the API.
+
+Upstream fetches run in worker threads behind one global semaphore, so a burst
+of requests can't open more than FETCH_CONCURRENCY Yahoo calls at once.
+yfinance already shares one HTTP session (cookie + crumb) across all threads,
+so every fetch reuses the same client. CPU-bound work (features, backtests,
+screens) goes to a separate bounded compute pool and never runs on the event loop.
+
+Identical concurrent requests are coalesced: callers asking for the same
+(symbol, period) while a fetch + feature computation is in flight await that
+one computation instead of starting their own. Results are shared between
+callers, so treat the returned DataFrames as read-only.
+"""
+import asyncio
+import contextvars
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+from backend.ml import metrics, tracing
+from backend.ml.data_fetch import _to_ticker, fetch_many, fetch_stock_data
+from backend.ml.features import calculate_features
+
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "16"))
+COMPUTE_THREADS = int(os.getenv("COMPUTE_THREADS", str(min(8, os.cpu_count() or 1))))
+
+_compute_pool = ThreadPoolExecutor(max_workers=COMPUTE_THREADS, thread_name_prefix="compute")
+_io_pool = ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY, thread_name_prefix="fetch")
+# loop -> fetch semaphore. Weak values: a semaphore nobody holds or waits on has all
+# its permits free, so it can go (and with it the loop it is bound to); a weak-key
+# dict would never drop a loop, since a semaphore that has waited references its loop
+_semaphores = weakref.WeakValueDictionary()
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight task"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            metrics.cache_result(self.name, False)
+        else:
+            self.shared += 1
+            metrics.cache_result(self.name, True)
+        # shield: one caller disconnecting must not cancel the work for the others
+        return await asyncio.shield(task)
+
+
+_fetch_flight = SingleFlight("singleflight_fetch")
+_features_flight = SingleFlight("singleflight_features")
+
+
+def _fetch_semaphore() -> asyncio.Semaphore:
+    # One semaphore per event loop (tests and reloads may run more than one)
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(FETCH_CONCURRENCY)
+    return semaphore
+
+
+async def run_io(fn, *args, **kwargs):
+    """Run a blocking upstream call under the global fetch limit"""
+    async with _fetch_semaphore():
+        loop = asyncio.get_running_loop()
+        # Executor threads don't inherit contextvars; carry the request's (metrics label, trace)
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            _io_pool, partial(context.run, tracing.call_in_span, f"io:{fn.__name__}", fn, *args, **kwargs)
+        )
+
+
+async def run_compute(fn, *args, **kwargs):
+    """Run CPU-bound work off the event loop"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _compute_pool, partial(context.run, tracing.call_in_span, f"compute:{fn.__name__}", fn, *args, **kwargs)
+    )
+
+
+async def fetch_stock_data_async(symbol: str, period: str = "1y"):
+    return await _fetch_flight.do(
+        (_to_ticker(symbol), period),
+        lambda: run_io(fetch_stock_data, symbol, period=period)
+    )
+
+
+async def fetch_features_async(symbol: str, period: str = "1y"):
+    """
+    (raw_df, features_df) for a symbol, computed once per (symbol, period)
+    across all concurrent callers. features_df is empty when raw_df is.
+    """
+    async def load():
+        df = await fetch_stock_data_async(symbol, period=period)
+        if df.empty:
+            return df, pd.DataFrame()
+        return df, await run_compute(calculate_features, df)
+
+    return await _features_flight.do((_to_ticker(symbol), period), load)
+
+
+async def fetch_many_async(symbols: list, period: str = "1y") -> dict:
+    """One batched download (see fetch_many) counted as a single upstream call"""
+    return await run_io(fetch_many, symbols, period=period)
@@ -1,7 +1,116 @@
 import pandas as pd
 import numpy as np
+from itertools import product
 
-import pandas as pd
+from backend.ml import metrics
+
+EXIT_REASONS = ["Stop Loss", "Take Profit", "Max Days", "Strategy Signal", "Forced EOD Exit"]
+
+
+def _signal_array(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    return df[col].fillna(False).to_numpy(dtype=bool)
+
+
+@metrics.timed("backtest")
+def simulate_exit_rules(close, entry_signal, exit_signal, stop_loss_pct, take_profit_pct, max_holding_days):
+    """
+    Single-position LONG simulator over K exit configs in one pass over the bars.
+
+    close:            (n,) prices
+    entry/exit_signal: (n,) shared by all configs, or (n, K) per config
+    stop_loss_pct, take_profit_pct, max_holding_days: (K,) exit parameters
+
+    Exit priority per bar: Stop Loss, Take Profit, Max Days, Strategy Signal,
+    Forced EOD Exit. No re-entry on the exit bar or the bar after it.
+
+    Returns arrays (config, entry_i, exit_i, days_held, reason, ret_pct), one element per trade.
+    """
+    close = np.asarray(close, dtype=float)
+    stop_loss_pct = np.atleast_1d(np.asarray(stop_loss_pct, dtype=float))
+    take_profit_pct = np.atleast_1d(np.asarray(take_profit_pct, dtype=float))
+    max_holding_days = np.atleast_1d(np.asarray(
+        [np.inf if d is None else d for d in np.atleast_1d(max_holding_days)], dtype=float
+    ))
+    k = len(stop_loss_pct)
+    n = len(close)
+
+    entry_signal = np.asarray(entry_signal, dtype=bool)
+    exit_signal = np.asarray(exit_signal, dtype=bool)
+    entry_any = entry_signal.any(axis=1) if entry_signal.ndim == 2 else entry_signal
+
+    # Position state, one slot per config
+    long = np.zeros(k, dtype=bool)
+    just_exited = np.zeros(k, dtype=bool)
+    entry_price = np.ones(k)
+    entry_i = np.zeros(k, dtype=np.int64)
+    days_held = np.zeros(k, dtype=np.int64)
+
+    results = []
+
+    for i in range(n):
+        any_long = long.any()
+        if not any_long and not entry_any[i]:
+            # Nothing can happen on this bar for any config
+            just_exited[:] = False
+            continue
+
+        price = close[i]
+        flat = ~long
+        enter = flat & entry_signal[i] & ~just_exited
+
+        if any_long:
+            days_held[long] += 1
+            ret_pct = (price - entry_price) / entry_price * 100
+
+            reason = np.select(
+                [
+                    ret_pct <= -stop_loss_pct,
+                    ret_pct >= take_profit_pct,
+                    days_held >= max_holding_days,
+                    np.broadcast_to(exit_signal[i], (k,)),
+                    np.full(k, i == n - 1),
+                ],
+                np.arange(len(EXIT_REASONS)),
+                default=-1
+            )
+            exiting = long & (reason >= 0)
+
+            if exiting.any():
+                idx = np.flatnonzero(exiting)
+                results.append((idx, entry_i[idx], np.full(len(idx), i), days_held[idx], reason[idx], ret_pct[idx]))
+                long[exiting] = False
+                just_exited[exiting] = True
+
+        just_exited[flat] = False
+
+        long[enter] = True
+        entry_price[enter] = price
+        entry_i[enter] = i
+        days_held[enter] = 0
+
+    if not results:
+        empty_int = np.zeros(0, dtype=np.int64)
+        return empty_int, empty_int, empty_int, empty_int, empty_int, np.zeros(0)
+
+    return tuple(np.concatenate(parts) for parts in zip(*results))
+
+
+def _trade_dicts(dates: list, symbol: str, close: np.ndarray, entry_i, exit_i, days_held, reason, ret_pct):
+    return [
+        {
+            "symbol": symbol,
+            "entry_date": dates[e],
+            "entry_price": float(close[e]),
+            "days_held": int(d),
+            "exit_date": dates[x],
+            "exit_price": float(close[x]),
+            "profit_pct": round(float(r), 2),
+            "exit_reason": EXIT_REASONS[c],
+        }
+        for e, x, d, c, r in zip(entry_i, exit_i, days_held, reason, ret_pct)
+    ]
 
 
 def run_advanced_backtest(df: pd.DataFrame, symbol: str, config: dict):
@@ -19,65 +128,276 @@ def run_advanced_backtest(df: pd.DataFrame, symbol: str, config: dict):
         5. Forced EOD Exit
     - Prevents same-bar re-entry
     """
+    close = df["Close"].to_numpy(dtype=float)
+
+    _, entry_i, exit_i, days_held, reason, ret_pct = simulate_exit_rules(
+        close,
+        _signal_array(df, "entry_signal"),
+        _signal_array(df, "exit_signal"),
+        [config["stop_loss_pct"]],
+        [config["take_profit_pct"]],
+        [config["max_holding_days"]],
+    )
+
+    return _trade_dicts(list(df.index.strftime("%Y-%m-%d")), symbol, close, entry_i, exit_i, days_held, reason, ret_pct)
+
+
+def exit_rule_grid(stop_loss_pct, take_profit_pct, max_holding_days):
+    """Cartesian product of exit parameters as a list of config dicts"""
+    return [
+        {"stop_loss_pct": sl, "take_profit_pct": tp, "max_holding_days": days}
+        for sl, tp, days in product(stop_loss_pct, take_profit_pct, max_holding_days)
+    ]
+
+
+def summarize_sweep(configs: list, config_idx, ret_pct, days_held) -> pd.DataFrame:
+    """Per-config performance table from flat trade arrays"""
+    k = len(configs)
+    ret_pct = np.asarray(ret_pct, dtype=float)
+
+    counts = np.bincount(config_idx, minlength=k)
+    wins = np.bincount(config_idx, weights=(ret_pct > 0).astype(float), minlength=k)
+    sum_ret = np.bincount(config_idx, weights=ret_pct, minlength=k)
+    gross_win = np.bincount(config_idx, weights=np.where(ret_pct > 0, ret_pct, 0), minlength=k)
+    gross_loss = -np.bincount(config_idx, weights=np.where(ret_pct < 0, ret_pct, 0), minlength=k)
+    log_growth = np.bincount(config_idx, weights=np.log1p(ret_pct / 100), minlength=k)
+    sum_days = np.bincount(config_idx, weights=days_held, minlength=k)
+
+    max_win = np.full(k, np.nan)
+    max_loss = np.full(k, np.nan)
+    np.fmax.at(max_win, config_idx, ret_pct)
+    np.fmin.at(max_loss, config_idx, ret_pct)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        summary = pd.DataFrame(configs)
+        summary["trades"] = counts
+        summary["win_rate_pct"] = np.where(counts > 0, wins / counts * 100, 0)
+        summary["avg_profit_pct"] = np.where(counts > 0, sum_ret / counts, 0)
+        summary["total_return_pct"] = np.expm1(log_growth) * 100
+        summary["profit_factor"] = np.where(gross_loss > 0, gross_win / gross_loss, 0)
+        summary["max_win_pct"] = np.nan_to_num(max_win)
+        summary["max_loss_pct"] = np.nan_to_num(max_loss)
+        summary["avg_days_held"] = np.where(counts > 0, sum_days / counts, 0)
+
+    return summary.round(2)
+
+
+def run_exit_sweep(df: pd.DataFrame, symbol: str, configs: list):
+    """
+    Batch version of run_advanced_backtest: evaluates every exit config
+    (dicts with stop_loss_pct / take_profit_pct / max_holding_days, see
+    exit_rule_grid) against the same entry_signal / exit_signal columns in a
+    single pass over the price array.
+
+    Returns (trades_per_config, summary) where trades_per_config[j] is the
+    run_advanced_backtest trade list for configs[j] and summary is a DataFrame
+    with one row per config.
+    """
+    close = df["Close"].to_numpy(dtype=float)
+
+    config_idx, entry_i, exit_i, days_held, reason, ret_pct = simulate_exit_rules(
+        close,
+        _signal_array(df, "entry_signal"),
+        _signal_array(df, "exit_signal"),
+        [c["stop_loss_pct"] for c in configs],
+        [c["take_profit_pct"] for c in configs],
+        [c["max_holding_days"] for c in configs],
+    )
+
+    # Trades are recorded in bar order; a stable sort groups them per config
+    order = np.argsort(config_idx, kind="stable")
+    bounds = np.searchsorted(config_idx[order], np.arange(len(configs) + 1))
 
+    dates = list(df.index.strftime("%Y-%m-%d"))
+    trades_per_config = []
+    for j in range(len(configs)):
+        sel = order[bounds[j]:bounds[j + 1]]
+        trades_per_config.append(
+            _trade_dicts(dates, symbol, close, entry_i[sel], exit_i[sel], days_held[sel], reason[sel], ret_pct[sel])
+        )
+
+    return trades_per_config, summarize_sweep(configs, config_idx, ret_pct, days_held)
+
+
+@metrics.timed("signals")
+def crossover_events(df: pd.DataFrame, fast_col: str = "EMA_20", slow_col: str = "EMA_50"):
+    """
+    Vectorized crossover detection.
+    Returns (cross_up, cross_down) boolean arrays: bar i crossed relative to bar i-1.
+    """
+    fast = df[fast_col].to_numpy(dtype=float)
+    slow = df[slow_col].to_numpy(dtype=float)
+
+    cross_up = np.zeros(len(df), dtype=bool)
+    cross_down = np.zeros(len(df), dtype=bool)
+    cross_up[1:] = (fast[:-1] <= slow[:-1]) & (fast[1:] > slow[1:])
+    cross_down[1:] = (fast[:-1] >= slow[:-1]) & (fast[1:] < slow[1:])
+
+    return cross_up, cross_down
+
+
+def _next_index(indices: np.ndarray, after: int):
+    """First element of sorted `indices` that is > after, or None"""
+    k = np.searchsorted(indices, after, side="right")
+    return int(indices[k]) if k < len(indices) else None
+
+
+@metrics.timed("backtest")
+def backtest_crossover(df: pd.DataFrame, symbol: str, initial_capital: float = 100000):
+    """
+    All-in EMA 20/50 crossover backtest for a single stock.
+    Buys as many whole shares as capital allows on a cross above, sells on the
+    next cross below, and closes any open position on the last bar.
+    Returns {"trade_logs": [...], "summary": {...}}.
+    """
+    close = df["Close"].to_numpy(dtype=float)
+    dates = df.index
+    cross_up, cross_down = crossover_events(df)
+    up_idx = np.flatnonzero(cross_up)
+    down_idx = np.flatnonzero(cross_down)
+
+    capital = initial_capital
     trades = []
+    last = -1
 
-    # Position state
-    state = "FLAT"   # FLAT | LONG
-    entry_data = {}
-    just_exited = False  # Prevent same-bar re-entry
-
-    for i in range(len(df)):
-        row = df.iloc[i]
-        price = float(row["Close"])
-        is_last_candle = (i == len(df) - 1)
-
-        # -------------------------
-        # ENTRY LOGIC
-        # -------------------------
-        if state == "FLAT":
-            if row.get("entry_signal", False) and not just_exited:
-                state = "LONG"
-                entry_data = {
-                    "symbol": symbol,
-                    "entry_date": df.index[i].strftime("%Y-%m-%d"),
-                    "entry_price": price,
-                    "days_held": 0,
-                }
-            just_exited = False
-
-        # -------------------------
-        # EXIT LOGIC
-        # -------------------------
-        elif state == "LONG":
-            entry_data["days_held"] += 1
-            ret_pct = (price - entry_data["entry_price"]) / entry_data["entry_price"] * 100
-
-            exit_reason = None
-
-            # Exit priority
-            if ret_pct <= -config["stop_loss_pct"]:
-                exit_reason = "Stop Loss"
-            elif ret_pct >= config["take_profit_pct"]:
-                exit_reason = "Take Profit"
-            elif entry_data["days_held"] >= config["max_holding_days"]:
-                exit_reason = "Max Days"
-            elif row.get("exit_signal", False):
-                exit_reason = "Strategy Signal"
-            elif is_last_candle:
-                exit_reason = "Forced EOD Exit"
-
-            if exit_reason:
-                trades.append({
-                    **entry_data,
-                    "exit_date": df.index[i].strftime("%Y-%m-%d"),
-                    "exit_price": price,
-                    "profit_pct": round(ret_pct, 2),
-                    "exit_reason": exit_reason,
-                })
-
-                state = "FLAT"
-                just_exited = True
+    # Only the crossover bars are visited, not every bar
+    while True:
+        entry_i = _next_index(up_idx, last)
+        if entry_i is None:
+            break
 
-    return trades
+        entry_price = float(close[entry_i])
+        shares = capital // entry_price
+        if shares <= 0:
+            last = entry_i
+            continue
+
+        capital -= shares * entry_price
+        exit_i = _next_index(down_idx, entry_i)
+        if exit_i is None:
+            # Close any open position at the end
+            exit_i = len(df) - 1
+
+        exit_price = float(close[exit_i])
+        capital += shares * exit_price
+        profit = (exit_price - entry_price) * shares
+        profit_pct = ((exit_price - entry_price) / entry_price) * 100
+
+        trades.append({
+            "stock": symbol,
+            "entry_date": str(dates[entry_i].date()),
+            "exit_date": str(dates[exit_i].date()),
+            "entry_price": round(entry_price, 2),
+            "exit_price": round(exit_price, 2),
+            "profit": round(profit, 2),
+            "profit_pct": round(profit_pct, 2)
+        })
+        last = exit_i
+
+    return {
+        "trade_logs": trades,
+        "summary": summarize_trades(trades, initial_capital, capital)
+    }
+
+
+def summarize_trades(trades: list, initial_capital: float, final_amount: float) -> dict:
+    """Summary statistics for a single-stock trade log"""
+    if not trades:
+        return {
+            "number_of_trades": 0,
+            "invested_amount": initial_capital,
+            "final_amount": initial_capital,
+            "win_rate_pct": 0,
+            "risk_reward_ratio": 0,
+            "avg_profit_pct": 0,
+            "max_loss_pct": 0,
+            "max_win_pct": 0,
+            "profit_factor": 0,
+            "pnl_pct": 0,
+            "avg_loss_pct": 0,
+            "max_drawdown_pct": 0
+        }
 
+    total_pnl = final_amount - initial_capital
+    pnl_pct = (total_pnl / initial_capital) * 100
+
+    winning_trades = [t for t in trades if t["profit"] > 0]
+    losing_trades = [t for t in trades if t["profit"] < 0]
+
+    win_rate = len(winning_trades) / len(trades) * 100
+    avg_profit_pct = sum(t["profit_pct"] for t in trades) / len(trades)
+
+    max_win = max(t["profit_pct"] for t in trades)
+    max_loss = min(t["profit_pct"] for t in trades)
+
+    avg_win_pct = sum(t["profit_pct"] for t in winning_trades) / len(winning_trades) if winning_trades else 0
+    avg_loss_pct = sum(t["profit_pct"] for t in losing_trades) / len(losing_trades) if losing_trades else 0
+
+    total_wins = sum(t["profit"] for t in winning_trades)
+    total_losses = abs(sum(t["profit"] for t in losing_trades))
+    profit_factor = total_wins / total_losses if total_losses > 0 else 0
+
+    risk_reward = abs(avg_win_pct / avg_loss_pct) if avg_loss_pct != 0 else 0
+
+    # Calculate max drawdown (simplified)
+    max_drawdown_pct = abs(max_loss)
+
+    return {
+        "number_of_trades": len(trades),
+        "invested_amount": initial_capital,
+        "final_amount": round(final_amount, 2),
+        "win_rate_pct": round(win_rate, 2),
+        "risk_reward_ratio": round(risk_reward, 2),
+        "avg_profit_pct": round(avg_profit_pct, 2),
+        "max_loss_pct": round(max_loss, 2),
+        "max_win_pct": round(max_win, 2),
+        "profit_factor": round(profit_factor, 2),
+        "pnl_pct": round(pnl_pct, 2),
+        "avg_loss_pct": round(avg_loss_pct, 2),
+        "max_drawdown_pct": round(max_drawdown_pct, 2)
+    }
+
+
+@metrics.timed("backtest")
+def crossover_trades(df: pd.DataFrame, symbol: str, stop_loss: float, take_profit: float, sector: str = "Unknown"):
+    """
+    EMA 20/50 crossover trades with stop loss / take profit, as used by the universe backtest.
+    Enters on a cross above; exits on the first later bar with a cross below,
+    a return <= -stop_loss, or a return >= take_profit (fractions, e.g. 0.05).
+    A position still open on the last bar is not reported.
+    """
+    close = df["Close"].to_numpy(dtype=float)
+    dates = df.index
+    cross_up, cross_down = crossover_events(df)
+    up_idx = np.flatnonzero(cross_up)
+
+    trades = []
+    last = -1
+
+    while True:
+        entry_i = _next_index(up_idx, last)
+        if entry_i is None:
+            break
+
+        entry_price = float(close[entry_i])
+        pnl_pct = (close[entry_i + 1:] - entry_price) / entry_price
+        exit_hit = cross_down[entry_i + 1:] | (pnl_pct <= -stop_loss) | (pnl_pct >= take_profit)
+        if not exit_hit.any():
+            break
+
+        exit_i = entry_i + 1 + int(np.argmax(exit_hit))
+        exit_price = float(close[exit_i])
+        profit_pct = ((exit_price - entry_price) / entry_price) * 100
+
+        trades.append({
+            "symbol": symbol,
+            "entry_date": str(dates[entry_i].date()),
+            "exit_date": str(dates[exit_i].date()),
+            "entry_price": round(entry_price, 2),
+            "exit_price": round(exit_price, 2),
+            "profit_pct": round(profit_pct, 2),
+            "sector": sector
+        })
+        last = exit_i
+
+    return trades
@@ -1,43 +1,54 @@
-import yfinance as yf
 import pandas as pd
 import time
+from typing import Dict, List
 
-def fetch_stock_data(symbol: str, period: str = "1y", retries: int = 3) -> pd.DataFrame:
+from backend.ml import metrics, ohlcv_store
+from backend.ml.providers import get_provider
+from backend.ml.streaming import indicator_cache
+
+REQUIRED_COLS = ['Open', 'High', 'Low', 'Close', 'Volume']
+ACTION_COLS = ['Dividends', 'Stock Splits']
+
+
+def _to_ticker(symbol: str) -> str:
+    return symbol if symbol.endswith(".NS") else f"{symbol}.NS"
+
+
+def _download(ticker: str, retries: int = 3, **history_kwargs) -> pd.DataFrame:
     """
-    Fetch NSE stock data safely using yfinance with retry logic.
+    Download history for one ticker from the active provider with retry logic.
+    Returns OHLCV plus any corporate-action columns yfinance provides.
     """
-    ticker = symbol if symbol.endswith(".NS") else f"{symbol}.NS"
-    
     for attempt in range(retries):
         try:
-            # Use Ticker object instead of download for better reliability
-            stock = yf.Ticker(ticker)
-            df = stock.history(period=period)
-            
+            df = get_provider().history(ticker, **history_kwargs)
+
             if df is None or df.empty:
+                metrics.upstream_error(get_provider().name, "empty_response")
                 if attempt < retries - 1:
                     time.sleep(1)  # Wait before retry
                     continue
                 return pd.DataFrame()
-            
+
             # Flatten MultiIndex columns if they exist
             if isinstance(df.columns, pd.MultiIndex):
                 df.columns = df.columns.get_level_values(0)
-            
+
             # Ensure we have the required columns
-            required_cols = ['Open', 'High', 'Low', 'Close', 'Volume']
-            if not all(col in df.columns for col in required_cols):
+            if not all(col in df.columns for col in REQUIRED_COLS):
+                metrics.upstream_error(get_provider().name, "missing_columns")
                 if attempt < retries - 1:
                     time.sleep(1)
                     continue
                 return pd.DataFrame()
-            
-            df = df[required_cols]
-            df = df.dropna()
-            
+
+            df = df[REQUIRED_COLS + [col for col in ACTION_COLS if col in df.columns]]
+            df = df.dropna(subset=REQUIRED_COLS)
+
             return df
-            
+
         except KeyError as e:
+            metrics.upstream_error(get_provider().name, "KeyError")
             # Handle yfinance internal KeyError
             if attempt < retries - 1:
                 print(f"KeyError for {ticker}, retrying... (attempt {attempt + 1}/{retries})")
@@ -46,8 +57,9 @@ def fetch_stock_data(symbol: str, period: str = "1y", retries: int = 3) -> pd.Da
             else:
                 print(f"Failed to fetch {ticker} after {retries} attempts: {str(e)}")
                 return pd.DataFrame()
-                
+
         except Exception as e:
+            metrics.upstream_error(get_provider().name, type(e).__name__)
             if attempt < retries - 1:
                 print(f"Error fetching {ticker}, retrying... (attempt {attempt + 1}/{retries}): {str(e)}")
                 time.sleep(1)
@@ -55,5 +67,225 @@ def fetch_stock_data(symbol: str, period: str = "1y", retries: int = 3) -> pd.Da
             else:
                 print(f"Failed to fetch {ticker} after {retries} attempts: {str(e)}")
                 return pd.DataFrame()
-    
-    return pd.DataFrame()
\ No newline at end of file
+
+    return pd.DataFrame()
+
+
+def _has_actions(df: pd.DataFrame) -> bool:
+    """A dividend or split means yfinance has re-adjusted the whole history"""
+    cols = [col for col in ACTION_COLS if col in df.columns]
+    return bool(cols) and bool((df[cols] != 0).any().any())
+
+
+def _store_full(ticker: str, period: str, df: pd.DataFrame, stored, meta: dict) -> pd.DataFrame:
+    """Merge a full-period download into the store and return the stored history"""
+    df = df[REQUIRED_COLS]
+    covered_from = ohlcv_store.covered_from_for(period, df)
+    if meta.get("covered_from"):
+        covered_from = ohlcv_store.earliest(covered_from, meta["covered_from"])
+
+    stored = ohlcv_store.merge(stored, df)
+    ohlcv_store.save(ticker, stored, covered_from)
+    return stored
+
+
+def _store_incremental(ticker: str, new: pd.DataFrame, stored: pd.DataFrame, meta: dict):
+    """
+    Append newly downloaded bars to the stored history and the streaming indicator state.
+    Returns None when a corporate action means the history must be re-downloaded.
+    """
+    symbol = ticker.removesuffix(".NS")
+    if new is None or new.empty:
+        ohlcv_store.touch(ticker, meta)
+        return stored
+
+    if _has_actions(new.iloc[1:]):
+        print(f"Corporate action detected for {ticker}, refreshing stored history")
+        indicator_cache.drop(symbol)
+        return None
+
+    stored = ohlcv_store.merge(stored, new[REQUIRED_COLS])
+    ohlcv_store.save(ticker, stored, meta["covered_from"])
+    indicator_cache.append(symbol, new)
+    return stored
+
+
+def _update_store(ticker: str, period: str, retries: int) -> pd.DataFrame:
+    """
+    Bring the stored history for `ticker` up to date for `period` and return it.
+    Only the bars since the last stored date are downloaded when possible.
+    """
+    stored, meta = ohlcv_store.load(ticker)
+
+    fresh = ohlcv_store.covers(stored, meta, period) and ohlcv_store.is_fresh(meta)
+    metrics.cache_result("ohlcv_store", fresh)
+    if ohlcv_store.covers(stored, meta, period):
+        if fresh:
+            return stored
+
+        # Re-fetch from the last stored date so a partial last bar gets replaced
+        last_date = stored.index[-1].strftime("%Y-%m-%d")
+        updated = _store_incremental(ticker, _download(ticker, retries, start=last_date), stored, meta)
+        if updated is not None:
+            return updated
+
+        # Adjusted prices changed, re-download the covered span
+        period = "max" if meta["covered_from"] == "max" else period
+        stored, meta = None, {}
+
+    df = _download(ticker, retries, period=period)
+    if df.empty:
+        if stored is not None:
+            ohlcv_store.touch(ticker, meta)
+        return stored if stored is not None else pd.DataFrame()
+
+    return _store_full(ticker, period, df, stored, meta)
+
+
+@metrics.timed("fetch")
+def fetch_stock_data(symbol: str, period: str = "1y", retries: int = 3) -> pd.DataFrame:
+    """
+    Fetch NSE stock data safely from the market data provider with retry logic.
+    Served from the local OHLCV store when enabled; only missing bars hit the network.
+    """
+    ticker = _to_ticker(symbol)
+
+    if not ohlcv_store.STORE_ENABLED or get_provider().offline:
+        df = _download(ticker, retries, period=period)
+        return df[REQUIRED_COLS] if not df.empty else df
+
+    try:
+        with ohlcv_store.symbol_lock(ticker):
+            stored = _update_store(ticker, period, retries)
+    except Exception as e:
+        # Never let a store problem take the endpoint down; fall back to a plain fetch
+        print(f"OHLCV store error for {ticker}, fetching directly: {str(e)}")
+        df = _download(ticker, retries, period=period)
+        return df[REQUIRED_COLS] if not df.empty else df
+
+    if stored.empty:
+        return stored
+    return ohlcv_store.slice_period(stored, period)
+
+
+def _download_many(tickers: List[str], retries: int = 3, chunk_size: int = 100, **download_kwargs) -> Dict[str, pd.DataFrame]:
+    """
+    Download many tickers with one provider batch call per chunk.
+    Returns {ticker: frame} for every ticker that came back with usable OHLCV.
+    """
+    frames = {}
+
+    for i in range(0, len(tickers), chunk_size):
+        chunk = tickers[i:i + chunk_size]
+
+        downloaded = {}
+        for attempt in range(retries):
+            try:
+                downloaded = get_provider().download(chunk, **download_kwargs)
+                break
+            except Exception as e:
+                metrics.upstream_error(get_provider().name, type(e).__name__)
+                if attempt < retries - 1:
+                    print(f"Error downloading chunk of {len(chunk)} tickers, retrying... (attempt {attempt + 1}/{retries}): {str(e)}")
+                    time.sleep(1)
+                    continue
+                print(f"Failed to download chunk of {len(chunk)} tickers after {retries} attempts: {str(e)}")
+
+        for ticker, df in downloaded.items():
+            if isinstance(df.columns, pd.MultiIndex):
+                df.columns = df.columns.get_level_values(0)
+            if not all(col in df.columns for col in REQUIRED_COLS):
+                continue
+
+            df = df[REQUIRED_COLS + [col for col in ACTION_COLS if col in df.columns]]
+            df = df.dropna(subset=REQUIRED_COLS)
+            if not df.empty:
+                frames[ticker] = df
+
+    return frames
+
+
+@metrics.timed("fetch")
+def fetch_many(symbols: List[str], period: str = "1y", chunk_size: int = 100, retries: int = 3) -> Dict[str, pd.DataFrame]:
+    """
+    Fetch many NSE symbols in batched downloads.
+    Symbols that are fresh in the OHLCV store are served without any network I/O;
+    stale ones only download their missing bars. Returns {symbol: frame}, omitting
+    symbols with no data.
+    """
+    tickers = {_to_ticker(symbol): symbol for symbol in symbols}
+
+    if not ohlcv_store.STORE_ENABLED or get_provider().offline:
+        downloaded = _download_many(list(tickers), retries, chunk_size, period=period)
+        return {tickers[t]: df[REQUIRED_COLS] for t, df in downloaded.items()}
+
+    stored_frames = {}
+    metas = {}
+    stale = {}
+    missing = []
+    # Corporate actions: ticker -> period re-downloaded to keep its stored coverage
+    refetch = {}
+
+    for ticker in tickers:
+        stored, meta = ohlcv_store.load(ticker)
+        if ohlcv_store.covers(stored, meta, period):
+            stored_frames[ticker] = stored
+            metas[ticker] = meta
+            if not ohlcv_store.is_fresh(meta):
+                stale[ticker] = stored.index[-1]
+        else:
+            missing.append(ticker)
+            if stored is not None:
+                stored_frames[ticker] = stored
+                metas[ticker] = meta
+
+    print(f"fetch_many: {len(tickers) - len(stale) - len(missing)} fresh, {len(stale)} stale, {len(missing)} missing")
+    metrics.cache_result("ohlcv_store", True, len(tickers) - len(stale) - len(missing))
+    metrics.cache_result("ohlcv_store", False, len(stale) + len(missing))
+
+    # Stale symbols: one download from the oldest last-stored date, trimmed per symbol
+    if stale:
+        start = min(stale.values()).strftime("%Y-%m-%d")
+        downloaded = _download_many(list(stale), retries, chunk_size, start=start)
+
+        for ticker, last_date in stale.items():
+            new = downloaded.get(ticker)
+            if new is not None:
+                new = new[new.index >= last_date]
+
+            with ohlcv_store.symbol_lock(ticker):
+                updated = _store_incremental(ticker, new, stored_frames[ticker], metas[ticker])
+
+            if updated is None:
+                # Adjusted prices changed, re-download the covered span
+                refetch[ticker] = "max" if metas[ticker]["covered_from"] == "max" else period
+                stored_frames.pop(ticker)
+                metas.pop(ticker)
+            else:
+                stored_frames[ticker] = updated
+
+    # One batched download per period: missing symbols need `period`, re-downloads their coverage
+    groups = {period: missing} if missing else {}
+    for ticker, span in refetch.items():
+        groups.setdefault(span, []).append(ticker)
+
+    for span, group in groups.items():
+        downloaded = _download_many(group, retries, chunk_size, period=span)
+
+        for ticker in group:
+            df = downloaded.get(ticker)
+            if df is None:
+                if ticker in metas:
+                    ohlcv_store.touch(ticker, metas[ticker])
+                continue
+
+            with ohlcv_store.symbol_lock(ticker):
+                stored_frames[ticker] = _store_full(
+                    ticker, span, df, stored_frames.get(ticker), metas.get(ticker, {})
+                )
+
+    return {
+        tickers[ticker]: ohlcv_store.slice_period(df, period)
+        for ticker, df in stored_frames.items()
+        if not df.empty
+    }
@@ -0,0 +1,44 @@
+"""
+Largest-Triangle-Three-Buckets downsampling for chart series.
+
+Keeps the first and last points and, from each of `threshold - 2` equal
+buckets in between, the point forming the largest triangle with the point
+kept from the previous bucket and the mean of the next bucket. Peaks, troughs
+and crossovers survive, unlike plain every-nth-row decimation.
+"""
+import numpy as np
+
+
+def lttb_indices(y, threshold: int, x=None) -> np.ndarray:
+    """
+    Positions of the `threshold` points to keep from series `y` (x defaults to
+    0..n-1). Returns all positions when the series is already short enough.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold is None or threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+
+    # Bucket i covers [edges[i], edges[i + 1]); the first and last points are kept as-is
+    every = (n - 2) / (threshold - 2)
+    edges = (np.floor(np.arange(threshold - 1) * every) + 1).astype(np.int64)
+    edges[-1] = n - 1
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
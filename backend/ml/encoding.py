@@ -0,0 +1,158 @@
+"""
+Content negotiation and compression for bulk API responses.
+
+The response format follows the Accept header:
+- application/json (default)            orjson
+- application/x-msgpack                 MessagePack
+- application/vnd.apache.arrow.stream   Arrow IPC stream, for endpoints with a tabular view
+
+Bodies of at least COMPRESS_MIN_BYTES are compressed with brotli (when the
+optional `brotli` package is installed) or gzip, following Accept-Encoding.
+"""
+import gzip
+import os
+from datetime import date, datetime
+
+import msgpack
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+from backend.ml import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON = "application/json"
+MSGPACK = "application/x-msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+MEDIA_TYPES = {
+    JSON: JSON,
+    "application/*": JSON,
+    "*/*": JSON,
+    MSGPACK: MSGPACK,
+    "application/msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    ARROW: ARROW,
+}
+
+COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+
+
+def _default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _parse_header(header: str) -> list:
+    """[(value, q)] from an Accept / Accept-Encoding header, highest q first"""
+    entries = []
+    for position, part in enumerate(header.split(",")):
+        fields = [field.strip() for field in part.split(";")]
+        if not fields[0]:
+            continue
+        q = 1.0
+        for field in fields[1:]:
+            if field.startswith("q="):
+                try:
+                    q = float(field[2:])
+                except ValueError:
+                    q = 0.0
+        entries.append((fields[0].lower(), q, position))
+    entries.sort(key=lambda entry: (-entry[1], entry[2]))
+    return [(value, q) for value, q, _ in entries]
+
+
+def negotiate(accept: str, tabular: bool = False) -> str:
+    """Response media type for an Accept header; JSON when nothing more specific is asked for"""
+    if not accept:
+        return JSON
+    for media_type, q in _parse_header(accept):
+        chosen = MEDIA_TYPES.get(media_type)
+        if q <= 0 or chosen is None:
+            continue
+        if chosen == ARROW and not tabular:
+            continue
+        return chosen
+    raise HTTPException(
+        status_code=406,
+        detail=f"Acceptable formats: {', '.join([JSON, MSGPACK] + ([ARROW] if tabular else []))}"
+    )
+
+
+def choose_encoding(accept_encoding: str):
+    for coding, q in _parse_header(accept_encoding or ""):
+        if q <= 0:
+            continue
+        if coding == "br" and brotli is not None:
+            return "br"
+        if coding == "gzip":
+            return "gzip"
+    return None
+
+
+def to_arrow(table) -> bytes:
+    """
+    Arrow IPC stream from `table`: (rows or columns, metadata dict). Rows are a
+    list of dicts, columns a dict of equal-length lists; metadata is attached to
+    the schema as JSON under b"alphacross".
+    """
+    data, metadata = table
+    if isinstance(data, list):
+        # Union of keys, so a field missing from the first row is not dropped
+        keys = dict.fromkeys(key for row in data for key in row)
+        data = {key: [row.get(key) for row in data] for key in keys}
+    arrow_table = pa.Table.from_pydict(data)
+    if metadata:
+        arrow_table = arrow_table.replace_schema_metadata(
+            {b"alphacross": orjson.dumps(metadata, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)}
+        )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(payload, media_type: str, tabular=None) -> bytes:
+    if media_type == MSGPACK:
+        return msgpack.packb(payload, default=_default, use_bin_type=True)
+    if media_type == ARROW:
+        return to_arrow(tabular(payload))
+    return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def encoded_response(request: Request, payload, tabular=None) -> Response:
+    """
+    Serialize `payload` in the format the client accepts, compressing large bodies.
+    `tabular(payload) -> (rows or columns, metadata)` enables Arrow for the endpoint.
+    """
+    media_type = negotiate(request.headers.get("accept"), tabular=tabular is not None)
+    with metrics.stage("serialize"):
+        body = encode(payload, media_type, tabular)
+
+        headers = {"Vary": "Accept, Accept-Encoding"}
+        if len(body) >= COMPRESS_MIN_BYTES:
+            coding = choose_encoding(request.headers.get("accept-encoding"))
+            if coding is not None:
+                body = compress(body, coding)
+                headers["Content-Encoding"] = coding
+    return Response(content=body, media_type=media_type, headers=headers)
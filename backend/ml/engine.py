@@ -1,20 +1,85 @@
 import pandas as pd
 import numpy as np
 
+from backend.ml import metrics
+from backend.ml.backtest import simulate_exit_rules, summarize_sweep
+
+MA_TYPES = ("SMA", "EMA", "WMA", "HMA", "DEMA", "TEMA", "KAMA")
+
+
+def _ema(values: np.ndarray, period: int) -> np.ndarray:
+    return pd.Series(values).ewm(span=period, adjust=False).mean().to_numpy()
+
+
+def _wma(values: np.ndarray, period: int) -> np.ndarray:
+    """Linearly weighted MA as one convolution; windows touching a NaN stay NaN"""
+    out = np.full(len(values), np.nan)
+    if period < 1 or len(values) < period:
+        return out
+    weights = np.arange(1, period + 1, dtype=float)
+    # np.convolve flips the kernel, so reverse it to put the largest weight on the newest bar
+    out[period - 1:] = np.convolve(values, weights[::-1], mode="valid") / weights.sum()
+    return out
+
+
+def _hma(values: np.ndarray, period: int) -> np.ndarray:
+    """Hull MA: WMA(2 * WMA(n/2) - WMA(n), sqrt(n))"""
+    half = max(period // 2, 1)
+    root = max(int(np.sqrt(period)), 1)
+    return _wma(2 * _wma(values, half) - _wma(values, period), root)
+
+
+def _kama(values: np.ndarray, period: int, fast: int = 2, slow: int = 30) -> np.ndarray:
+    """Kaufman adaptive MA, same as ta.momentum.KAMAIndicator(window=period)"""
+    n = len(values)
+    out = np.full(n, np.nan)
+    if n <= period:
+        return out
+
+    # Efficiency ratio and smoothing constants are vectorized; only the recursion loops
+    change = np.abs(values[period:] - values[:-period])
+    volatility = pd.Series(np.abs(np.diff(values, prepend=np.nan))).rolling(period).sum().to_numpy()[period:]
+    er = np.divide(change, volatility, out=np.zeros_like(change), where=volatility != 0)
+    sc = (er * (2 / (fast + 1) - 2 / (slow + 1)) + 2 / (slow + 1)) ** 2
+
+    # Seeded with the close at the first full window, like ta
+    kama = values[period - 1]
+    out[period - 1] = kama
+    for i in range(len(sc)):
+        kama += sc[i] * (values[period + i] - kama)
+        out[period + i] = kama
+    return out
+
+
 class StrategyEngine:
     @staticmethod
     def calculate_ma(df, period, ma_type):
-        """Calculates dynamic MA types: SMA, EMA, or WMA."""
+        """Calculates dynamic MA types: SMA, EMA, WMA, HMA, DEMA, TEMA or KAMA."""
         if ma_type == "SMA":
             return df['Close'].rolling(window=period).mean()
         elif ma_type == "EMA":
             return df['Close'].ewm(span=period, adjust=False).mean()
-        elif ma_type == "WMA":
-            weights = np.arange(1, period + 1)
-            return df['Close'].rolling(period).apply(lambda x: np.dot(x, weights) / weights.sum(), raw=True)
-        return None
+
+        close = df['Close'].to_numpy(dtype=float)
+        if ma_type == "WMA":
+            values = _wma(close, period)
+        elif ma_type == "HMA":
+            values = _hma(close, period)
+        elif ma_type == "DEMA":
+            ema = _ema(close, period)
+            values = 2 * ema - _ema(ema, period)
+        elif ma_type == "TEMA":
+            ema = _ema(close, period)
+            ema2 = _ema(ema, period)
+            values = 3 * ema - 3 * ema2 + _ema(ema2, period)
+        elif ma_type == "KAMA":
+            values = _kama(close, period)
+        else:
+            return None
+        return pd.Series(values, index=df.index)
 
     @classmethod
+    @metrics.timed("signals")
     def generate_signals(cls, df: pd.DataFrame, config: dict):
         """
         Implements true crossover detection with .shift(1).
@@ -53,4 +118,169 @@ class StrategyEngine:
             df['entry_signal'] = curr_order & ~curr_order.shift(1).fillna(False)
             df['exit_signal'] = ~curr_order & curr_order.shift(1).fillna(False)
             
-        return df
\ No newline at end of file
+        return df
+
+    @classmethod
+    def optimize(cls, data, param_grid: dict, exit_config: dict, cache=None,
+                 rank_by: str = "total_return_pct", per_symbol: bool = False) -> pd.DataFrame:
+        """
+        Sweep MA periods, MA types and single/double/triple strategies over one
+        DataFrame or a {symbol: DataFrame} dict, simulating each combo with the
+        run_advanced_backtest exit rules in `exit_config`.
+
+        param_grid keys: short_period, long_period, medium_period (triple only),
+        ma_type, strategy_type; each a list.
+
+        Each (symbol, ma_type, period) average is computed once via `cache` and
+        all combos for a symbol are simulated in one batched pass. Returns a table
+        ranked by `rank_by`: one row per combo aggregated across symbols, or one
+        row per (symbol, combo) with per_symbol=True.
+        """
+        frames = data if isinstance(data, dict) else {"default": data}
+        cache = cache if cache is not None else MACache()
+        combos = _strategy_combos(param_grid)
+        if not combos:
+            return pd.DataFrame()
+
+        combo_table = pd.DataFrame(
+            combos, columns=["strategy_type", "ma_type", "short_period", "medium_period", "long_period"]
+        )
+        k = len(combos)
+
+        tables = []
+        for symbol, df in frames.items():
+            if df is None or df.empty:
+                continue
+
+            entry, exit_ = _signal_matrices(df, symbol, combos, cache)
+            config_idx, _, _, days_held, _, ret_pct = simulate_exit_rules(
+                df["Close"].to_numpy(dtype=float),
+                entry,
+                exit_,
+                np.full(k, exit_config["stop_loss_pct"], dtype=float),
+                np.full(k, exit_config["take_profit_pct"], dtype=float),
+                [exit_config["max_holding_days"]] * k,
+            )
+
+            table = summarize_sweep(combo_table.to_dict("records"), config_idx, ret_pct, days_held)
+            table.insert(0, "symbol", symbol)
+            tables.append(table)
+
+        if not tables:
+            return pd.DataFrame()
+
+        results = pd.concat(tables, ignore_index=True)
+        if not per_symbol:
+            keys = list(combo_table.columns)
+            results["wins"] = results["trades"] * results["win_rate_pct"] / 100
+            results = results.groupby(keys, dropna=False, sort=False).agg(
+                symbols=("symbol", "nunique"),
+                trades=("trades", "sum"),
+                wins=("wins", "sum"),
+                avg_profit_pct=("avg_profit_pct", "mean"),
+                total_return_pct=("total_return_pct", "mean"),
+                profit_factor=("profit_factor", "mean"),
+                max_win_pct=("max_win_pct", "max"),
+                max_loss_pct=("max_loss_pct", "min"),
+                avg_days_held=("avg_days_held", "mean"),
+            ).reset_index()
+            results["win_rate_pct"] = np.where(
+                results["trades"] > 0, results["wins"] / results["trades"].clip(lower=1) * 100, 0
+            )
+            results = results.drop(columns="wins")
+
+        return results.sort_values(rank_by, ascending=False, ignore_index=True).round(2)
+
+
+class MACache:
+    """
+    Memoizes moving averages per (symbol, ma_type, period) so parameter sweeps
+    compute each average once and share it across every combination using it.
+    Keys also carry the data's span, so a longer/shorter history is not confused
+    with a cached one.
+    """
+
+    def __init__(self):
+        self._store = {}
+        self.hits = 0
+        self.misses = 0
+
+    def matrix(self, symbol: str, df: pd.DataFrame, ma_type: str, periods: list) -> np.ndarray:
+        """(n_bars x len(periods)) matrix of averages, one column per period"""
+        data_key = (symbol, len(df), df.index[0], df.index[-1], ma_type)
+        columns = []
+        for period in periods:
+            key = data_key + (period,)
+            if key in self._store:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._store[key] = StrategyEngine.calculate_ma(df, period, ma_type).to_numpy(dtype=float)
+            columns.append(self._store[key])
+        return np.column_stack(columns)
+
+
+def _strategy_combos(param_grid: dict):
+    """Valid (strategy_type, ma_type, short, medium, long) combinations for a grid"""
+    combos = []
+    for strategy_type in param_grid.get("strategy_type", ["double"]):
+        for ma_type in param_grid.get("ma_type", ["EMA"]):
+            for short in param_grid["short_period"]:
+                for long in param_grid["long_period"]:
+                    if short >= long:
+                        continue
+                    if strategy_type == "triple":
+                        for medium in param_grid.get("medium_period", []):
+                            if short < medium < long:
+                                combos.append((strategy_type, ma_type, short, medium, long))
+                    else:
+                        combos.append((strategy_type, ma_type, short, None, long))
+    return combos
+
+
+@metrics.timed("signals")
+def _signal_matrices(df: pd.DataFrame, symbol: str, combos: list, cache: MACache):
+    """
+    Entry/exit signal matrices (n_bars x n_combos), equivalent to running
+    generate_signals per combo: warm-up bars (NaN fast/slow MA) never signal,
+    and the first valid bar counts as a fresh state change.
+    """
+    close = df["Close"].to_numpy(dtype=float)
+    n = len(df)
+    entry = np.zeros((n, len(combos)), dtype=bool)
+    exit_ = np.zeros((n, len(combos)), dtype=bool)
+
+    groups = {}
+    for j, (strategy_type, ma_type, short, medium, long) in enumerate(combos):
+        if n >= long:
+            groups.setdefault((strategy_type, ma_type), []).append(j)
+
+    for (strategy_type, ma_type), cols in groups.items():
+        shorts = [combos[j][2] for j in cols]
+        mediums = [combos[j][3] for j in cols]
+        longs = [combos[j][4] for j in cols]
+
+        periods = sorted(set(shorts) | set(longs) | ({m for m in mediums if m is not None}))
+        position = {period: i for i, period in enumerate(periods)}
+        mas = cache.matrix(symbol, df, ma_type, periods)
+
+        fast = mas[:, [position[p] for p in shorts]]
+        slow = mas[:, [position[p] for p in longs]]
+        valid = ~np.isnan(fast) & ~np.isnan(slow)
+
+        with np.errstate(invalid="ignore"):
+            if strategy_type == "single":
+                state = close[:, None] > fast
+            elif strategy_type == "double":
+                state = fast > slow
+            else:
+                mid = mas[:, [position[p] for p in mediums]]
+                state = (fast > mid) & (mid > slow)
+
+        state &= valid
+        prev = np.zeros_like(state)
+        prev[1:] = state[:-1]
+        entry[:, cols] = state & ~prev
+        exit_[:, cols] = ~state & prev & valid
+
+    return entry, exit_
@@ -2,6 +2,9 @@ import pandas as pd
 import numpy as np
 from ta.momentum import RSIIndicator
 
+from backend.ml import metrics
+
+@metrics.timed("features")
 def calculate_features(df: pd.DataFrame) -> pd.DataFrame:
     """Calculate EMAs, RSI, slopes, returns"""
     df = df.copy()
@@ -36,4 +39,103 @@ def calculate_features(df: pd.DataFrame) -> pd.DataFrame:
     
     print(f"Features calculated. Rows after cleanup: {len(df)}")
     
-    return df
\ No newline at end of file
+    return df
+
+PANEL_FEATURES = ['EMA_20', 'EMA_50', 'EMA_20_slope', 'EMA_50_slope', 'RSI', 'Returns', 'Volatility']
+
+
+def close_panel(frames: dict) -> pd.DataFrame:
+    """Align per-symbol Close series into one dates x symbols matrix"""
+    if not frames:
+        return pd.DataFrame()
+    closes = pd.concat({symbol: df['Close'] for symbol, df in frames.items()}, axis=1).sort_index()
+    # Interior gaps (a symbol missing a bar others have) carry the last close;
+    # leading/trailing gaps stay NaN so each column keeps its own history span
+    return closes.ffill().where(closes.bfill().notna())
+
+
+@metrics.timed("features")
+def calculate_panel_features(closes: pd.DataFrame) -> dict:
+    """
+    Panel version of calculate_features: the same indicators for every column
+    of a dates x symbols close matrix in one vectorized pass.
+
+    Returns {name: DataFrame} for Close, each of PANEL_FEATURES, Signal, Target,
+    plus a boolean 'valid' frame marking the rows calculate_features would keep.
+    """
+    has_data = closes.notna()
+
+    ema_20 = closes.ewm(span=20, adjust=False).mean().where(has_data)
+    ema_50 = closes.ewm(span=50, adjust=False).mean().where(has_data)
+
+    # RSI (Wilder smoothing, matching ta.momentum.RSIIndicator)
+    diff = closes.diff(1)
+    up = diff.where(diff > 0, 0.0).where(has_data)
+    down = (-diff.where(diff < 0, 0.0)).where(has_data)
+    ema_up = up.ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    ema_down = down.ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    rsi = pd.DataFrame(
+        np.where(ema_down == 0, 100, 100 - (100 / (1 + ema_up / ema_down))),
+        index=closes.index,
+        columns=closes.columns,
+    ).where(has_data)
+
+    returns = closes.pct_change(fill_method=None)
+
+    signal = pd.DataFrame(
+        np.sign(ema_20.to_numpy() - ema_50.to_numpy()),
+        index=closes.index,
+        columns=closes.columns,
+    )
+
+    panel = {
+        'Close': closes,
+        'EMA_20': ema_20,
+        'EMA_50': ema_50,
+        'EMA_20_slope': ema_20.diff(3) / ema_20.shift(3),
+        'EMA_50_slope': ema_50.diff(3) / ema_50.shift(3),
+        'RSI': rsi,
+        'Returns': returns,
+        'Volatility': returns.rolling(window=10).std(),
+        'Signal': signal,
+        'Target': signal.shift(-2),
+    }
+
+    for name in PANEL_FEATURES:
+        panel[name] = panel[name].replace([np.inf, -np.inf], np.nan)
+
+    valid = has_data & panel['Target'].notna()
+    for name in PANEL_FEATURES:
+        valid &= panel[name].notna()
+    panel['valid'] = valid
+
+    return panel
+
+
+def panel_latest(panel: dict) -> pd.DataFrame:
+    """
+    Latest valid row per symbol (the row calculate_features(df).iloc[-1] would give),
+    as a symbols x features frame with a 'date' column. Symbols with no valid rows are omitted.
+    """
+    valid = panel['valid'].to_numpy()
+    has_valid = valid.any(axis=0)
+    last_pos = len(valid) - 1 - np.argmax(valid[::-1], axis=0)
+
+    cols = np.flatnonzero(has_valid)
+    rows = last_pos[has_valid]
+    symbols = panel['valid'].columns[cols]
+
+    latest = pd.DataFrame(
+        {name: panel[name].to_numpy()[rows, cols] for name in ['Close'] + PANEL_FEATURES + ['Signal']},
+        index=symbols,
+    )
+    latest['date'] = panel['valid'].index[rows]
+    return latest
+
+
+def panel_symbol_frame(panel: dict, symbol: str) -> pd.DataFrame:
+    """One symbol's valid rows from a panel, shaped like calculate_features output"""
+    mask = panel['valid'][symbol]
+    return pd.DataFrame(
+        {name: panel[name][symbol] for name in ['Close'] + PANEL_FEATURES + ['Signal', 'Target']}
+    )[mask]
@@ -0,0 +1,298 @@
+"""
+Background jobs for long-running universe work.
+
+Submitting returns a job id immediately; the work runs on a bounded thread
+pool (JOB_WORKERS) instead of inside the HTTP request. Jobs report progress,
+can be cancelled, and are persisted as JSON under JOB_DIR so finished results
+survive restarts. A submission identical to a queued, running, or (same
+trading day) completed job returns that job instead of starting another.
+
+Each record carries its owner (host:pid) and a heartbeat refreshed every
+JOB_HEARTBEAT_SECONDS while it is pending. On startup, pending records of this
+owner or with a stale heartbeat are marked interrupted; pending jobs of other
+live processes sharing JOB_DIR are left alone.
+"""
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from backend.ml import materialized, metrics, universe_backtest, walk_forward
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+JOB_DIR = Path(os.getenv("JOB_DIR", BASE_DIR / "data" / "jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Finished jobs kept in the store; older ones are pruned
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "100"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+# A pending job whose heartbeat is older than this has lost its process
+JOB_STALE_SECONDS = 3 * JOB_HEARTBEAT_SECONDS
+
+ACTIVE = ("queued", "running")
+FINISHED = ("completed", "failed", "cancelled", "interrupted")
+
+
+class JobCancelled(BaseException):
+    """
+    Raised from a job's progress callback once cancellation is requested.
+    A BaseException (like asyncio.CancelledError) so the compute code's
+    `except Exception` fallbacks don't swallow it.
+    """
+
+
+def _run_universe_backtest(params: dict, progress) -> dict:
+    return materialized.universe_backtest(params, force_refresh=params.get("force_refresh", False), progress=progress)
+
+
+def _run_walk_forward(params: dict, progress) -> dict:
+    return walk_forward.walk_forward(params, progress=progress)
+
+
+# kind -> (runner(params, progress) -> result, params that identify duplicate submissions,
+#          progress unit reported as <unit>_done / <unit>_total)
+JOB_KINDS = {
+    "universe_backtest": (_run_universe_backtest, universe_backtest.resolve_config, "symbols"),
+    "walk_forward": (_run_walk_forward, walk_forward.resolve_config, "evaluations"),
+}
+
+
+def _progress(unit: str, done: int, total, trades=None) -> dict:
+    progress = {f"{unit}_done": done, f"{unit}_total": total}
+    if trades is not None:
+        progress["trades"] = trades
+    return progress
+
+
+def _job_key(kind: str, params: dict) -> str:
+    _, key_params, _ = JOB_KINDS[kind]
+    payload = json.dumps({"kind": kind, "params": key_params(params)}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def public_view(job: dict) -> dict:
+    """Job status without the (possibly large) result"""
+    return {key: value for key, value in job.items() if key not in ("result", "key", "owner", "heartbeat_ts")}
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobManager:
+    def __init__(self, workers: int = JOB_WORKERS, job_dir: Path = None):
+        self.job_dir = Path(job_dir) if job_dir else JOB_DIR
+        self.owner = _owner()
+        self._jobs = {}
+        self._futures = {}
+        self._cancel = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._stop = threading.Event()
+        self._load()
+        self._heartbeat = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _path(self, job_id: str) -> Path:
+        return self.job_dir / f"{job_id}.json"
+
+    def _load(self):
+        if not self.job_dir.exists():
+            return
+        for path in self.job_dir.glob("*.json"):
+            try:
+                job = json.loads(path.read_text())
+            except Exception as e:
+                print(f"Corrupt job record {path.name}, ignoring: {str(e)}")
+                continue
+            if job["status"] in ACTIVE:
+                stale = time.time() - job.get("heartbeat_ts", 0) > JOB_STALE_SECONDS
+                if job.get("owner") != self.owner and not stale:
+                    # Still pending in another live process sharing JOB_DIR
+                    continue
+                # The process stopped while this job was pending
+                job["status"] = "interrupted"
+                job["finished_at"] = datetime.now().isoformat()
+                self._persist(job)
+            self._jobs[job["id"]] = job
+
+    def _beat(self):
+        while not self._stop.wait(JOB_HEARTBEAT_SECONDS):
+            with self._lock:
+                for job in self._jobs.values():
+                    if job["status"] in ACTIVE:
+                        self._persist(job)
+
+    def _persist(self, job: dict):
+        if job["status"] in ACTIVE:
+            job["heartbeat_ts"] = time.time()
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(job["id"])
+        tmp_path = path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(job))
+        os.replace(tmp_path, path)
+
+    def _prune(self):
+        finished = sorted(
+            (job for job in self._jobs.values() if job["status"] in FINISHED),
+            key=lambda job: job["submitted_ts"]
+        )
+        for job in finished[:max(len(finished) - JOB_HISTORY, 0)]:
+            del self._jobs[job["id"]]
+            self._path(job["id"]).unlink(missing_ok=True)
+
+    def _reusable(self, key: str, force_refresh: bool):
+        """Newest queued / running job with this key, or a completed one from the current trading day"""
+        since = materialized.last_refresh_time().timestamp()
+        for job in sorted(self._jobs.values(), key=lambda job: job["submitted_ts"], reverse=True):
+            if job["key"] != key:
+                continue
+            if job["status"] in ACTIVE:
+                return job
+            if not force_refresh and job["status"] == "completed" and job["finished_ts"] >= since:
+                return job
+        return None
+
+    def submit(self, kind: str, params: dict):
+        """Queue a job, or return the existing equivalent one. Returns (job, deduplicated)"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}'")
+
+        key = _job_key(kind, params)
+        with self._lock:
+            existing = self._reusable(key, params.get("force_refresh", False))
+            if existing is not None:
+                return existing, True
+
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "owner": self.owner,
+                "kind": kind,
+                "key": key,
+                "params": params,
+                "status": "queued",
+                "progress": _progress(JOB_KINDS[kind][2], 0, None),
+                "cancel_requested": False,
+                "submitted_at": datetime.now().isoformat(),
+                "submitted_ts": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "finished_ts": None,
+                "error": None,
+                "result": None,
+                "heartbeat_ts": None,
+            }
+            self._jobs[job["id"]] = job
+            self._cancel[job["id"]] = threading.Event()
+            self._persist(job)
+            self._futures[job["id"]] = self._executor.submit(self._run, job["id"])
+            return job, False
+
+    def _finish(self, job: dict, status: str, result: dict = None, error: str = None):
+        with self._lock:
+            job.update(
+                status=status,
+                result=result,
+                error=error,
+                finished_at=datetime.now().isoformat(),
+                finished_ts=time.time()
+            )
+            try:
+                self._persist(job)
+            except Exception as e:
+                # e.g. a result that is not JSON-serializable: fail the job rather than leave it running
+                print(f"Job {job['id']}: could not store its {status} state: {str(e)}")
+                job.update(status="failed", result=None, error=f"Could not store the job result: {str(e)}")
+                self._persist(job)
+            finally:
+                self._futures.pop(job["id"], None)
+                self._cancel.pop(job["id"], None)
+                self._prune()
+
+    def _run(self, job_id: str):
+        job = self._jobs[job_id]
+        cancel = self._cancel[job_id]
+        if cancel.is_set():
+            self._finish(job, "cancelled")
+            return
+
+        with self._lock:
+            job.update(status="running", started_at=datetime.now().isoformat())
+            self._persist(job)
+
+        run, _, unit = JOB_KINDS[job["kind"]]
+        # Pool threads are reused; label this job's stage metrics with its kind
+        metrics.ENDPOINT.set(f"job:{job['kind']}")
+
+        def progress(done: int, total: int, trades: int = None):
+            job["progress"] = _progress(unit, done, total, trades)
+            if cancel.is_set():
+                raise JobCancelled()
+
+        print(f"Job {job_id}: {job['kind']} started")
+        try:
+            result = run(job["params"], progress)
+        except JobCancelled:
+            print(f"Job {job_id}: cancelled")
+            self._finish(job, "cancelled")
+        except Exception as e:
+            print(f"Job {job_id}: failed: {str(e)}")
+            self._finish(job, "failed", error=str(e))
+        else:
+            print(f"Job {job_id}: completed")
+            self._finish(job, "completed", result=result)
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def list(self, kind: str = None) -> list:
+        jobs = [job for job in self._jobs.values() if kind is None or job["kind"] == kind]
+        return sorted(jobs, key=lambda job: job["submitted_ts"], reverse=True)
+
+    def cancel(self, job_id: str):
+        """Request cancellation; queued jobs stop immediately, running ones at their next progress report"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] not in ACTIVE:
+                return job
+            job["cancel_requested"] = True
+            self._cancel[job_id].set()
+            future = self._futures.get(job_id)
+            cancelled_before_start = future is not None and future.cancel()
+
+        if cancelled_before_start:
+            self._finish(job, "cancelled")
+        return job
+
+    def shutdown(self):
+        self._stop.set()
+        for event in list(self._cancel.values()):
+            event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """The process's job manager, created on first use (the API creates it at startup)"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
+
+
+def shutdown_job_manager():
+    """Stop the job manager, if one was created; the next use creates a new one"""
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.shutdown()
+            _manager = None
@@ -0,0 +1,262 @@
+"""
+Materialized universe results.
+
+Prices are end-of-day, so the full-universe screen and the default universe
+backtest only change once per trading day. Their results are stored as
+snapshots (in memory and as JSON under SNAPSHOT_DIR) and served directly until
+the next scheduled refresh after NSE close. Smaller screens are served as a
+subset of the full-universe snapshot. force_refresh recomputes.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from backend.ml import metrics
+from backend.ml.nse500_fetcher import fetch_nse500_symbols
+from backend.ml.providers import EXCHANGE_TZ
+from backend.ml.streaming import indicator_cache
+from backend.ml.universe_backtest import DEFAULT_CONFIG, backtest_universe, resolve_config
+from backend.ml.universe_screen import SCREEN_PERIOD, WITH_MODEL, classify, iter_screen_universe, screen_universe
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", BASE_DIR / "data" / "snapshots"))
+
+# Exchange-local time after NSE close (15:30) when end-of-day results are refreshed
+REFRESH_AFTER = os.getenv("SCHEDULE_AFTER_CLOSE", "16:00")
+
+BUCKETS = ["bullish", "bearish", "neutral"]
+
+_snapshots = {}
+_locks = {name: threading.Lock() for name in ("screen", "universe_backtest")}
+
+
+def _at_refresh_time(day: pd.Timestamp) -> pd.Timestamp:
+    hour, minute = (int(part) for part in REFRESH_AFTER.split(":"))
+    return day.normalize() + pd.Timedelta(hours=hour, minutes=minute)
+
+
+def last_refresh_time(now: pd.Timestamp = None) -> pd.Timestamp:
+    """Most recent weekday refresh time at or before `now` (exchange holidays are not skipped)"""
+    now = now if now is not None else pd.Timestamp.now(tz=EXCHANGE_TZ)
+    run = _at_refresh_time(now)
+    if run > now:
+        run -= pd.Timedelta(days=1)
+    while run.weekday() >= 5:
+        run -= pd.Timedelta(days=1)
+    return run
+
+
+def next_refresh_time(now: pd.Timestamp = None) -> pd.Timestamp:
+    now = now if now is not None else pd.Timestamp.now(tz=EXCHANGE_TZ)
+    run = _at_refresh_time(now)
+    if run <= now:
+        run += pd.Timedelta(days=1)
+    while run.weekday() >= 5:
+        run += pd.Timedelta(days=1)
+    return run
+
+
+def load(name: str):
+    """Snapshot from memory, falling back to disk"""
+    if name in _snapshots:
+        return _snapshots[name]
+    path = SNAPSHOT_DIR / f"{name}.json"
+    if not path.exists():
+        return None
+    try:
+        snapshot = json.loads(path.read_text())
+    except Exception as e:
+        print(f"Corrupt snapshot {name}, ignoring: {str(e)}")
+        return None
+    _snapshots[name] = snapshot
+    return snapshot
+
+
+def save(name: str, params: dict, result: dict) -> dict:
+    snapshot = {
+        "generated_at": datetime.now().isoformat(),
+        "generated_ts": time.time(),
+        "params": params,
+        "result": result,
+    }
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    path = SNAPSHOT_DIR / f"{name}.json"
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(snapshot))
+    os.replace(tmp_path, path)
+    _snapshots[name] = snapshot
+    return snapshot
+
+
+def is_fresh(snapshot: dict) -> bool:
+    """Generated after the most recent end-of-day refresh time"""
+    return snapshot is not None and snapshot["generated_ts"] >= last_refresh_time().timestamp()
+
+
+def _served(snapshot: dict, result: dict, served_from: str) -> dict:
+    metrics.cache_result("snapshot", served_from == "snapshot")
+    return {**result, "generated_at": snapshot["generated_at"], "served_from": served_from}
+
+
+def _screen_subset(result: dict, symbols: set) -> dict:
+    subset = {**result}
+    for bucket in BUCKETS:
+        subset[bucket] = [item for item in result[bucket] if item["symbol"] in symbols]
+    subset["counts"] = {bucket: len(subset[bucket]) for bucket in BUCKETS}
+    return subset
+
+
+def _servable_screen(snapshot: dict, max_stocks: int, with_model: bool) -> bool:
+    return (
+        is_fresh(snapshot)
+        and snapshot["params"]["with_model"] == with_model
+        and max_stocks <= snapshot["params"]["max_stocks"]
+    )
+
+
+def _compute_screen(with_model: bool, frames: dict = None) -> dict:
+    """Recompute and store the full-universe screen; callers hold _locks["screen"]"""
+    universe = len(fetch_nse500_symbols())
+    result = screen_universe(max_stocks=universe, with_model=with_model, frames=frames)
+    # The screen just synced the streaming indicator state from its panel
+    indicator_cache.save()
+    return save("screen", {"max_stocks": universe, "with_model": with_model}, result)
+
+
+def refresh_screen(with_model: bool = None, force: bool = False) -> dict:
+    """
+    Scheduled refresh of the full-universe screen. Waits out a request that is
+    already computing it, and (unless force) keeps the snapshot that produced.
+    """
+    with_model = WITH_MODEL if with_model is None else with_model
+    with _locks["screen"]:
+        snapshot = load("screen")
+        if not force and _servable_screen(snapshot, len(fetch_nse500_symbols()), with_model):
+            return snapshot
+        return _compute_screen(with_model)
+
+
+def screen_fetch(max_stocks: int = 500, with_model: bool = None, force_refresh: bool = False):
+    """
+    (symbols, period) that screen() would download for this request, or None
+    when the snapshot serves it; lets the API fetch on its io pool first
+    """
+    with_model = WITH_MODEL if with_model is None else with_model
+    stocks = fetch_nse500_symbols()[:max_stocks]
+    if not force_refresh and _servable_screen(load("screen"), len(stocks), with_model):
+        return None
+    return [stock["Symbol"] for stock in stocks], SCREEN_PERIOD
+
+
+def screen(max_stocks: int = 500, with_model: bool = None, force_refresh: bool = False,
+           frames: dict = None) -> dict:
+    """
+    Universe screen served from the materialized snapshot when it covers the request.
+    `frames` are prices prefetched for a live computation (see screen_fetch).
+    """
+    with_model = WITH_MODEL if with_model is None else with_model
+    stocks = fetch_nse500_symbols()[:max_stocks]
+    covers_universe = len(stocks) == len(fetch_nse500_symbols())
+
+    if not force_refresh:
+        snapshot = load("screen")
+        if _servable_screen(snapshot, len(stocks), with_model):
+            return _served(snapshot, _screen_subset(snapshot["result"], {s["Symbol"] for s in stocks}), "snapshot")
+
+    if not covers_universe:
+        # Partial universe and no usable snapshot: compute just what was asked
+        metrics.cache_result("snapshot", False)
+        result = screen_universe(max_stocks=max_stocks, with_model=with_model, frames=frames)
+        return {**result, "generated_at": result["timestamp"], "served_from": "live"}
+
+    with _locks["screen"]:
+        # A concurrent request or the scheduler may have just refreshed it
+        snapshot = load("screen")
+        if force_refresh or not _servable_screen(snapshot, len(stocks), with_model):
+            snapshot = _compute_screen(with_model, frames)
+            return _served(snapshot, snapshot["result"], "live")
+        return _served(snapshot, snapshot["result"], "snapshot")
+
+
+def stream_screen(max_stocks: int = 500, with_model: bool = None, force_refresh: bool = False):
+    """
+    Streaming screen events (see iter_screen_universe). A current snapshot is
+    replayed immediately; otherwise the universe is computed chunk by chunk.
+    """
+    with_model = WITH_MODEL if with_model is None else with_model
+    stocks = fetch_nse500_symbols()[:max_stocks]
+
+    snapshot = None if force_refresh else load("screen")
+    servable = _servable_screen(snapshot, len(stocks), with_model)
+    metrics.cache_result("snapshot", servable)
+    if not servable:
+        for event in iter_screen_universe(max_stocks=max_stocks, with_model=with_model):
+            if event["event"] == "summary":
+                event = {**event, "generated_at": event["timestamp"], "served_from": "live"}
+            yield event
+        return
+
+    result = _screen_subset(snapshot["result"], {s["Symbol"] for s in stocks})
+    items = {item["symbol"]: item for bucket in BUCKETS for item in result[bucket]}
+    counts = {bucket: 0 for bucket in BUCKETS}
+
+    yield {"event": "start", "total": len(stocks)}
+    for done, stock in enumerate(stocks, start=1):
+        item = items.get(stock["Symbol"])
+        if item is None:
+            continue
+        bucket = classify(item["ema_20"], item["ema_50"])
+        counts[bucket] += 1
+        yield {"event": "result", "bucket": bucket, "item": item, "counts": dict(counts),
+               "done": done, "total": len(stocks)}
+    yield {"event": "summary", "counts": counts, "total": len(stocks), "timestamp": result["timestamp"],
+           "generated_at": snapshot["generated_at"], "served_from": "snapshot"}
+
+
+def _servable_backtest(snapshot: dict) -> bool:
+    return is_fresh(snapshot) and snapshot["params"] == DEFAULT_CONFIG
+
+
+def _compute_backtest(progress=None, frames: dict = None) -> dict:
+    """Recompute and store the default-config universe backtest; callers hold _locks["universe_backtest"]"""
+    result = backtest_universe(dict(DEFAULT_CONFIG), progress=progress, frames=frames)
+    return save("universe_backtest", dict(DEFAULT_CONFIG), result)
+
+
+def refresh_backtest(force: bool = False) -> dict:
+    """Scheduled refresh of the default-config universe backtest (see refresh_screen)"""
+    with _locks["universe_backtest"]:
+        snapshot = load("universe_backtest")
+        if not force and _servable_backtest(snapshot):
+            return snapshot
+        return _compute_backtest()
+
+
+def backtest_fetch(config: dict, force_refresh: bool = False):
+    """(symbols, period) that universe_backtest() would download, or None when the snapshot serves it"""
+    params = resolve_config(config)
+    if params == DEFAULT_CONFIG and not force_refresh and _servable_backtest(load("universe_backtest")):
+        return None
+    return [stock["Symbol"] for stock in fetch_nse500_symbols()[:params["max_stocks"]]], params["period"]
+
+
+def universe_backtest(config: dict, force_refresh: bool = False, progress=None, frames: dict = None) -> dict:
+    """
+    Universe backtest, served from the snapshot for the default configuration.
+    `frames` are prices prefetched for a live computation (see backtest_fetch).
+    """
+    if resolve_config(config) != DEFAULT_CONFIG:
+        result = backtest_universe(config, progress=progress, frames=frames)
+        return {**result, "generated_at": datetime.now().isoformat(), "served_from": "live"}
+
+    with _locks["universe_backtest"]:
+        snapshot = load("universe_backtest")
+        if force_refresh or not _servable_backtest(snapshot):
+            snapshot = _compute_backtest(progress, frames)
+            return _served(snapshot, snapshot["result"], "live")
+        return _served(snapshot, snapshot["result"], "snapshot")
@@ -0,0 +1,234 @@
+"""
+In-process metrics, exposed at /metrics in the Prometheus text format.
+
+- Per-stage timings (fetch, features, signals, backtest, model, serialize) as
+  histograms of *self* time: when stages nest (a backtest finding crossovers),
+  the inner stage's time is not counted again in the outer one, so the stages
+  of a request add up to at most its latency.
+- Cache hit / miss counters, upstream (market data provider) error counts,
+  request counts / latency and in-flight gauges.
+
+Everything is labelled with the endpoint (route template) the work ran for,
+carried in a context variable set by MetricsMiddleware. Work outside a request
+is labelled "background", or "job:<kind>" inside background jobs. Work done in
+process-pool workers is not recorded per stage; it shows up in the request latency.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from starlette.routing import Match
+
+from backend.ml import tracing
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+ENDPOINT = contextvars.ContextVar("metrics_endpoint", default="background")
+# Seconds spent in nested stages, per active stage; the innermost is last
+_child_seconds = contextvars.ContextVar("metrics_child_seconds", default=())
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key: tuple, value) -> list:
+        return [f"{self.name}{_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def _samples(self, key: tuple, state: list) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), state[:-1]):
+            cumulative += count
+            le = f'le="{bound}"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {state[-1]}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+REGISTRY = []
+
+REQUESTS = Counter("alphacross_http_requests_total", "HTTP requests handled", ("endpoint", "method", "status"))
+REQUEST_SECONDS = Histogram("alphacross_http_request_duration_seconds", "HTTP request latency, to the end of the body",
+                            ("endpoint", "method"))
+IN_FLIGHT = Gauge("alphacross_http_requests_in_flight", "HTTP requests currently being handled", ("endpoint",))
+STAGE_SECONDS = Histogram("alphacross_stage_duration_seconds",
+                          "Self time per pipeline stage (nested stages excluded)", ("endpoint", "stage"))
+CACHE = Counter("alphacross_cache_requests_total", "Cache lookups by cache and result (hit / miss)",
+                ("endpoint", "cache", "result"))
+UPSTREAM_ERRORS = Counter("alphacross_upstream_errors_total", "Failed market data provider calls (each attempt)",
+                          ("endpoint", "provider", "error"))
+
+
+def current_endpoint() -> str:
+    return ENDPOINT.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as pipeline stage `name` for the current endpoint (and trace it as a span)"""
+    parent = _child_seconds.get()
+    token = _child_seconds.set(parent + (0.0,))
+    start = time.perf_counter()
+    try:
+        with tracing.span(name):
+            yield
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = _child_seconds.get()[-1]
+        _child_seconds.reset(token)
+        if parent:
+            # Tell the enclosing stage to leave this time out of its own
+            _child_seconds.set(parent[:-1] + (parent[-1] + elapsed,))
+        STAGE_SECONDS.observe(max(elapsed - nested, 0.0), endpoint=ENDPOINT.get(), stage=name)
+
+
+def timed(name: str):
+    """Decorator form of stage()"""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def cache_result(cache: str, hit: bool, count: int = 1):
+    if count:
+        CACHE.inc(count, endpoint=ENDPOINT.get(), cache=cache, result="hit" if hit else "miss")
+
+
+def upstream_error(provider: str, error: str):
+    UPSTREAM_ERRORS.inc(endpoint=ENDPOINT.get(), provider=provider, error=error)
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: resolves the route template for each HTTP request (unmatched
+    paths share one label, so raw URLs can't blow up label cardinality), sets it as
+    the endpoint label for everything the request runs, and records count, latency
+    and in-flight requests. Latency runs until the last body chunk, so streamed
+    responses are measured in full.
+    """
+
+    def __init__(self, app, routes: list):
+        self.app = app
+        self.routes = routes
+
+    def _endpoint(self, scope) -> str:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", "unmatched")
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = self._endpoint(scope)
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        token = ENDPOINT.set(endpoint)
+        IN_FLIGHT.inc(endpoint=endpoint)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, method=method)
+            REQUESTS.inc(endpoint=endpoint, method=method, status=str(status["code"]))
+            IN_FLIGHT.dec(endpoint=endpoint)
+            ENDPOINT.reset(token)
@@ -0,0 +1,142 @@
+"""
+Persistent per-symbol model registry.
+
+Trained XGBoost bundles (scaler + classifier) are saved under MODEL_REGISTRY_DIR
+as `<TICKER>.joblib` with a JSON sidecar recording the registry version,
+training window and a hash of the feature set and model parameters. A stored
+model is reused until a new bar arrives, it is older than MODEL_MAX_AGE_SECONDS,
+or the version / feature hash no longer match the code.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+from backend.ml import metrics
+from backend.ml.data_fetch import _to_ticker
+from backend.ml.model_xgb import FEATURE_COLS, MODEL_PARAMS, predict, train
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODEL_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", BASE_DIR / "data" / "models"))
+MAX_AGE_SECONDS = int(os.getenv("MODEL_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+
+# Bump when train() changes in a way that invalidates stored models
+MODEL_VERSION = 1
+
+FEATURE_HASH = hashlib.sha1(
+    json.dumps({"features": FEATURE_COLS, "params": MODEL_PARAMS}, sort_keys=True).encode()
+).hexdigest()[:12]
+
+_memory = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def model_lock(ticker: str) -> threading.Lock:
+    """Per-key lock so concurrent requests don't train the same model twice"""
+    with _locks_guard:
+        if ticker not in _locks:
+            _locks[ticker] = threading.Lock()
+        return _locks[ticker]
+
+
+def _paths(ticker: str):
+    return MODEL_DIR / f"{ticker}.joblib", MODEL_DIR / f"{ticker}.json"
+
+
+def load(ticker: str):
+    """(bundle, meta) from memory or disk, or (None, None)"""
+    if ticker in _memory:
+        return _memory[ticker]
+
+    model_path, meta_path = _paths(ticker)
+    if not model_path.exists() or not meta_path.exists():
+        return None, None
+    try:
+        entry = joblib.load(model_path), json.loads(meta_path.read_text())
+    except Exception as e:
+        print(f"Corrupt model registry entry for {ticker}, retraining: {str(e)}")
+        return None, None
+
+    _memory[ticker] = entry
+    return entry
+
+
+def save(ticker: str, bundle: dict, meta: dict):
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    model_path, meta_path = _paths(ticker)
+
+    tmp_path = model_path.with_suffix(".joblib.tmp")
+    joblib.dump(bundle, tmp_path)
+    os.replace(tmp_path, model_path)
+
+    tmp_path = meta_path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(meta))
+    os.replace(tmp_path, meta_path)
+
+    _memory[ticker] = (bundle, meta)
+
+
+def is_current(meta: dict, window_end: str = None, feature_hash: str = FEATURE_HASH) -> bool:
+    """
+    Whether a stored model still applies to data ending at `window_end`
+    (None: any window, only version / feature hash / age are checked)
+    """
+    return (
+        meta is not None
+        and meta.get("version") == MODEL_VERSION
+        and meta.get("feature_hash") == feature_hash
+        and (window_end is None or meta.get("window_end") == window_end)
+        and time.time() - meta.get("trained_at", 0) < MAX_AGE_SECONDS
+    )
+
+
+def get_model(symbol: str, df: pd.DataFrame):
+    """
+    Model for `symbol` trained on `df` (calculate_features output), training and
+    storing a new one only when the stored model is stale.
+    Returns (bundle, meta, cached).
+    """
+    ticker = _to_ticker(symbol)
+    window_end = str(df.index[-1].date())
+    bundle, meta = load(ticker)
+    if is_current(meta, window_end):
+        metrics.cache_result("model", True)
+        return bundle, meta, True
+
+    with model_lock(ticker):
+        # Another request may have retrained while we waited
+        bundle, meta = load(ticker)
+        if is_current(meta, window_end):
+            metrics.cache_result("model", True)
+            return bundle, meta, True
+
+        metrics.cache_result("model", False)
+
+        started = time.perf_counter()
+        bundle = train(df)
+        meta = {
+            "version": MODEL_VERSION,
+            "feature_hash": FEATURE_HASH,
+            "kind": bundle["kind"],
+            "window_start": str(df.index[0].date()),
+            "window_end": window_end,
+            "rows": len(df),
+            "trained_at": time.time(),
+            "train_seconds": round(time.perf_counter() - started, 3),
+        }
+        save(ticker, bundle, meta)
+        print(f"Trained {bundle['kind']} model for {ticker} on {meta['window_start']}..{meta['window_end']}")
+        return bundle, meta, False
+
+
+def predict_symbol(symbol: str, df: pd.DataFrame):
+    """(prediction, confidence, meta, cached) for the latest row of df"""
+    bundle, meta, cached = get_model(symbol, df)
+    prediction, confidence = predict(bundle, df)
+    return prediction, confidence, meta, cached
@@ -4,6 +4,8 @@ import io
 from functools import lru_cache
 from pathlib import Path
 
+from backend.ml.providers import get_provider
+
 NSE_500_URL = "https://www.niftyindices.com/IndexConstituent/ind_nifty500list.csv"
 
 # Local backup CSV
@@ -23,7 +25,7 @@ FALLBACK = [
 def fetch_nse500_symbols():
     """
     Priority:
-    1. Download latest official Nifty 500 list
+    1. Download latest official Nifty 500 list (skipped for offline data providers)
     2. If download fails, use local CSV
     3. If local CSV also fails, use minimal fallback
     """
@@ -35,28 +37,32 @@ def fetch_nse500_symbols():
     # ==========================
     # Try official Nifty website
     # ==========================
-    try:
-        print("Fetching latest NSE 500 list from Nifty...")
+    # Offline market data providers also skip the online constituent list
+    if get_provider().offline:
+        print("Offline market data provider, using local CSV.")
+    else:
+        try:
+            print("Fetching latest NSE 500 list from Nifty...")
 
-        response = requests.get(
-            NSE_500_URL,
-            headers=headers,
-            timeout=20
-        )
+            response = requests.get(
+                NSE_500_URL,
+                headers=headers,
+                timeout=20
+            )
 
-        response.raise_for_status()
+            response.raise_for_status()
 
-        df = pd.read_csv(io.StringIO(response.text))
+            df = pd.read_csv(io.StringIO(response.text))
 
-        if "Symbol" not in df.columns:
-            raise ValueError("Invalid CSV downloaded")
+            if "Symbol" not in df.columns:
+                raise ValueError("Invalid CSV downloaded")
 
-        print(f"Loaded {len(df)} stocks from Nifty website.")
+            print(f"Loaded {len(df)} stocks from Nifty website.")
 
-        return df[["Symbol", "Industry"]].to_dict("records")
+            return df[["Symbol", "Industry"]].to_dict("records")
 
-    except Exception as e:
-        print(f"Online fetch failed: {e}")
+        except Exception as e:
+            print(f"Online fetch failed: {e}")
 
     # ==========================
     # Local CSV Backup
@@ -0,0 +1,173 @@
+"""
+Local on-disk OHLCV store.
+
+One Parquet file per symbol holds the longest history fetched so far, with a
+small JSON sidecar recording how far back that history is known to reach and
+when the symbol was last refreshed from upstream. Any yfinance-style `period`
+is served as a slice of what is stored.
+"""
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STORE_DIR = Path(os.getenv("OHLCV_STORE_DIR", BASE_DIR / "data" / "ohlcv"))
+STORE_ENABLED = os.getenv("OHLCV_STORE", "1") != "0"
+
+# Seconds before a stored symbol is checked upstream for new bars again
+REFRESH_SECONDS = int(os.getenv("OHLCV_REFRESH_SECONDS", "900"))
+
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def symbol_lock(ticker: str) -> threading.Lock:
+    """Per-symbol lock so concurrent requests don't fetch/write the same file twice"""
+    with _locks_guard:
+        if ticker not in _locks:
+            _locks[ticker] = threading.Lock()
+        return _locks[ticker]
+
+
+def _paths(ticker: str):
+    return STORE_DIR / f"{ticker}.parquet", STORE_DIR / f"{ticker}.json"
+
+
+def load(ticker: str):
+    """Return (stored_df, meta) for a symbol, or (None, {}) if nothing is stored"""
+    data_path, meta_path = _paths(ticker)
+    if not data_path.exists() or not meta_path.exists():
+        return None, {}
+
+    try:
+        df = pd.read_parquet(data_path)
+        meta = json.loads(meta_path.read_text())
+        return df, meta
+    except Exception as e:
+        print(f"Corrupt OHLCV store entry for {ticker}, ignoring: {str(e)}")
+        return None, {}
+
+
+def save(ticker: str, df: pd.DataFrame, covered_from: str):
+    """Atomically write a symbol's history and mark it as freshly checked"""
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    data_path, meta_path = _paths(ticker)
+
+    tmp_path = data_path.with_suffix(".parquet.tmp")
+    df.to_parquet(tmp_path)
+    os.replace(tmp_path, data_path)
+
+    write_meta(ticker, {"covered_from": covered_from, "checked_at": time.time()})
+
+
+def write_meta(ticker: str, meta: dict):
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    _, meta_path = _paths(ticker)
+    tmp_path = meta_path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(meta))
+    os.replace(tmp_path, meta_path)
+
+
+def touch(ticker: str, meta: dict):
+    """Record an upstream check that produced no new bars"""
+    write_meta(ticker, {**meta, "checked_at": time.time()})
+
+
+def is_fresh(meta: dict) -> bool:
+    return time.time() - meta.get("checked_at", 0) < REFRESH_SECONDS
+
+
+def merge(stored, new: pd.DataFrame) -> pd.DataFrame:
+    """Append new bars; overlapping dates take the newer values (last bar may have been partial)"""
+    if stored is None or stored.empty:
+        return new
+    df = pd.concat([stored, new])
+    df = df[~df.index.duplicated(keep="last")]
+    return df.sort_index()
+
+
+def period_start(period: str, tz=None, as_of=None):
+    """
+    Calendar start date for a yfinance-style period ("3mo", "1y", "ytd", ...),
+    counted back from `as_of` (default: now).
+    Returns None for "max" and for trading-day periods ("5d"), which are
+    resolved by bar count instead.
+    """
+    now = (as_of if as_of is not None else pd.Timestamp.now(tz=tz)).normalize()
+
+    if period == "max":
+        return None
+    if period == "ytd":
+        return now.replace(month=1, day=1)
+
+    match = _PERIOD_RE.match(period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        return None
+    if unit == "wk":
+        return now - pd.DateOffset(weeks=n)
+    if unit == "mo":
+        return now - pd.DateOffset(months=n)
+    return now - pd.DateOffset(years=n)
+
+
+def _trading_days(period: str):
+    match = _PERIOD_RE.match(period)
+    if match and match.group(2) == "d":
+        return int(match.group(1))
+    return None
+
+
+def covered_from_for(period: str, df: pd.DataFrame) -> str:
+    """What a fresh full fetch of `period` tells us about how far back history goes"""
+    if period == "max":
+        return "max"
+    start = period_start(period, tz=df.index.tz)
+    if start is None:
+        return str(df.index[0].date())
+    return str(start.date())
+
+
+def earliest(a: str, b: str) -> str:
+    if "max" in (a, b):
+        return "max"
+    return min(a, b)
+
+
+def covers(df: pd.DataFrame, meta: dict, period: str) -> bool:
+    """Whether the stored history is long enough to serve `period` without a full fetch"""
+    covered_from = meta.get("covered_from")
+    if df is None or df.empty or not covered_from:
+        return False
+    if covered_from == "max":
+        return True
+    if period == "max":
+        return False
+
+    days = _trading_days(period)
+    if days is not None:
+        return len(df) >= days
+
+    return covered_from <= str(period_start(period, tz=df.index.tz).date())
+
+
+def slice_period(df: pd.DataFrame, period: str, as_of=None) -> pd.DataFrame:
+    """Serve a yfinance-style period from a longer stored history"""
+    days = _trading_days(period)
+    if days is not None:
+        return df.tail(days).copy()
+
+    start = period_start(period, tz=df.index.tz, as_of=as_of)
+    if start is None:
+        return df.copy()
+    return df[df.index >= start].copy()
@@ -0,0 +1,147 @@
+"""
+Process-pool execution for CPU-bound universe work.
+
+Threads can overlap downloads, but indicator and backtest math holds the GIL.
+In process mode the parent places the fetched price arrays in one
+multiprocessing.shared_memory block; workers attach to it by name, compute
+their chunk of columns (symbols) and return plain Python results, so no
+DataFrames are pickled on the way in.
+
+Select with UNIVERSE_COMPUTE_MODE=serial|process (default serial) and size
+the pool with UNIVERSE_COMPUTE_WORKERS (default: CPU count).
+"""
+import atexit
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+COMPUTE_MODE = os.getenv("UNIVERSE_COMPUTE_MODE", "serial").lower()
+COMPUTE_WORKERS = int(os.getenv("UNIVERSE_COMPUTE_WORKERS", "0")) or os.cpu_count() or 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class SharedArrays:
+    """
+    Copies a {name: ndarray} dict into one shared memory block.
+    `spec` is a small picklable description workers pass to attach().
+    """
+
+    def __init__(self, arrays: dict):
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            offset = -(-offset // 8) * 8  # keep every array 8-byte aligned
+            layout[name] = (offset, array.shape, array.dtype.str)
+            offset += array.nbytes
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for name, array in arrays.items():
+            start, shape, dtype = layout[name]
+            view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=start)
+            view[...] = array
+            del view
+
+        self.spec = {"name": self.shm.name, "layout": layout}
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(spec: dict):
+    """Worker side: (shm, {name: read-only ndarray view}) for a SharedArrays spec"""
+    shm = shared_memory.SharedMemory(name=spec["name"])
+    arrays = {}
+    for name, (offset, shape, dtype) in spec["layout"].items():
+        view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        view.flags.writeable = False
+        arrays[name] = view
+    return shm, arrays
+
+
+def get_pool(workers: int = None) -> ProcessPoolExecutor:
+    """Shared process pool, created on first use and reused across requests"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded web server is not safe
+            _pool = ProcessPoolExecutor(
+                max_workers=workers or COMPUTE_WORKERS,
+                mp_context=mp.get_context("spawn")
+            )
+        return _pool
+
+
+@atexit.register
+def shutdown_pool(pool: ProcessPoolExecutor = None):
+    """Shut down the shared pool (only if it is still `pool`, when given); the next use creates a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and (pool is None or _pool is pool):
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _run_chunk(fn, spec: dict, items: list, kwargs: dict):
+    shm, arrays = attach(spec)
+    try:
+        return fn(arrays, items, **kwargs)
+    finally:
+        # Views must be released before the mapping can be closed
+        arrays.clear()
+        shm.close()
+
+
+def map_shared(fn, arrays: dict, items: list, workers: int = None, chunks_per_worker: int = 4,
+               on_chunk=None, **kwargs) -> list:
+    """
+    Run fn(arrays, item_chunk, **kwargs) -> list over chunks of `items` in the
+    process pool, with `arrays` shared rather than pickled. `fn` must be a
+    module-level function and must copy anything it keeps from `arrays`.
+    Returns the concatenated results in `items` order.
+    `on_chunk(n_items, chunk_results)` is called as each chunk is collected;
+    if it raises, the remaining chunks are cancelled and the error propagates.
+    """
+    if not items:
+        return []
+
+    workers = workers or COMPUTE_WORKERS
+    n_chunks = min(len(items), workers * chunks_per_worker)
+    chunks = [list(chunk) for chunk in np.array_split(np.arange(len(items)), n_chunks)]
+
+    results = []
+    with SharedArrays(arrays) as shared:
+        pool = get_pool(workers)
+        futures = []
+        try:
+            for chunk in chunks:
+                futures.append(pool.submit(_run_chunk, fn, shared.spec, [items[i] for i in chunk], kwargs))
+            for chunk, future in zip(chunks, futures):
+                chunk_results = future.result()
+                results.extend(chunk_results)
+                if on_chunk is not None:
+                    on_chunk(len(chunk), chunk_results)
+        except BaseException as e:
+            for future in futures:
+                future.cancel()
+            # Running chunks still hold the shared block; let them finish before it is unlinked
+            wait(futures)
+            if isinstance(e, BrokenProcessPool):
+                # A dead worker breaks the pool for good; drop it so the next call starts a fresh one
+                shutdown_pool(pool)
+            raise
+    return results
@@ -0,0 +1,128 @@
+"""
+Capital-constrained, event-driven portfolio simulation.
+
+Per-symbol candidate trades (entry / exit bar, price) are merged into one
+time-ordered event stream with a single lexsort over flat arrays: exits
+before entries on the same bar, so proceeds can fund that day's entries, and
+entries on the same bar in universe order. Walking the stream, an entry is
+taken only while fewer than `max_positions` are open and cash covers at least
+one whole share of `position_size` x current equity (marked to market).
+Holdings, cash and the daily equity curve are all array-backed.
+"""
+import numpy as np
+import pandas as pd
+
+from backend.ml import metrics
+
+EXIT, ENTRY = 0, 1
+
+
+def trade_arrays(trades: list, closes: pd.DataFrame) -> dict:
+    """
+    Flat arrays (symbol column, entry / exit row, entry / exit price) for trade
+    dicts as produced by crossover_trades, positioned on the close matrix the
+    trades were computed from (prices are read back unrounded)
+    """
+    rows = {str(d.date()): i for i, d in enumerate(closes.index)}
+    columns = {symbol: i for i, symbol in enumerate(closes.columns)}
+    symbol = np.fromiter((columns[t["symbol"]] for t in trades), dtype=np.int64, count=len(trades))
+    entry_row = np.fromiter((rows[t["entry_date"]] for t in trades), dtype=np.int64, count=len(trades))
+    exit_row = np.fromiter((rows[t["exit_date"]] for t in trades), dtype=np.int64, count=len(trades))
+    values = closes.to_numpy(dtype=float)
+    return {
+        "symbol": symbol,
+        "entry_row": entry_row,
+        "exit_row": exit_row,
+        "entry_price": values[entry_row, symbol],
+        "exit_price": values[exit_row, symbol],
+    }
+
+
+@metrics.timed("backtest")
+def simulate_portfolio(closes: pd.DataFrame, trades: dict, initial_capital: float,
+                       position_size: float, max_positions: int) -> dict:
+    """
+    Run candidate `trades` (see trade_arrays) through one shared cash account.
+    `closes` is the dates x symbols close matrix used to mark positions to market.
+
+    Returns {"taken": bool mask over trades, "shares": shares per trade,
+    "equity" / "cash" / "positions": daily arrays aligned with closes.index}.
+    """
+    n_trades = len(trades["symbol"])
+    n_rows, n_symbols = closes.shape
+    marks = np.nan_to_num(closes.to_numpy(dtype=float))
+
+    # One event stream: (row, exits first, universe column) order
+    event_trade = np.concatenate([np.arange(n_trades), np.arange(n_trades)])
+    event_kind = np.concatenate([np.full(n_trades, EXIT), np.full(n_trades, ENTRY)])
+    event_row = np.concatenate([trades["exit_row"], trades["entry_row"]])
+    event_symbol = np.concatenate([trades["symbol"], trades["symbol"]])
+    order = np.lexsort((event_symbol, event_kind, event_row))
+
+    taken = np.zeros(n_trades, dtype=bool)
+    shares = np.zeros(n_trades)
+    held = np.zeros(n_symbols)
+    open_columns = set()
+    cash = float(initial_capital)
+
+    # Plain lists for the sequential walk; numpy scalar access is slower per element
+    symbol = trades["symbol"].tolist()
+    entry_row = trades["entry_row"].tolist()
+    entry_price = trades["entry_price"].tolist()
+    exit_price = trades["exit_price"].tolist()
+    kinds = event_kind[order].tolist()
+
+    for t, kind in zip(event_trade[order].tolist(), kinds):
+        column = symbol[t]
+        if kind == EXIT:
+            if taken[t]:
+                cash += shares[t] * exit_price[t]
+                held[column] = 0.0
+                open_columns.discard(column)
+            continue
+
+        if len(open_columns) >= max_positions:
+            continue
+        row = entry_row[t]
+        equity = cash + sum(held[c] * marks[row, c] for c in open_columns)
+        quantity = float(np.floor(min(equity * position_size, cash) / entry_price[t]))
+        if quantity < 1:
+            continue
+
+        taken[t] = True
+        shares[t] = quantity
+        held[column] = quantity
+        open_columns.add(column)
+        cash -= quantity * entry_price[t]
+
+    # Daily curves from per-row deltas of the taken trades
+    t_idx = np.flatnonzero(taken)
+    share_delta = np.zeros((n_rows + 1, n_symbols))
+    np.add.at(share_delta, (trades["entry_row"][t_idx], trades["symbol"][t_idx]), shares[t_idx])
+    np.add.at(share_delta, (trades["exit_row"][t_idx], trades["symbol"][t_idx]), -shares[t_idx])
+    holdings = np.cumsum(share_delta[:-1], axis=0)
+
+    cash_delta = np.zeros(n_rows)
+    np.add.at(cash_delta, trades["entry_row"][t_idx], -shares[t_idx] * trades["entry_price"][t_idx])
+    np.add.at(cash_delta, trades["exit_row"][t_idx], shares[t_idx] * trades["exit_price"][t_idx])
+    cash_curve = initial_capital + np.cumsum(cash_delta)
+
+    return {
+        "taken": taken,
+        "shares": shares,
+        "cash": cash_curve,
+        "equity": cash_curve + (holdings * marks).sum(axis=1),
+        "positions": (holdings > 0).sum(axis=1),
+    }
+
+
+def equity_stats(equity: np.ndarray) -> dict:
+    """Max drawdown (%) and annualized Sharpe of a daily equity curve"""
+    if len(equity) < 2:
+        return {"max_drawdown": 0.0, "sharpe": 0.0}
+    peak = np.maximum.accumulate(equity)
+    drawdown = (equity / peak - 1).min() * 100
+    returns = np.diff(equity) / equity[:-1]
+    std = returns.std()
+    sharpe = returns.mean() / std * np.sqrt(252) if std > 0 else 0.0
+    return {"max_drawdown": round(float(drawdown), 2), "sharpe": round(float(sharpe), 2)}
@@ -0,0 +1,242 @@
+"""
+Market data providers.
+
+fetch_stock_data / fetch_many talk to a provider instead of yfinance directly,
+so the analytics can run against Yahoo or fully offline:
+
+- yfinance:  live Yahoo Finance data (default)
+- synthetic: deterministic seeded GBM with bull/bear regime switching, any symbol
+- replay:    CSV/Parquet fixtures from a local directory
+
+Select with MARKET_DATA_PROVIDER=yfinance|synthetic|replay.
+"""
+import os
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from backend.ml import ohlcv_store
+
+EXCHANGE_TZ = "Asia/Kolkata"
+
+
+class MarketDataProvider(ABC):
+    """Base provider: daily OHLCV history for `.NS` tickers"""
+
+    name = "base"
+    # Offline providers are already local and deterministic, so they bypass the OHLCV store
+    offline = False
+
+    @abstractmethod
+    def history(self, ticker: str, period: str = None, start: str = None) -> pd.DataFrame:
+        """OHLCV for `ticker` over `period`, or from `start`; empty when there is none"""
+
+    def download(self, tickers: List[str], period: str = None, start: str = None) -> Dict[str, pd.DataFrame]:
+        """Batch variant of history(); the default just loops"""
+        frames = {}
+        for ticker in tickers:
+            df = self.history(ticker, period=period, start=start)
+            if df is not None and not df.empty:
+                frames[ticker] = df
+        return frames
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def history(self, ticker: str, period: str = None, start: str = None) -> pd.DataFrame:
+        import yfinance as yf
+
+        # Use Ticker object instead of download for better reliability
+        kwargs = {"start": start} if start else {"period": period}
+        return yf.Ticker(ticker).history(**kwargs)
+
+    def download(self, tickers: List[str], period: str = None, start: str = None) -> Dict[str, pd.DataFrame]:
+        import yfinance as yf
+
+        kwargs = {"start": start} if start else {"period": period}
+        data = yf.download(
+            tickers,
+            group_by="ticker",
+            actions=True,
+            auto_adjust=True,
+            ignore_tz=False,
+            threads=True,
+            progress=False,
+            **kwargs
+        )
+        if data is None or data.empty:
+            return {}
+
+        frames = {}
+        available = set(data.columns.get_level_values(0))
+        for ticker in tickers:
+            if ticker not in available:
+                continue
+            df = data[ticker].dropna(how="all")
+            if df.empty:
+                continue
+            # yf.download returns a UTC index; keep the exchange timezone like Ticker.history
+            df.index = df.index.tz_convert(EXCHANGE_TZ)
+            frames[ticker] = df
+        return frames
+
+
+def _slice_local(df: pd.DataFrame, period: str = None, start: str = None) -> pd.DataFrame:
+    """Periods on offline data are relative to the last available bar, not wall-clock time"""
+    if start:
+        return df[df.index >= pd.Timestamp(start, tz=df.index.tz)]
+    return ohlcv_store.slice_period(df, period or "1y", as_of=df.index[-1])
+
+
+@lru_cache(maxsize=8)
+def _business_days(start, end) -> pd.DatetimeIndex:
+    # Localizing a naive range is much faster than bdate_range(tz=...)
+    return pd.bdate_range(start, end).tz_localize(EXCHANGE_TZ)
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Seeded geometric Brownian motion with bull/bear regime switching.
+    Each ticker's path is generated forward from a fixed start date, so a given
+    date always has the same bar regardless of the end date or period requested.
+    """
+
+    name = "synthetic"
+    offline = True
+
+    START_DATE = "2012-01-02"
+
+    # (annual drift, annual vol) per regime, and mean regime length in bars
+    REGIMES = [(0.18, 0.20), (-0.15, 0.35)]
+    MEAN_REGIME_BARS = [120, 60]
+
+    def __init__(self, seed: int = 42, end_date: str = None):
+        self.seed = seed
+        self.end_date = end_date
+
+    def _calendar(self) -> pd.DatetimeIndex:
+        end = pd.Timestamp(self.end_date) if self.end_date else pd.Timestamp.now().normalize()
+        return _business_days(self.START_DATE, end)
+
+    def generate(self, ticker: str, n_bars: int) -> pd.DataFrame:
+        # Independent streams per component keep every prefix of the path stable as n_bars grows
+        seed_seq = np.random.SeedSequence([self.seed, zlib.crc32(ticker.encode())])
+        regime_rng, shock_rng, bar_rng, price_rng = [np.random.default_rng(s) for s in seed_seq.spawn(4)]
+        dt = 1 / 252
+
+        # Regime path: alternating bull/bear segments with geometric durations
+        n_segments = 2 * (n_bars // min(self.MEAN_REGIME_BARS)) + 2
+        first = regime_rng.integers(2)
+        regimes = (first + np.arange(n_segments)) % 2
+        lengths = regime_rng.geometric(1 / np.array(self.MEAN_REGIME_BARS)[regimes])
+        regime = np.repeat(regimes, lengths)[:n_bars]
+        if len(regime) < n_bars:
+            regime = np.pad(regime, (0, n_bars - len(regime)), mode="edge")
+
+        drift = np.array([r[0] for r in self.REGIMES])[regime]
+        vol = np.array([r[1] for r in self.REGIMES])[regime]
+        shocks = shock_rng.standard_normal(n_bars)
+        log_returns = (drift - 0.5 * vol ** 2) * dt + vol * np.sqrt(dt) * shocks
+
+        start_price = np.exp(price_rng.uniform(np.log(50), np.log(5000)))
+        close = start_price * np.exp(np.cumsum(log_returns))
+
+        # Row-wise draws: bar i only depends on the first i rows
+        noise = bar_rng.standard_normal((n_bars, 4))
+        prev_close = np.concatenate([[start_price], close[:-1]])
+        daily_vol = vol * np.sqrt(dt)
+        open_ = prev_close * (1 + 0.25 * noise[:, 0] * daily_vol)
+        high = np.maximum(open_, close) * (1 + 0.5 * np.abs(noise[:, 1]) * daily_vol)
+        low = np.minimum(open_, close) * (1 - 0.5 * np.abs(noise[:, 2]) * daily_vol)
+        volume = np.round(np.exp(np.log(1e6) + 0.5 * noise[:, 3]))
+
+        return pd.DataFrame({
+            "Open": open_,
+            "High": high,
+            "Low": low,
+            "Close": close,
+            "Volume": volume,
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        })
+
+    def history(self, ticker: str, period: str = None, start: str = None) -> pd.DataFrame:
+        calendar = self._calendar()
+        df = self.generate(ticker, len(calendar))
+        df.index = calendar
+        return _slice_local(df, period, start)
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Replays stored fixtures: `<dir>/<SYMBOL>.parquet` or `<dir>/<SYMBOL>.csv`,
+    with or without the `.NS` suffix. CSVs need a Date column plus OHLCV.
+    """
+
+    name = "replay"
+    offline = True
+
+    def __init__(self, data_dir: str):
+        self.data_dir = Path(data_dir)
+        # Parsed fixtures per ticker, owned by this instance (None when there is no fixture)
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _load(self, ticker: str):
+        with self._lock:
+            if ticker in self._frames:
+                return self._frames[ticker]
+        df = self._read(ticker)
+        with self._lock:
+            return self._frames.setdefault(ticker, df)
+
+    def _read(self, ticker: str):
+        for name in (ticker, ticker.replace(".NS", "")):
+            parquet_path = self.data_dir / f"{name}.parquet"
+            csv_path = self.data_dir / f"{name}.csv"
+            if parquet_path.exists():
+                df = pd.read_parquet(parquet_path)
+            elif csv_path.exists():
+                df = pd.read_csv(csv_path, index_col="Date", parse_dates=True)
+            else:
+                continue
+
+            df.index = pd.DatetimeIndex(df.index)
+            if df.index.tz is None:
+                df.index = df.index.tz_localize(EXCHANGE_TZ)
+            return df.sort_index()
+        return None
+
+    def history(self, ticker: str, period: str = None, start: str = None) -> pd.DataFrame:
+        df = self._load(ticker)
+        if df is None or df.empty:
+            return pd.DataFrame()
+        return _slice_local(df, period, start).copy()
+
+
+@lru_cache(maxsize=1)
+def get_provider() -> MarketDataProvider:
+    """Provider selected by MARKET_DATA_PROVIDER (default: yfinance)"""
+    name = os.getenv("MARKET_DATA_PROVIDER", "yfinance").lower()
+
+    if name == "synthetic":
+        return SyntheticProvider(
+            seed=int(os.getenv("SYNTHETIC_SEED", "42")),
+            end_date=os.getenv("SYNTHETIC_END_DATE") or None,
+        )
+    if name == "replay":
+        data_dir = os.getenv("REPLAY_DATA_DIR")
+        if not data_dir:
+            raise ValueError("MARKET_DATA_PROVIDER=replay requires REPLAY_DATA_DIR")
+        return ReplayProvider(data_dir)
+    if name != "yfinance":
+        raise ValueError(f"Unknown MARKET_DATA_PROVIDER: {name}")
+
+    return YFinanceProvider()
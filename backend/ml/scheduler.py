@@ -0,0 +1,72 @@
+"""
+In-process scheduler for end-of-day precomputation.
+
+A daemon thread refreshes stale materialized results at startup and again
+every weekday after NSE close (SCHEDULE_AFTER_CLOSE, default 16:00 IST).
+
+- SCHEDULER_ENABLED=0    disable the thread (results are then materialized on first request)
+- SCHEDULE_BACKTEST=0    only precompute the screen, not the default universe backtest
+"""
+import os
+import threading
+
+import pandas as pd
+
+from backend.ml import materialized
+from backend.ml.providers import EXCHANGE_TZ
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") != "0"
+SCHEDULE_BACKTEST = os.getenv("SCHEDULE_BACKTEST", "1") != "0"
+
+
+class Scheduler:
+    def __init__(self):
+        self.jobs = [("screen", materialized.refresh_screen)]
+        if SCHEDULE_BACKTEST:
+            self.jobs.append(("universe_backtest", materialized.refresh_backtest))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_jobs(self, only_stale: bool = False):
+        for name, job in self.jobs:
+            if only_stale and materialized.is_fresh(materialized.load(name)):
+                print(f"Scheduler: {name} snapshot is current, skipping")
+                continue
+            try:
+                print(f"Scheduler: refreshing {name}...")
+                job()
+                print(f"Scheduler: {name} refreshed")
+            except Exception as e:
+                print(f"Scheduler: {name} refresh failed: {str(e)}")
+
+    def _run(self):
+        self.run_jobs(only_stale=True)
+        while True:
+            wait = (materialized.next_refresh_time() - pd.Timestamp.now(tz=EXCHANGE_TZ)).total_seconds()
+            print(f"Scheduler: next refresh in {wait / 3600:.1f}h")
+            if self._stop.wait(max(wait, 1)):
+                return
+            self.run_jobs()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+scheduler = Scheduler()
+
+
+def start_scheduler():
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+    else:
+        print("Scheduler disabled (SCHEDULER_ENABLED=0)")
+
+
+def stop_scheduler():
+    scheduler.stop()
@@ -0,0 +1,380 @@
+"""
+Incremental indicator state.
+
+Each state object updates in O(1) per new daily close and reproduces the batch
+formulas in features.py (ewm(adjust=False) EMAs, ta's Wilder RSI, 10-day
+rolling std of returns). States serialize to plain dicts so they can be
+persisted and restored instead of recomputed from the full history.
+"""
+import json
+import math
+import os
+import threading
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+INDICATOR_STATE_PATH = Path(os.getenv("INDICATOR_STATE_PATH", BASE_DIR / "data" / "indicator_state.json"))
+
+
+class EMAState:
+    """Exponential moving average, same as Series.ewm(span=span, adjust=False).mean()"""
+
+    def __init__(self, span: int, value: float = None):
+        self.span = span
+        self.alpha = 2 / (span + 1)
+        self.value = value
+
+    def update(self, x: float) -> float:
+        if self.value is None:
+            self.value = x
+        else:
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {"span": self.span, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data["span"], data["value"])
+
+
+class WilderRSIState:
+    """RSI with Wilder smoothing, same as ta.momentum.RSIIndicator(window).rsi()"""
+
+    def __init__(self, window: int = 14, prev_close: float = None,
+                 avg_up: float = None, avg_down: float = None, count: int = 0):
+        self.window = window
+        self.alpha = 1 / window
+        self.prev_close = prev_close
+        self.avg_up = avg_up
+        self.avg_down = avg_down
+        self.count = count
+
+    def update(self, close: float):
+        # The first close has no diff; ta counts it as a zero move
+        diff = 0.0 if self.prev_close is None else close - self.prev_close
+        up = diff if diff > 0 else 0.0
+        down = -diff if diff < 0 else 0.0
+        self.prev_close = close
+
+        if self.avg_up is None:
+            self.avg_up, self.avg_down = up, down
+        else:
+            self.avg_up = self.alpha * up + (1 - self.alpha) * self.avg_up
+            self.avg_down = self.alpha * down + (1 - self.alpha) * self.avg_down
+        self.count += 1
+
+        return self.value
+
+    @property
+    def value(self):
+        if self.count < self.window:
+            return None
+        if self.avg_down == 0:
+            return 100.0
+        return 100 - (100 / (1 + self.avg_up / self.avg_down))
+
+    def to_dict(self) -> dict:
+        return {
+            "window": self.window,
+            "prev_close": self.prev_close,
+            "avg_up": self.avg_up,
+            "avg_down": self.avg_down,
+            "count": self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+
+
+class RollingVolatilityState:
+    """Sample std (ddof=1) of the last `window` daily returns, same as Returns.rolling(window).std()"""
+
+    def __init__(self, window: int = 10, prev_close: float = None, returns: list = None):
+        self.window = window
+        self.prev_close = prev_close
+        self.returns = deque(returns or [], maxlen=window)
+
+    def update(self, close: float):
+        last_return = None
+        if self.prev_close is not None:
+            last_return = (close - self.prev_close) / self.prev_close
+            self.returns.append(last_return)
+        self.prev_close = close
+        return last_return, self.value
+
+    @property
+    def value(self):
+        if len(self.returns) < self.window:
+            return None
+        # Fixed-size window: constant work per update
+        mean = sum(self.returns) / self.window
+        return math.sqrt(sum((r - mean) ** 2 for r in self.returns) / (self.window - 1))
+
+    def to_dict(self) -> dict:
+        return {"window": self.window, "prev_close": self.prev_close, "returns": list(self.returns)}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+
+
+class SymbolIndicators:
+    """
+    All calculate_features indicators for one symbol, updated one close at a time.
+    Re-sending a close for the last seen date replaces that bar instead of appending.
+    Dates are compared as given, so pass one consistent type (IndicatorStateCache
+    uses "YYYY-MM-DD" strings).
+    """
+
+    SLOPE_LAG = 3
+
+    def __init__(self):
+        self.ema_20 = EMAState(20)
+        self.ema_50 = EMAState(50)
+        self.rsi = WilderRSIState(14)
+        self.volatility = RollingVolatilityState(10)
+        self.ema_history = deque(maxlen=self.SLOPE_LAG + 1)  # (ema_20, ema_50) per bar
+        self.last_date = None
+        self.last = None
+        # Scalar state from before the last bar, so a repeated date can replace it
+        self._undo = None
+
+    def update(self, close: float, date=None) -> dict:
+        close = float(close)
+
+        if date is not None and date == self.last_date and self._undo is not None:
+            # Same bar again (e.g. an intraday refresh): roll back, then apply
+            self._rollback()
+        self._undo = self._undo_state()
+
+        ema_20 = self.ema_20.update(close)
+        ema_50 = self.ema_50.update(close)
+        rsi = self.rsi.update(close)
+        returns, volatility = self.volatility.update(close)
+        self.ema_history.append((ema_20, ema_50))
+
+        slope_20 = slope_50 = None
+        if len(self.ema_history) > self.SLOPE_LAG:
+            old_20, old_50 = self.ema_history[0]
+            slope_20 = (ema_20 - old_20) / old_20 if old_20 else None
+            slope_50 = (ema_50 - old_50) / old_50 if old_50 else None
+
+        self.last_date = date
+        self.last = {
+            "date": date,
+            "Close": close,
+            "EMA_20": ema_20,
+            "EMA_50": ema_50,
+            "EMA_20_slope": slope_20,
+            "EMA_50_slope": slope_50,
+            "RSI": rsi,
+            "Returns": returns,
+            "Volatility": volatility,
+            "Signal": 1 if ema_20 > ema_50 else -1 if ema_20 < ema_50 else 0,
+        }
+        return self.last
+
+    @property
+    def ready(self) -> bool:
+        """True once every indicator has enough history (calculate_features would keep the row)"""
+        return self.last is not None and all(v is not None for v in self.last.values())
+
+    def _undo_state(self) -> tuple:
+        rsi, volatility = self.rsi, self.volatility
+        return (
+            self.ema_20.value, self.ema_50.value,
+            rsi.prev_close, rsi.avg_up, rsi.avg_down, rsi.count,
+            volatility.prev_close,
+            # Window entries the next bar pushes out, if the windows are full
+            volatility.returns[0] if volatility.prev_close is not None and len(volatility.returns) == volatility.window else None,
+            self.ema_history[0] if len(self.ema_history) == self.ema_history.maxlen else None,
+            self.last_date, self.last,
+        )
+
+    def _rollback(self):
+        rsi, volatility = self.rsi, self.volatility
+        (self.ema_20.value, self.ema_50.value,
+         rsi.prev_close, rsi.avg_up, rsi.avg_down, rsi.count,
+         prev_close, dropped_return, dropped_ema,
+         self.last_date, self.last) = self._undo
+
+        if prev_close is not None:
+            volatility.returns.pop()
+            if dropped_return is not None:
+                volatility.returns.appendleft(dropped_return)
+        volatility.prev_close = prev_close
+
+        self.ema_history.pop()
+        if dropped_ema is not None:
+            self.ema_history.appendleft(tuple(dropped_ema))
+        self._undo = None
+
+    def to_dict(self) -> dict:
+        return {
+            "ema_20": self.ema_20.to_dict(),
+            "ema_50": self.ema_50.to_dict(),
+            "rsi": self.rsi.to_dict(),
+            "volatility": self.volatility.to_dict(),
+            "ema_history": [list(pair) for pair in self.ema_history],
+            "last_date": self.last_date,
+            "last": self.last,
+            "undo": list(self._undo) if self._undo is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        state = cls()
+        state.ema_20 = EMAState.from_dict(data["ema_20"])
+        state.ema_50 = EMAState.from_dict(data["ema_50"])
+        state.rsi = WilderRSIState.from_dict(data["rsi"])
+        state.volatility = RollingVolatilityState.from_dict(data["volatility"])
+        state.ema_history = deque((tuple(pair) for pair in data["ema_history"]), maxlen=cls.SLOPE_LAG + 1)
+        state.last_date = data["last_date"]
+        state.last = data["last"]
+        state._undo = tuple(data["undo"]) if data.get("undo") is not None else None
+        return state
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame):
+        """Seed from an OHLCV frame (one pass over the closes)"""
+        state = cls()
+        for date, close in zip(_date_keys(df.index), df["Close"].to_numpy(dtype=float)):
+            state.update(close, date)
+        return state
+
+
+def _date_keys(index: pd.DatetimeIndex) -> list:
+    return list(index.strftime("%Y-%m-%d"))
+
+
+def _date_key(date) -> str:
+    return date if isinstance(date, str) else pd.Timestamp(date).strftime("%Y-%m-%d")
+
+
+class IndicatorStateCache:
+    """
+    Per-symbol SymbolIndicators, persisted as one JSON file.
+    Full-universe screens sync it from their close panel and OHLCV store appends
+    feed it new bars, so the latest signals are served without recomputing history.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = Path(path) if path else None
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._states
+
+    def get(self, symbol: str):
+        return self._states.get(symbol)
+
+    def seed(self, symbol: str, df: pd.DataFrame) -> SymbolIndicators:
+        state = SymbolIndicators.from_history(df)
+        with self._lock:
+            self._states[symbol] = state
+        return state
+
+    def seed_many(self, frames: dict):
+        for symbol, df in frames.items():
+            self.seed(symbol, df)
+
+    def drop(self, symbol: str):
+        """Forget a symbol (e.g. its adjusted history changed); the next sync reseeds it"""
+        with self._lock:
+            self._states.pop(symbol, None)
+
+    def update(self, symbol: str, close: float, date=None) -> dict:
+        """Apply one new close; returns the symbol's latest indicator row"""
+        return self.update_many({symbol: close}, date)[symbol]
+
+    def update_many(self, closes: dict, date=None) -> dict:
+        """Apply {symbol: close} for one bar; returns {symbol: latest indicator row}"""
+        date = _date_key(date) if date is not None else None
+        rows = {}
+        with self._lock:
+            for symbol, close in closes.items():
+                state = self._states.get(symbol)
+                if state is None:
+                    state = self._states[symbol] = SymbolIndicators()
+                rows[symbol] = state.update(close, date)
+        return rows
+
+    def append(self, symbol: str, df: pd.DataFrame):
+        """Apply a tracked symbol's new bars (from its last seen date on); untracked symbols are skipped"""
+        state = self._states.get(symbol)
+        if state is None or df is None or df.empty:
+            return
+        for date, close in zip(_date_keys(df.index), df["Close"].to_numpy(dtype=float)):
+            if state.last_date is None or date >= state.last_date:
+                self.update_many({symbol: close}, date)
+
+    def sync(self, closes: pd.DataFrame) -> dict:
+        """
+        Bring the cache up to a dates x symbols close panel. Tracked symbols whose
+        last date is in the panel replay only the bars from that date on, one
+        update_many per bar for all of them; other symbols are seeded from their column.
+        """
+        dates = _date_keys(closes.index)
+        position = {date: i for i, date in enumerate(dates)}
+        values = closes.to_numpy(dtype=float)
+
+        resume = {}
+        seeded = 0
+        for j, symbol in enumerate(closes.columns):
+            state = self._states.get(symbol)
+            i = position.get(state.last_date) if state is not None else None
+            if i is None:
+                self.seed(symbol, closes[symbol].dropna().to_frame("Close"))
+                seeded += 1
+            else:
+                resume[symbol] = (i, j)
+
+        if resume:
+            # The last seen bar is re-applied too: it may have been a partial intraday close
+            for i in range(min(first for first, _ in resume.values()), len(dates)):
+                bar = {
+                    symbol: values[i, j] for symbol, (first, j) in resume.items()
+                    if first <= i and not np.isnan(values[i, j])
+                }
+                if bar:
+                    self.update_many(bar, dates[i])
+        return {"seeded": seeded, "updated": len(resume)}
+
+    def latest(self) -> dict:
+        """Latest indicator row for every symbol whose indicators are warmed up"""
+        with self._lock:
+            return {symbol: state.last for symbol, state in self._states.items() if state.ready}
+
+    def save(self, path: str = None):
+        path = Path(path) if path else self.path
+        with self._lock:
+            data = {symbol: state.to_dict() for symbol, state in self._states.items()}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data))
+        tmp_path.replace(path)
+
+    def load(self, path: str = None):
+        path = Path(path) if path else self.path
+        if not path or not path.exists():
+            return self
+        try:
+            data = json.loads(path.read_text())
+            states = {symbol: SymbolIndicators.from_dict(state) for symbol, state in data.items()}
+        except Exception as e:
+            print(f"Corrupt indicator state {path}, ignoring: {str(e)}")
+            return self
+        with self._lock:
+            self._states = states
+        return self
+
+
+indicator_cache = IndicatorStateCache(INDICATOR_STATE_PATH)
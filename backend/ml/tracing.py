@@ -0,0 +1,341 @@
+"""
+Request traces and on-demand profiling.
+
+A traced request records nested spans: every metrics stage (fetch, features,
+signals, backtest, model, serialize) plus each hop onto the fetch / compute
+pools (io:<fn>, compute:<fn>). Traces are kept in a ring buffer of the last
+TRACE_BUFFER_SIZE requests and browsed at /debug/traces.
+
+Which requests are traced:
+- a TRACE_SAMPLE_RATE fraction of all requests (default 0: none)
+- requests sent with `X-Trace: 1`
+- requests sent with `?profile=1` or `X-Profile: 1`, which are also profiled
+  by a sampling profiler: every PROFILE_INTERVAL_MS it records the stacks of
+  the threads currently running spans of that request, so work spread over the
+  compute pool is captured too. The profile is stored with the trace.
+
+When a request is not traced, a span costs one context variable lookup.
+Forcing a trace / profile and reading /debug/traces require an `X-Debug-Token`
+header matching DEBUG_TOKEN; with no DEBUG_TOKEN set only sampling is active.
+"""
+import asyncio
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from urllib.parse import parse_qs
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+# Spans beyond this are counted but not kept (a 500-symbol screen opens thousands)
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "2000"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_TOP = 30
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN") or None
+
+_trace = contextvars.ContextVar("trace", default=None)
+_span = contextvars.ContextVar("trace_span", default=None)
+
+_traces = deque(maxlen=TRACE_BUFFER_SIZE)
+_traces_lock = threading.Lock()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    def __init__(self, endpoint: str, method: str, path: str, query: str, profile: bool):
+        self.id = uuid.uuid4().hex[:16]
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.query = query
+        self.started_at = datetime.now().isoformat()
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.status = None
+        self.spans = []
+        self.dropped_spans = 0
+        self.profile = None
+        # Threads currently inside one of this trace's spans -> nesting depth
+        self.threads = {}
+        self._lock = threading.Lock()
+        self.sampler = Sampler(self) if profile else None
+
+    def add_span(self, name: str, start: float):
+        """Index of a new open span, or None once TRACE_MAX_SPANS are kept"""
+        with self._lock:
+            if len(self.spans) >= TRACE_MAX_SPANS:
+                self.dropped_spans += 1
+                return None
+            self.spans.append({
+                "id": len(self.spans),
+                "parent": _span.get(),
+                "name": name,
+                "thread": threading.current_thread().name,
+                "start_ms": round((start - self.start) * 1000, 3),
+                "duration_ms": None,
+            })
+            return len(self.spans) - 1
+
+    def enter_thread(self):
+        tid = threading.get_ident()
+        with self._lock:
+            self.threads[tid] = self.threads.get(tid, 0) + 1
+
+    def exit_thread(self):
+        tid = threading.get_ident()
+        with self._lock:
+            depth = self.threads.get(tid, 1) - 1
+            if depth:
+                self.threads[tid] = depth
+            else:
+                self.threads.pop(tid, None)
+
+    def active_threads(self) -> list:
+        with self._lock:
+            return list(self.threads)
+
+    def summary(self) -> dict:
+        return {
+            "trace_id": self.id,
+            "endpoint": self.endpoint,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": len(self.spans),
+            "profiled": self.profile is not None,
+        }
+
+    def to_dict(self) -> dict:
+        # Time per span name; spans include their nested spans, unlike the stage metrics
+        totals = {}
+        for span in self.spans:
+            if span["duration_ms"] is not None:
+                totals[span["name"]] = round(totals.get(span["name"], 0) + span["duration_ms"], 3)
+        return {
+            **self.summary(),
+            "dropped_spans": self.dropped_spans,
+            "span_totals_ms": dict(sorted(totals.items(), key=lambda item: -item[1])),
+            "spans": self.spans,
+            "profile": self.profile,
+        }
+
+
+class Span:
+    __slots__ = ("trace", "name", "index", "start", "token")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+        self.index = None
+
+    def __enter__(self):
+        trace = self.trace
+        self.start = time.perf_counter()
+        self.index = trace.add_span(self.name, self.start)
+        if self.index is not None:
+            self.token = _span.set(self.index)
+        if trace.sampler is not None:
+            trace.enter_thread()
+        return self
+
+    def __exit__(self, *exc):
+        trace = self.trace
+        if trace.sampler is not None:
+            trace.exit_thread()
+        if self.index is not None:
+            trace.spans[self.index]["duration_ms"] = round((time.perf_counter() - self.start) * 1000, 3)
+            _span.reset(self.token)
+        return False
+
+
+def span(name: str):
+    """Context manager recording a span on the current request's trace (no-op when untraced)"""
+    trace = _trace.get()
+    if trace is None:
+        return _NULL_SPAN
+    return Span(trace, name)
+
+
+def call_in_span(name: str, fn, *args, **kwargs):
+    """fn(*args, **kwargs) inside span(name); used for work handed to executor threads"""
+    with span(name):
+        return fn(*args, **kwargs)
+
+
+# ---------- SAMPLING PROFILER ----------
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}:{code.co_firstlineno}"
+
+
+class Sampler(threading.Thread):
+    """Samples the stacks of a trace's active threads until stopped"""
+
+    def __init__(self, trace: Trace):
+        super().__init__(name=f"profiler-{trace.id}", daemon=True)
+        self.trace = trace
+        self.interval = PROFILE_INTERVAL_MS / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            threads = self.trace.active_threads()
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for tid in threads:
+                frame = frames.get(tid)
+                stack = []
+                while frame is not None and len(stack) < 128:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+                    self.samples += 1
+
+    def stop(self) -> dict:
+        self._stop_event.set()
+        self.join()
+        return self.report()
+
+    def report(self) -> dict:
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for label in set(frames):
+                inclusive[label] += count
+
+        def top(counter: Counter) -> list:
+            return [
+                {"function": label, "samples": count,
+                 "pct": round(count / self.samples * 100, 1) if self.samples else 0.0}
+                for label, count in counter.most_common(PROFILE_TOP)
+            ]
+
+        return {
+            "type": "sampling",
+            "interval_ms": PROFILE_INTERVAL_MS,
+            "samples": self.samples,
+            "top_self": top(own),
+            "top_inclusive": top(inclusive),
+            # Collapsed stacks ("frame;frame;frame count"), loadable by flamegraph.pl / speedscope
+            "collapsed": "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()),
+        }
+
+
+# ---------- STORE ----------
+
+def _store(trace: Trace):
+    with _traces_lock:
+        _traces.append(trace)
+
+
+def list_traces(endpoint: str = None, min_duration_ms: float = None, limit: int = 50) -> list:
+    with _traces_lock:
+        traces = list(_traces)
+    traces = [
+        trace for trace in reversed(traces)
+        if (endpoint is None or trace.endpoint == endpoint)
+        and (min_duration_ms is None or (trace.duration_ms or 0) >= min_duration_ms)
+    ]
+    return [trace.summary() for trace in traces[:limit]]
+
+
+def get_trace(trace_id: str):
+    with _traces_lock:
+        for trace in _traces:
+            if trace.id == trace_id:
+                return trace
+    return None
+
+
+def authorized(headers: dict) -> bool:
+    """Forced traces and /debug/* stay off unless DEBUG_TOKEN is configured and sent"""
+    return DEBUG_TOKEN is not None and headers.get("x-debug-token") == DEBUG_TOKEN
+
+
+# ---------- MIDDLEWARE ----------
+
+def _requested(value) -> bool:
+    return value is not None and value.lower() not in ("", "0", "false", "no")
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware deciding per request whether to trace (sample rate or
+    X-Trace) and profile (?profile=1 / X-Profile), and storing finished traces.
+    Traced responses carry an X-Trace-Id header pointing at /debug/traces/{id}.
+    Runs inside MetricsMiddleware, whose endpoint label it reuses.
+    """
+
+    def __init__(self, app, endpoint_var: contextvars.ContextVar):
+        self.app = app
+        self.endpoint_var = endpoint_var
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        profile_flag = headers.get("x-profile")
+        if profile_flag is None and "profile=" in query_string:
+            profile_flag = parse_qs(query_string).get("profile", [None])[-1]
+
+        forced = _requested(profile_flag) or _requested(headers.get("x-trace"))
+        if forced and not authorized(headers):
+            forced = False
+        if not forced and (TRACE_SAMPLE_RATE <= 0 or random.random() >= TRACE_SAMPLE_RATE):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(self.endpoint_var.get(), scope["method"], scope["path"], query_string,
+                      profile=_requested(profile_flag) and authorized(headers))
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-trace-id", trace.id.encode())
+                ]}
+            await send(message)
+
+        token = _trace.set(trace)
+        if trace.sampler is not None:
+            trace.sampler.start()
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        finally:
+            _trace.reset(token)
+            trace.duration_ms = round((time.perf_counter() - trace.start) * 1000, 3)
+            if trace.sampler is not None:
+                # Joining the sampler thread can wait up to one interval; keep that off the event loop
+                trace.profile = await asyncio.to_thread(trace.sampler.stop)
+            if trace.status is None:
+                trace.status = 500
+            _store(trace)
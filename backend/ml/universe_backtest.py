@@ -0,0 +1,243 @@
+import pandas as pd
+
+from backend.ml import parallel
+from backend.ml.portfolio import equity_stats, simulate_portfolio, trade_arrays
+from backend.ml.backtest import crossover_trades
+from backend.ml.features import close_panel, calculate_panel_features, panel_symbol_frame
+from backend.ml.nse500_fetcher import fetch_nse500_symbols
+from backend.ml.universe_screen import fetch_universe
+
+DEFAULT_CONFIG = {
+    "max_stocks": 100,
+    "initial_capital": 100000,
+    "position_size": 0.1,  # 10% per position
+    "stop_loss": 0.05,  # 5% stop loss
+    "take_profit": 0.15,  # 15% take profit
+    "max_positions": 10,  # open positions at once
+    "period": "6mo",
+}
+
+
+def resolve_config(config: dict) -> dict:
+    """Backtest parameters with defaults filled in (execution options like compute_mode excluded)"""
+    return {key: config.get(key, default) for key, default in DEFAULT_CONFIG.items()}
+
+
+def _panel_trades(panel: dict, stocks: list, stop_loss: float, take_profit: float, on_symbol=None) -> list:
+    """
+    Crossover trades for every stock that has a column in the panel.
+    `on_symbol(symbol_trades)` is called after each stock (with [] for skipped ones).
+    """
+    trades = []
+    for stock in stocks:
+        symbol = stock["Symbol"]
+        symbol_trades = []
+        if symbol in panel["valid"].columns:
+            df = panel_symbol_frame(panel, symbol)
+            if not df.empty:
+                symbol_trades = crossover_trades(
+                    df,
+                    symbol,
+                    stop_loss=stop_loss,
+                    take_profit=take_profit,
+                    sector=stock.get("Industry", "Unknown")
+                )
+
+        trades.extend(symbol_trades)
+        if on_symbol is not None:
+            on_symbol(symbol_trades)
+    return trades
+
+
+def _shared_chunk_trades(arrays: dict, items: list, tz, stop_loss: float, take_profit: float) -> list:
+    """Process-pool worker: indicators and trades for a chunk of (column, stock) pairs"""
+    columns = [column for column, _ in items]
+    stocks = [stock for _, stock in items]
+
+    index = pd.DatetimeIndex(arrays["dates"].astype("datetime64[ns]"))
+    if tz is not None:
+        index = index.tz_localize("UTC").tz_convert(tz)
+    # Fancy indexing copies the chunk out of shared memory
+    closes = pd.DataFrame(arrays["close"][:, columns], index=index, columns=[s["Symbol"] for s in stocks])
+
+    return _panel_trades(calculate_panel_features(closes), stocks, stop_loss, take_profit)
+
+
+def _process_trades(closes: pd.DataFrame, stocks: list, stop_loss: float, take_profit: float, on_chunk=None) -> list:
+    """Split the universe by symbol across the process pool, sharing the close matrix"""
+    position = {symbol: i for i, symbol in enumerate(closes.columns)}
+    items = [(position[stock["Symbol"]], stock) for stock in stocks if stock["Symbol"] in position]
+
+    arrays = {
+        "close": closes.to_numpy(dtype=float),
+        "dates": closes.index.as_unit("ns").asi8,  # UTC nanoseconds for tz-aware indexes
+    }
+    return parallel.map_shared(
+        _shared_chunk_trades,
+        arrays,
+        items,
+        tz=str(closes.index.tz) if closes.index.tz is not None else None,
+        stop_loss=stop_loss,
+        take_profit=take_profit,
+        on_chunk=on_chunk
+    )
+
+
+def backtest_universe(config: dict, progress=None, frames: dict = None):
+    """
+    EMA 20/50 crossover backtest with stop loss / take profit across a slice of the NSE 500.
+    All symbols are fetched in one batch and read their indicators from one panel.
+    With compute_mode "process" (or UNIVERSE_COMPUTE_MODE=process) the indicator
+    and trade computation is split by symbol across a process pool.
+    Every symbol's trades then run through one portfolio with shared cash and at
+    most max_positions open at once (see ml/portfolio.py).
+    `progress(symbols_done, total, trades_so_far)` is called as symbols finish;
+    an exception raised from it aborts the backtest.
+    `frames` are prefetched price frames (see fetch_universe).
+    """
+    stocks = fetch_nse500_symbols()
+    params = resolve_config(config)
+    max_stocks = params["max_stocks"]
+    initial_capital = params["initial_capital"]
+    position_size = params["position_size"]
+    stop_loss = params["stop_loss"]
+    take_profit = params["take_profit"]
+    max_positions = params["max_positions"]
+    compute_mode = config.get("compute_mode", parallel.COMPUTE_MODE)
+    
+    # Limit stocks to test
+    stocks = stocks[:max_stocks]
+    print(f"Starting universe backtest on {len(stocks)} stocks...")
+
+    counter = {"done": 0, "trades": 0}
+
+    def report(n_symbols: int, trades: list):
+        counter["done"] += n_symbols
+        counter["trades"] += len(trades)
+        if progress is not None:
+            progress(counter["done"], len(stocks), counter["trades"])
+
+    report(0, [])
+
+    # One batched download for all symbols
+    frames = fetch_universe(stocks, period=params["period"], frames=frames)
+    closes = close_panel(frames)
+    
+    all_trades = []
+    if frames and compute_mode == "process":
+        try:
+            # Symbols without enough history never reach the pool
+            report(len(stocks) - sum(1 for s in stocks if s["Symbol"] in frames), [])
+            all_trades = _process_trades(closes, stocks, stop_loss, take_profit, on_chunk=report)
+        except Exception as e:
+            print(f"Process pool failed, computing in-process: {str(e)}")
+            compute_mode = "serial"
+            counter.update(done=0, trades=0)
+    
+    if frames and compute_mode != "process":
+        panel = calculate_panel_features(closes)
+        all_trades = _panel_trades(panel, stocks, stop_loss, take_profit, on_symbol=lambda trades: report(1, trades))
+    
+    # Calculate portfolio metrics
+    if not all_trades:
+        return {
+            "status": "completed",
+            "message": "No trades generated. Try different parameters or more stocks.",
+            "total_trades": 0,
+            "win_rate": 0,
+            "total_return": 0,
+            "final_capital": initial_capital,
+            "stocks_tested": len(stocks),
+            "trade_details": []
+        }
+
+    # Shared-cash portfolio over every symbol's signals
+    arrays = trade_arrays(all_trades, closes)
+    portfolio = simulate_portfolio(closes, arrays, initial_capital, position_size, max_positions)
+    signals = len(all_trades)
+    all_trades = [
+        {**trade, "shares": int(shares), "pnl": round(shares * (trade_exit - trade_entry), 2)}
+        for trade, taken, shares, trade_entry, trade_exit in zip(
+            all_trades, portfolio["taken"], portfolio["shares"], arrays["entry_price"], arrays["exit_price"]
+        )
+        if taken
+    ]
+    if not all_trades:
+        return {
+            "status": "completed",
+            "message": "No signal could be taken with the available capital. Try a larger position size or capital.",
+            "total_trades": 0,
+            "signals": signals,
+            "win_rate": 0,
+            "total_return": 0,
+            "final_capital": initial_capital,
+            "stocks_tested": len(stocks),
+            "trade_details": []
+        }
+    
+    # Calculate returns
+    winning_trades = [t for t in all_trades if t["profit_pct"] > 0]
+    losing_trades = [t for t in all_trades if t["profit_pct"] < 0]
+    
+    win_rate = (len(winning_trades) / len(all_trades) * 100) if all_trades else 0
+    
+    final_capital = float(portfolio["equity"][-1])
+    total_return = (final_capital - initial_capital) / initial_capital * 100
+    
+    avg_win = sum(t["profit_pct"] for t in winning_trades) / len(winning_trades) if winning_trades else 0
+    avg_loss = sum(t["profit_pct"] for t in losing_trades) / len(losing_trades) if losing_trades else 0
+    
+    # Best and worst trades
+    best_trade = max(all_trades, key=lambda x: x["profit_pct"]) if all_trades else None
+    worst_trade = min(all_trades, key=lambda x: x["profit_pct"]) if all_trades else None
+    
+    # Sector performance
+    sector_performance = {}
+    for trade in all_trades:
+        sector = trade["sector"]
+        if sector not in sector_performance:
+            sector_performance[sector] = {"trades": 0, "total_pnl": 0}
+        sector_performance[sector]["trades"] += 1
+        sector_performance[sector]["total_pnl"] += trade["profit_pct"]
+    
+    top_sectors = sorted(
+        [{"sector": k, "avg_return": v["total_pnl"]/v["trades"], "trades": v["trades"]} 
+         for k, v in sector_performance.items()],
+        key=lambda x: x["avg_return"],
+        reverse=True
+    )[:5]
+    
+    return {
+        "status": "success",
+        "message": f"Successfully backtested {len(stocks)} stocks",
+        "total_trades": len(all_trades),
+        "signals": signals,
+        "skipped_signals": signals - len(all_trades),
+        "win_rate": round(win_rate, 2),
+        "total_return": round(total_return, 2),
+        "final_capital": round(final_capital, 2),
+        "initial_capital": initial_capital,
+        "max_positions": max_positions,
+        **equity_stats(portfolio["equity"]),
+        "stocks_tested": len(stocks),
+        "winning_trades": len(winning_trades),
+        "losing_trades": len(losing_trades),
+        "avg_win": round(avg_win, 2),
+        "avg_loss": round(avg_loss, 2),
+        "best_trade": {
+            "symbol": best_trade["symbol"],
+            "profit_pct": best_trade["profit_pct"]
+        } if best_trade else None,
+        "worst_trade": {
+            "symbol": worst_trade["symbol"],
+            "profit_pct": worst_trade["profit_pct"]
+        } if worst_trade else None,
+        "top_sectors": top_sectors,
+        "equity_curve": {
+            "date": closes.index.strftime("%Y-%m-%d").tolist(),
+            "equity": [round(v, 2) for v in portfolio["equity"].tolist()],
+            "cash": [round(v, 2) for v in portfolio["cash"].tolist()],
+            "positions": portfolio["positions"].tolist()
+        },
+        "trade_details": sorted(all_trades, key=lambda x: x["profit_pct"], reverse=True)[:20]  # Top 20 trades
+    }
@@ -0,0 +1,209 @@
+"""
+Pooled cross-sectional crossover model.
+
+One XGBoost classifier is trained on the stacked feature rows of every symbol
+in a universe panel, instead of one tiny model per symbol. Features are
+scale-free (ratios, slopes, RSI, returns) so rows from a 50-rupee stock and a
+5000-rupee stock are comparable, with optional sector / symbol categorical
+encodings. The latest row of every symbol is scored in one predict_proba call.
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from xgboost import XGBClassifier
+
+from backend.ml import metrics, model_registry
+
+POOLED_FEATURES = [
+    'EMA_gap', 'Close_EMA_20', 'Close_EMA_50',
+    'EMA_20_slope', 'EMA_50_slope', 'RSI', 'Returns', 'Volatility'
+]
+
+UNIVERSE_MODEL_PARAMS = {
+    'n_estimators': 150,
+    'max_depth': 4,
+    'learning_rate': 0.1,
+    'random_state': 42,
+    'tree_method': 'hist',
+    'enable_categorical': True,
+    'verbosity': 0
+}
+
+# Categorical encodings to add: "sector", "symbol" (comma separated)
+ENCODINGS = [e for e in os.getenv("UNIVERSE_MODEL_ENCODINGS", "sector").split(",") if e]
+
+FEATURE_HASH = hashlib.sha1(json.dumps(
+    {"features": POOLED_FEATURES, "params": UNIVERSE_MODEL_PARAMS, "encodings": ENCODINGS},
+    sort_keys=True
+).encode()).hexdigest()[:12]
+
+# Registry entry name; per-symbol entries are keyed by `.NS` ticker, so this can't collide
+REGISTRY_KEY = "UNIVERSE"
+
+MIN_TRAIN_ROWS = 500
+
+
+def universe_hash(symbols) -> str:
+    """Identifies the symbol set a pooled model was trained on"""
+    return hashlib.sha1(",".join(sorted(symbols)).encode()).hexdigest()[:12]
+
+
+def _feature_arrays(panel: dict) -> dict:
+    """Scale-free dates x symbols feature matrices from a panel"""
+    close = panel['Close'].to_numpy()
+    ema_20 = panel['EMA_20'].to_numpy()
+    ema_50 = panel['EMA_50'].to_numpy()
+    arrays = {
+        'EMA_gap': ema_20 / ema_50 - 1,
+        'Close_EMA_20': close / ema_20 - 1,
+        'Close_EMA_50': close / ema_50 - 1,
+    }
+    for name in ['EMA_20_slope', 'EMA_50_slope', 'RSI', 'Returns', 'Volatility']:
+        arrays[name] = panel[name].to_numpy()
+    return arrays
+
+
+def _frame(arrays: dict, rows: np.ndarray, cols: np.ndarray, symbols: pd.Index,
+           sectors: dict, categories: dict) -> pd.DataFrame:
+    """Feature rows for (row, col) cells, with categorical encodings"""
+    X = pd.DataFrame({name: arrays[name][rows, cols] for name in POOLED_FEATURES})
+    col_symbols = symbols[cols]
+    if 'sector' in categories:
+        X['sector'] = pd.Categorical(
+            [sectors.get(symbol, "Unknown") for symbol in col_symbols],
+            categories=categories['sector']
+        )
+    if 'symbol' in categories:
+        X['symbol'] = pd.Categorical(col_symbols, categories=categories['symbol'])
+    return X
+
+
+@metrics.timed("model")
+def train_universe_model(panel: dict, sectors: dict = None, encodings: list = None) -> dict:
+    """
+    Fit the pooled model on every valid (date, symbol) row of the panel.
+    `sectors` maps symbol -> sector. Returns a bundle for predict_universe().
+    """
+    sectors = sectors or {}
+    encodings = ENCODINGS if encodings is None else encodings
+    symbols = panel['valid'].columns
+
+    categories = {}
+    if 'sector' in encodings:
+        categories['sector'] = sorted(set(sectors.get(symbol, "Unknown") for symbol in symbols))
+    if 'symbol' in encodings:
+        categories['symbol'] = list(symbols)
+
+    rows, cols = np.nonzero(panel['valid'].to_numpy())
+    if len(rows) < MIN_TRAIN_ROWS:
+        raise ValueError(f"Not enough data. Have {len(rows)} rows, need at least {MIN_TRAIN_ROWS}")
+
+    X = _frame(_feature_arrays(panel), rows, cols, symbols, sectors, categories)
+    y_target = panel['Target'].to_numpy()[rows, cols]
+
+    # Original labels, in the order of the model's class indices
+    classes = [int(c) for c in np.unique(y_target)]
+    if len(classes) < 2:
+        raise ValueError("Only one class in the pooled labels")
+    y_mapped = np.searchsorted(classes, y_target)
+
+    model_params = dict(UNIVERSE_MODEL_PARAMS)
+    if len(classes) == 3:
+        model_params['objective'] = 'multi:softprob'
+        model_params['num_class'] = 3
+    else:
+        model_params['objective'] = 'binary:logistic'
+
+    print(f"Training pooled model on {len(X)} rows from {len(symbols)} symbols...")
+    model = XGBClassifier(**model_params)
+    model.fit(X, y_mapped)
+
+    return {"kind": "pooled_xgb", "model": model, "classes": classes, "categories": categories}
+
+
+@metrics.timed("model")
+def predict_universe(bundle: dict, panel: dict, sectors: dict = None) -> pd.DataFrame:
+    """
+    Score the latest valid row of every symbol in one predict_proba call.
+    Returns a symbols x [prediction, confidence, p_<label>...] frame.
+    """
+    valid = panel['valid'].to_numpy()
+    has_valid = valid.any(axis=0)
+    cols = np.flatnonzero(has_valid)
+    rows = (len(valid) - 1 - np.argmax(valid[::-1], axis=0))[has_valid]
+    symbols = panel['valid'].columns
+
+    if len(cols) == 0:
+        return pd.DataFrame(columns=['prediction', 'confidence'])
+
+    X = _frame(_feature_arrays(panel), rows, cols, symbols, sectors or {}, bundle["categories"])
+    probabilities = bundle["model"].predict_proba(X)
+
+    classes = np.array(bundle["classes"])
+    result = pd.DataFrame(index=symbols[cols])
+    result['prediction'] = classes[np.argmax(probabilities, axis=1)]
+    result['confidence'] = probabilities.max(axis=1)
+    for i, label in enumerate(bundle["classes"]):
+        result[f"p_{label}"] = probabilities[:, i]
+    return result
+
+
+def get_universe_model(panel: dict, sectors: dict = None):
+    """
+    Pooled model for this panel from the model registry, retrained only when the
+    panel has a newer bar or a different symbol set than the stored model, or the
+    stored model has expired. Only call this with a full-universe panel: the
+    result replaces the one stored model. Returns (bundle, meta, cached).
+    """
+    window_end = str(panel['valid'].index[panel['valid'].any(axis=1).to_numpy()][-1].date())
+    universe = universe_hash(panel['valid'].columns)
+
+    def current(meta):
+        return model_registry.is_current(meta, window_end, FEATURE_HASH) and meta.get("universe") == universe
+
+    bundle, meta = model_registry.load(REGISTRY_KEY)
+    if current(meta):
+        metrics.cache_result("universe_model", True)
+        return bundle, meta, True
+
+    with model_registry.model_lock(REGISTRY_KEY):
+        bundle, meta = model_registry.load(REGISTRY_KEY)
+        if current(meta):
+            metrics.cache_result("universe_model", True)
+            return bundle, meta, True
+
+        metrics.cache_result("universe_model", False)
+
+        started = time.perf_counter()
+        bundle = train_universe_model(panel, sectors)
+        meta = {
+            "version": model_registry.MODEL_VERSION,
+            "feature_hash": FEATURE_HASH,
+            "kind": bundle["kind"],
+            "window_start": str(panel['valid'].index[0].date()),
+            "window_end": window_end,
+            "symbols": int(panel['valid'].any(axis=0).sum()),
+            "universe": universe,
+            "rows": int(panel['valid'].to_numpy().sum()),
+            "trained_at": time.time(),
+            "train_seconds": round(time.perf_counter() - started, 3),
+        }
+        model_registry.save(REGISTRY_KEY, bundle, meta)
+        print(f"Trained pooled model on {meta['rows']} rows in {meta['train_seconds']}s")
+        return bundle, meta, False
+
+
+def stored_universe_model():
+    """
+    (bundle, meta) of the stored pooled model if it is still usable, without
+    training; for callers that only see part of the universe at a time.
+    """
+    bundle, meta = model_registry.load(REGISTRY_KEY)
+    # Models stored without a universe hash may have been trained on a partial screen
+    if model_registry.is_current(meta, feature_hash=FEATURE_HASH) and meta.get("universe"):
+        return bundle, meta
+    return None, None
@@ -1,61 +1,226 @@
-from concurrent.futures import ThreadPoolExecutor
+import os
 from datetime import datetime
 
-from backend.ml.data_fetch import fetch_stock_data
-from backend.ml.features import calculate_features
+from backend.ml.data_fetch import fetch_many
+from backend.ml.features import close_panel, calculate_panel_features, panel_latest
+from backend.ml.model_xgb import PREDICTION_LABELS
 from backend.ml.nse500_fetcher import fetch_nse500_symbols
+from backend.ml.streaming import indicator_cache
+from backend.ml.universe_model import get_universe_model, predict_universe, stored_universe_model
 
+MIN_BARS = 60  # Need at least 60 days for EMA 50
+
+SCREEN_PERIOD = "3mo"
+
+# Symbols fetched and classified per step of the streaming screen
+STREAM_CHUNK_SIZE = 50
+
+# Attach pooled-model confidence to screen results (UNIVERSE_MODEL=0 to disable)
+WITH_MODEL = os.getenv("UNIVERSE_MODEL", "1") != "0"
+
+
+def classify(ema_20: float, ema_50: float) -> str:
+    if ema_20 > ema_50:
+        return "bullish"
+    elif ema_20 < ema_50:
+        return "bearish"
+    return "neutral"
+
+
+def fetch_universe(stocks: list, period: str, frames: dict = None) -> dict:
+    """
+    Fetch every symbol in one batch, keeping the ones with enough history.
+    `frames` (fetch_many output, e.g. fetched ahead on the API's io pool) skips the fetch.
+    """
+    symbols = [stock["Symbol"] for stock in stocks]
+    if frames is None:
+        frames = fetch_many(symbols, period=period)
+    return {symbol: frames[symbol] for symbol in symbols if symbol in frames and len(frames[symbol]) >= MIN_BARS}
 
-def screen_universe(
-    ma_type="EMA",
-    short_period=20,
-    long_period=50,
-    max_stocks=50,
-    max_workers=8
-):
-    stocks = fetch_nse500_symbols()[:max_stocks]
 
-    bullish, bearish, neutral = [], [], []
+def build_universe_panel(stocks: list, period: str, frames: dict = None):
+    """
+    Fetch every symbol in one batch (unless `frames` are given) and compute the
+    indicator panel for the ones with enough history. Returns (frames, panel).
+    """
+    frames = fetch_universe(stocks, period, frames)
+    panel = calculate_panel_features(close_panel(frames)) if frames else None
+    return frames, panel
 
-    def process(stock):
-        symbol = stock["Symbol"]
-        sector = stock.get("Industry", "Unknown")
 
-        try:
-            df = fetch_stock_data(symbol)
-            if df is None or len(df) < 30:
-                return None
+def result_item(stock: dict, row: dict, scores: dict) -> dict:
+    """One screen result: latest EMAs / close, plus the pooled-model score when available"""
+    item = {
+        "symbol": stock["Symbol"],
+        "sector": stock.get("Industry", "Unknown"),
+        "ema_20": round(float(row["EMA_20"]), 2),
+        "ema_50": round(float(row["EMA_50"]), 2),
+        "close": round(float(row["Close"]), 2)
+    }
+    score = scores.get(stock["Symbol"])
+    if score is not None:
+        item["model_prediction"] = PREDICTION_LABELS[int(score["prediction"])]
+        item["model_confidence"] = round(float(score["confidence"]), 2)
+    return item
+
+
+def score_universe(panel: dict, stocks: list, full_universe: bool = True):
+    """
+    Pooled-model scores for every symbol in the panel: (scores dict, model meta) or ({}, None).
+    Only a full-universe panel may train (and replace) the pooled model; a partial
+    one is scored with the stored model, or not at all when there is none.
+    """
+    sectors = {stock["Symbol"]: stock.get("Industry", "Unknown") for stock in stocks}
+    try:
+        if full_universe:
+            bundle, meta, cached = get_universe_model(panel, sectors)
+        else:
+            bundle, meta = stored_universe_model()
+            if bundle is None:
+                print("No stored pooled model for a partial screen, screening without confidence")
+                return {}, None
+            cached = True
+        scores = predict_universe(bundle, panel, sectors).to_dict("index")
+    except Exception as e:
+        print(f"Pooled model unavailable, screening without confidence: {str(e)}")
+        return {}, None
+
+    return scores, {
+        "kind": meta["kind"],
+        "window_start": meta["window_start"],
+        "window_end": meta["window_end"],
+        "rows": meta["rows"],
+        "trained_at": datetime.fromtimestamp(meta["trained_at"]).isoformat(),
+        "cached": cached
+    }
+
 
-            df = calculate_features(
-                df,
-                ma_type=ma_type,
-                short_period=short_period,
-                long_period=long_period
-            )
+def screen_universe(max_stocks: int = 500, period: str = SCREEN_PERIOD, with_model: bool = None,
+                    frames: dict = None):
+    """
+    Screen the NSE 500 universe into bullish / bearish / neutral buckets by EMA 20 vs EMA 50.
+    All symbols are fetched in one batch and their indicators come from one panel pass.
+    With the pooled model enabled, every result also carries the model's
+    prediction and confidence from one batched predict_proba call.
+    Full-universe screens also sync the streaming indicator cache from their panel.
+    `frames` are prefetched price frames (see fetch_universe).
+    """
+    with_model = WITH_MODEL if with_model is None else with_model
+    universe = fetch_nse500_symbols()
+    stocks = universe[:max_stocks]
+    full_universe = len(stocks) == len(universe)
+    print(f"Screening {len(stocks)} stocks...")
 
-            latest = df.iloc[-1]
+    _, panel = build_universe_panel(stocks, period, frames)
+    latest = panel_latest(panel).to_dict("index") if panel is not None else {}
+    scores, model_meta = (
+        score_universe(panel, stocks, full_universe=full_universe)
+        if with_model and panel is not None else ({}, None)
+    )
+    if full_universe and panel is not None:
+        indicator_cache.sync(panel["Close"])
 
-            if latest["EMA_20"] > latest["EMA_50"]:
-                bullish.append({"symbol": symbol, "sector": sector})
-            elif latest["EMA_20"] < latest["EMA_50"]:
-                bearish.append({"symbol": symbol, "sector": sector})
-            else:
-                neutral.append({"symbol": symbol, "sector": sector})
+    response = bucket_results(stocks, latest, scores)
+    if model_meta is not None:
+        response["model"] = model_meta
+    return response
 
-        except:
-            return None
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        executor.map(process, stocks)
+def screen_latest(max_stocks: int = 500) -> dict:
+    """
+    Screen from the streaming indicator cache: each symbol's latest bar as
+    synced by full-universe screens and OHLCV store appends, with no history
+    recomputed. Symbols the cache does not track yet are left out.
+    """
+    stocks = fetch_nse500_symbols()[:max_stocks]
+    latest = indicator_cache.latest()
+    response = bucket_results(stocks, latest, {})
+    dates = [latest[stock["Symbol"]]["date"] for stock in stocks if stock["Symbol"] in latest]
+    response["as_of"] = max(dates) if dates else None
+    response["served_from"] = "indicator_state"
+    return response
+
+
+def bucket_results(stocks: list, latest: dict, scores: dict) -> dict:
+    """Screen response for {symbol: latest indicator row}, in universe order"""
+    results = {
+        "bullish": [],
+        "bearish": [],
+        "neutral": []
+    }
+
+    for stock in stocks:
+        row = latest.get(stock["Symbol"])
+        if row is None:
+            continue
+
+        results[classify(row["EMA_20"], row["EMA_50"])].append(result_item(stock, row, scores))
+
+    print(f"Screening complete: {len(results['bullish'])} bullish, {len(results['bearish'])} bearish, {len(results['neutral'])} neutral")
 
     return {
-        "bullish": bullish,
-        "bearish": bearish,
-        "neutral": neutral,
+        "bullish": results["bullish"],
+        "bearish": results["bearish"],
+        "neutral": results["neutral"],
         "counts": {
-            "bullish": len(bullish),
-            "bearish": len(bearish),
-            "neutral": len(neutral),
+            "bullish": len(results["bullish"]),
+            "bearish": len(results["bearish"]),
+            "neutral": len(results["neutral"])
         },
         "timestamp": datetime.now().isoformat()
     }
+
+
+def iter_screen_universe(max_stocks: int = 500, period: str = SCREEN_PERIOD, with_model: bool = None,
+                         chunk_size: int = STREAM_CHUNK_SIZE):
+    """
+    Streaming screen: fetches and classifies the universe chunk by chunk and
+    yields events as soon as each chunk is done:
+      {"event": "start", "total": N}
+      {"event": "result", "bucket": ..., "item": {...}, "counts": {...}, "done": i, "total": N}
+      {"event": "summary", "counts": {...}, "total": N, "timestamp": ...}
+    Model confidence comes from the stored pooled model, if there is a usable
+    one; it is never trained mid-stream on a partial universe.
+    """
+    with_model = WITH_MODEL if with_model is None else with_model
+    stocks = fetch_nse500_symbols()[:max_stocks]
+    total = len(stocks)
+    print(f"Streaming screen of {total} stocks...")
+
+    bundle, _ = stored_universe_model() if with_model else (None, None)
+    sectors = {stock["Symbol"]: stock.get("Industry", "Unknown") for stock in stocks}
+
+    yield {"event": "start", "total": total}
+
+    counts = {"bullish": 0, "bearish": 0, "neutral": 0}
+    done = 0
+    for start in range(0, total, chunk_size):
+        chunk = stocks[start:start + chunk_size]
+        _, panel = build_universe_panel(chunk, period)
+        latest = panel_latest(panel).to_dict("index") if panel is not None else {}
+
+        scores = {}
+        if bundle is not None and panel is not None:
+            try:
+                scores = predict_universe(bundle, panel, sectors).to_dict("index")
+            except Exception as e:
+                print(f"Pooled model scoring failed for chunk: {str(e)}")
+
+        for stock in chunk:
+            done += 1
+            row = latest.get(stock["Symbol"])
+            if row is None:
+                continue
+
+            bucket = classify(row["EMA_20"], row["EMA_50"])
+            counts[bucket] += 1
+            yield {
+                "event": "result",
+                "bucket": bucket,
+                "item": result_item(stock, row, scores),
+                "counts": dict(counts),
+                "done": done,
+                "total": total
+            }
+
+    yield {"event": "summary", "counts": counts, "total": total, "timestamp": datetime.now().isoformat()}
@@ -0,0 +1,393 @@
+"""
+Walk-forward (rolling-window) validation at universe scale.
+
+History is split into train / test windows on the shared panel calendar
+(rolling, or expanding with expanding=True). Two evaluations:
+
+- "strategy": every MA crossover combo in `param_grid` is simulated on every
+  window; for each fold the combo ranked best on the train window (aggregated
+  across symbols) is scored on the following test window.
+- "model": the XGBoost crossover model (model_xgb.train) is fitted on each
+  symbol's train window and its predictions are scored against Target on the
+  test window, next to the persistence baseline (today's Signal).
+
+Work is scheduled per symbol: each symbol's indicators / signal matrices are
+computed once from the full history (all of them are causal, so slicing them
+into windows does not leak) and reused by every fold. With fewer symbols than
+pool slots, a symbol's folds are split into groups so folds still run in
+parallel. In process mode the close matrix is shared with the workers
+(see ml/parallel.py).
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from backend.ml import parallel
+from backend.ml.backtest import simulate_exit_rules
+from backend.ml.engine import MACache, _signal_matrices, _strategy_combos
+from backend.ml.features import calculate_panel_features, close_panel, panel_symbol_frame
+from backend.ml.model_xgb import FEATURE_COLS, train
+from backend.ml.nse500_fetcher import fetch_nse500_symbols
+from backend.ml.universe_screen import fetch_universe
+
+DEFAULT_CONFIG = {
+    "kind": "strategy",
+    "max_stocks": 50,
+    "symbols": None,  # explicit symbol list instead of the first max_stocks of the NSE 500
+    "period": "2y",
+    "train_bars": 126,
+    "test_bars": 42,
+    "step_bars": None,  # defaults to test_bars (non-overlapping test windows)
+    "expanding": False,
+    "param_grid": {
+        "strategy_type": ["double"],
+        "ma_type": ["EMA"],
+        "short_period": [5, 10, 20],
+        "long_period": [30, 50, 100],
+    },
+    "exit_config": {"stop_loss_pct": 5, "take_profit_pct": 15, "max_holding_days": None},
+    "rank_by": "total_return_pct",
+}
+
+KINDS = ["strategy", "model"]
+RANK_BY = ["total_return_pct", "avg_profit_pct", "win_rate_pct"]
+
+# Per (fold, window, combo) sums collected from the strategy workers
+STATS = ["symbols", "trades", "wins", "sum_total_return_pct", "sum_trade_return_pct"]
+TRAIN, TEST = 0, 1
+
+# Model folds need enough rows for train()'s 30-row minimum after its 2-row label trim
+MIN_TRAIN_ROWS = 40
+MIN_TEST_ROWS = 5
+
+
+def resolve_config(config: dict) -> dict:
+    """Walk-forward parameters with defaults filled in (execution options like compute_mode excluded)"""
+    return {key: config.get(key, default) for key, default in DEFAULT_CONFIG.items()}
+
+
+def rolling_folds(n_rows: int, train_bars: int, test_bars: int, step_bars: int = None,
+                  expanding: bool = False) -> list:
+    """(train_start, train_end, test_start, test_end) row ranges, ends exclusive"""
+    step_bars = test_bars if step_bars is None else step_bars
+    if min(train_bars, test_bars, step_bars) < 1:
+        raise ValueError("train_bars, test_bars and step_bars must be at least 1")
+    folds = []
+    start = 0
+    while start + train_bars + test_bars <= n_rows:
+        train_start = 0 if expanding else start
+        train_end = start + train_bars
+        folds.append((train_start, train_end, train_end, train_end + test_bars))
+        start += step_bars
+    return folds
+
+
+def _bar_index(arrays: dict, tz) -> pd.DatetimeIndex:
+    index = pd.DatetimeIndex(arrays["dates"].astype("datetime64[ns]"))
+    if tz is not None:
+        index = index.tz_localize("UTC").tz_convert(tz)
+    return index
+
+
+def _strategy_chunk(arrays: dict, items: list, folds: list, combos: list, exit_config: dict) -> list:
+    """
+    Worker: per (fold, window, combo) STATS sums for a chunk of
+    (column, symbol, fold_ids) items. Signal matrices are built once per symbol.
+    """
+    k = len(combos)
+    stats = np.zeros((len(folds), 2, k, len(STATS)))
+    stop_loss = np.full(k, exit_config["stop_loss_pct"], dtype=float)
+    take_profit = np.full(k, exit_config["take_profit_pct"], dtype=float)
+    max_hold = [exit_config.get("max_holding_days")] * k
+
+    cache = MACache()
+    signals = {}
+    for column, symbol, fold_ids in items:
+        if symbol not in signals:
+            close = arrays["close"][:, column]
+            rows = np.flatnonzero(~np.isnan(close))
+            # Integer panel-row index: MACache / calculate_ma only need Close and the index span
+            df = pd.DataFrame({"Close": close[rows]}, index=rows)
+            entry, exit_ = _signal_matrices(df, symbol, combos, cache)
+            signals[symbol] = (rows, close[rows], entry, exit_)
+
+        rows, close, entry, exit_ = signals[symbol]
+        for f in fold_ids:
+            for window, (start, end) in ((TRAIN, folds[f][0:2]), (TEST, folds[f][2:4])):
+                a, b = np.searchsorted(rows, [start, end])
+                if b - a < 2:
+                    continue
+                config_idx, _, _, _, _, ret_pct = simulate_exit_rules(
+                    close[a:b], entry[a:b], exit_[a:b], stop_loss, take_profit, max_hold
+                )
+                ret_pct = np.asarray(ret_pct, dtype=float)
+                s = stats[f, window]
+                s[:, 0] += 1
+                s[:, 1] += np.bincount(config_idx, minlength=k)
+                s[:, 2] += np.bincount(config_idx, weights=(ret_pct > 0).astype(float), minlength=k)
+                s[:, 3] += np.expm1(np.bincount(config_idx, weights=np.log1p(ret_pct / 100), minlength=k)) * 100
+                s[:, 4] += np.bincount(config_idx, weights=ret_pct, minlength=k)
+    return [stats]
+
+
+def _model_chunk(arrays: dict, items: list, folds: list, tz) -> list:
+    """
+    Worker: out-of-sample model scores for a chunk of (column, symbol, fold_ids)
+    items, one row per (symbol, fold). Features are computed once per symbol.
+    """
+    index = _bar_index(arrays, tz)
+    bounds = arrays["dates"]
+    frames = {}
+    rows = []
+    for column, symbol, fold_ids in items:
+        if symbol not in frames:
+            closes = pd.DataFrame(arrays["close"][:, [column]], index=index, columns=[symbol])
+            df = panel_symbol_frame(calculate_panel_features(closes), symbol)
+            frames[symbol] = (df, df.index.as_unit("ns").asi8)
+
+        df, stamps = frames[symbol]
+        for f in fold_ids:
+            train_start, train_end, test_start, test_end = folds[f]
+            end_stamp = bounds[test_end] if test_end < len(bounds) else np.iinfo(np.int64).max
+            a, b, c, d = np.searchsorted(
+                stamps,
+                [bounds[train_start], bounds[train_end], bounds[test_start], end_stamp]
+            )
+            if b - a < MIN_TRAIN_ROWS or d - c < MIN_TEST_ROWS:
+                continue
+
+            train_df, test_df = df.iloc[a:b], df.iloc[c:d]
+            try:
+                bundle = train(train_df, verbose=False)
+            except ValueError:
+                continue
+
+            if bundle["kind"] == "rule":
+                predicted = np.sign(test_df["EMA_20"] - test_df["EMA_50"]).to_numpy()
+            else:
+                probabilities = bundle["model"].predict_proba(
+                    bundle["scaler"].transform(test_df[FEATURE_COLS].values)
+                )
+                predicted = np.array(bundle["classes"])[np.argmax(probabilities, axis=1)]
+
+            target = test_df["Target"].to_numpy()
+            rows.append({
+                "symbol": symbol,
+                "fold": f,
+                "kind": bundle["kind"],
+                "test_rows": int(len(target)),
+                "correct": int((predicted == target).sum()),
+                "baseline_correct": int((test_df["Signal"].to_numpy() == target).sum()),
+            })
+    return rows
+
+
+def _work_items(columns: list, n_folds: int, parallel_slots: int) -> list:
+    """(column, symbol, fold_ids) items: one per symbol, or per fold group when symbols are few"""
+    groups = max(1, min(n_folds, math.ceil(parallel_slots / max(len(columns), 1))))
+    fold_groups = [list(g) for g in np.array_split(np.arange(n_folds), groups) if len(g)]
+    return [(column, symbol, fold_ids) for column, symbol in columns for fold_ids in fold_groups]
+
+
+def _window_metrics(s: np.ndarray) -> dict:
+    """Aggregate metrics for one (window, combo) STATS row"""
+    symbols, trades, wins, sum_total, sum_trade = s
+    return {
+        "symbols": int(symbols),
+        "trades": int(trades),
+        "win_rate_pct": round(float(wins / trades * 100), 2) if trades else 0.0,
+        "avg_profit_pct": round(float(sum_trade / trades), 2) if trades else 0.0,
+        "total_return_pct": round(float(sum_total / symbols), 2) if symbols else 0.0,
+    }
+
+
+def _fold_dates(dates: pd.DatetimeIndex, fold: tuple) -> dict:
+    train_start, train_end, test_start, test_end = fold
+    return {
+        "train_start": str(dates[train_start].date()),
+        "train_end": str(dates[train_end - 1].date()),
+        "test_start": str(dates[test_start].date()),
+        "test_end": str(dates[test_end - 1].date()),
+    }
+
+
+def _strategy_report(stats: np.ndarray, folds: list, dates: pd.DatetimeIndex, combos: list, rank_by: str) -> dict:
+    keys = ["strategy_type", "ma_type", "short_period", "medium_period", "long_period"]
+    fold_reports = []
+    for f, fold in enumerate(folds):
+        train_metrics = [_window_metrics(stats[f, TRAIN, j]) for j in range(len(combos))]
+        candidates = [j for j, m in enumerate(train_metrics) if m["trades"] > 0]
+        report = {"fold": f, **_fold_dates(dates, fold)}
+        if not candidates:
+            fold_reports.append({**report, "params": None, "train": None, "test": None})
+            continue
+        best = max(candidates, key=lambda j: train_metrics[j][rank_by])
+        fold_reports.append({
+            **report,
+            "params": dict(zip(keys, combos[best])),
+            "train": train_metrics[best],
+            "test": _window_metrics(stats[f, TEST, best]),
+        })
+
+    scored = [r for r in fold_reports if r["test"] is not None]
+    avg_train = float(np.mean([r["train"][rank_by] for r in scored])) if scored else 0.0
+    avg_test = float(np.mean([r["test"][rank_by] for r in scored])) if scored else 0.0
+    test_trades = sum(r["test"]["trades"] for r in scored)
+    test_wins = sum(r["test"]["trades"] * r["test"]["win_rate_pct"] / 100 for r in scored)
+    selections = {tuple(r["params"].values()) for r in scored}
+
+    return {
+        "folds": fold_reports,
+        "aggregate": {
+            "folds": len(folds),
+            "scored_folds": len(scored),
+            "rank_by": rank_by,
+            f"avg_train_{rank_by}": round(avg_train, 2),
+            f"avg_test_{rank_by}": round(avg_test, 2),
+            # Out-of-sample / in-sample ratio; near 1 means the selection holds up
+            "walk_forward_efficiency": round(avg_test / avg_train, 2) if avg_train else None,
+            "test_trades": int(test_trades),
+            "test_win_rate_pct": round(float(test_wins / test_trades * 100), 2) if test_trades else 0.0,
+            "distinct_params_selected": len(selections),
+        },
+    }
+
+
+def _model_report(rows: list, folds: list, dates: pd.DatetimeIndex) -> dict:
+    table = pd.DataFrame(rows, columns=["symbol", "fold", "kind", "test_rows", "correct", "baseline_correct"])
+    fold_reports = []
+    for f, fold in enumerate(folds):
+        part = table[table["fold"] == f]
+        n = int(part["test_rows"].sum())
+        fold_reports.append({
+            "fold": f,
+            **_fold_dates(dates, fold),
+            "symbols": int(len(part)),
+            "rule_fallbacks": int((part["kind"] == "rule").sum()),
+            "test_rows": n,
+            "accuracy_pct": round(float(part["correct"].sum() / n * 100), 2) if n else None,
+            "baseline_accuracy_pct": round(float(part["baseline_correct"].sum() / n * 100), 2) if n else None,
+        })
+
+    n = int(table["test_rows"].sum())
+    per_symbol = table.groupby("symbol")[["test_rows", "correct", "baseline_correct"]].sum()
+    per_symbol["accuracy_pct"] = per_symbol["correct"] / per_symbol["test_rows"] * 100
+    return {
+        "folds": fold_reports,
+        "aggregate": {
+            "folds": len(folds),
+            "models_trained": int(len(table)),
+            "symbols": int(table["symbol"].nunique()),
+            "test_rows": n,
+            "accuracy_pct": round(float(table["correct"].sum() / n * 100), 2) if n else None,
+            "baseline_accuracy_pct": round(float(table["baseline_correct"].sum() / n * 100), 2) if n else None,
+            "median_symbol_accuracy_pct": round(float(per_symbol["accuracy_pct"].median()), 2) if n else None,
+        },
+    }
+
+
+def walk_forward(config: dict, progress=None) -> dict:
+    """
+    Walk-forward validation of the crossover strategy grid (kind="strategy") or
+    the XGBoost model (kind="model") over a slice of the NSE 500 or explicit
+    `symbols`. Returns {"config", "folds": [...], "aggregate": {...}}.
+    `progress(evaluations_done, total)` is called as (symbol, fold) work completes.
+    """
+    params = resolve_config(config)
+    if params["kind"] not in KINDS:
+        raise ValueError(f"Unknown walk-forward kind '{params['kind']}'. Use one of: {', '.join(KINDS)}")
+    if params["rank_by"] not in RANK_BY:
+        raise ValueError(f"Unknown rank_by '{params['rank_by']}'. Use one of: {', '.join(RANK_BY)}")
+    for key in ("train_bars", "test_bars", "step_bars"):
+        value = params[key]
+        if key == "step_bars" and value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise ValueError(f"{key} must be an integer of at least 1, got {value!r}")
+    compute_mode = config.get("compute_mode", parallel.COMPUTE_MODE)
+
+    universe = fetch_nse500_symbols()
+    if params["symbols"]:
+        sectors = {stock["Symbol"]: stock for stock in universe}
+        stocks = [sectors.get(symbol, {"Symbol": symbol}) for symbol in params["symbols"]]
+    else:
+        stocks = universe[:params["max_stocks"]]
+    print(f"Starting {params['kind']} walk-forward on {len(stocks)} stocks...")
+
+    frames = fetch_universe(stocks, period=params["period"])
+    closes = close_panel(frames)
+    folds = rolling_folds(len(closes), params["train_bars"], params["test_bars"],
+                          params["step_bars"], params["expanding"])
+    if not folds:
+        raise ValueError(
+            f"Not enough history for one fold: have {len(closes)} bars, "
+            f"need train_bars + test_bars = {params['train_bars'] + params['test_bars']}"
+        )
+
+    position = {symbol: i for i, symbol in enumerate(closes.columns)}
+    columns = [(position[s["Symbol"]], s["Symbol"]) for s in stocks if s["Symbol"] in position]
+
+    arrays = {
+        "close": closes.to_numpy(dtype=float),
+        "dates": closes.index.as_unit("ns").asi8,
+    }
+    tz = str(closes.index.tz) if closes.index.tz is not None else None
+    combos = _strategy_combos(params["param_grid"]) if params["kind"] == "strategy" else None
+    if params["kind"] == "strategy" and not combos:
+        raise ValueError("param_grid has no valid combinations")
+
+    if params["kind"] == "strategy":
+        fn, kwargs = _strategy_chunk, {"folds": folds, "combos": combos, "exit_config": params["exit_config"]}
+    else:
+        fn, kwargs = _model_chunk, {"folds": folds, "tz": tz}
+
+    slots = parallel.COMPUTE_WORKERS * 4 if compute_mode == "process" else 1
+    items = _work_items(columns, len(folds), slots)
+    total = sum(len(fold_ids) for _, _, fold_ids in items)
+    counter = {"done": 0}
+
+    def report(chunk_items: list):
+        counter["done"] += sum(len(fold_ids) for _, _, fold_ids in chunk_items)
+        if progress is not None:
+            progress(counter["done"], total)
+
+    report([])
+    results = None
+    if compute_mode == "process" and items:
+        try:
+            # map_shared reports item counts; items are evaluated in order, so track position
+            collected = {"n": 0}
+
+            def on_chunk(n_items, _):
+                report(items[collected["n"]:collected["n"] + n_items])
+                collected["n"] += n_items
+
+            results = parallel.map_shared(fn, arrays, items, on_chunk=on_chunk, **kwargs)
+        except Exception as e:
+            print(f"Process pool failed, computing in-process: {str(e)}")
+            counter["done"] = 0
+
+    if results is None:
+        results = []
+        by_symbol = {}
+        for item in items:
+            by_symbol.setdefault(item[1], []).append(item)
+        for symbol_items in by_symbol.values():
+            results.extend(fn(arrays, symbol_items, **kwargs))
+            report(symbol_items)
+
+    dates = closes.index
+    if params["kind"] == "strategy":
+        stats = np.sum(results, axis=0) if results else np.zeros((len(folds), 2, len(combos), len(STATS)))
+        report_body = _strategy_report(stats, folds, dates, combos, params["rank_by"])
+    else:
+        report_body = _model_report(results, folds, dates)
+
+    return {
+        "status": "success",
+        "kind": params["kind"],
+        "config": params,
+        "stocks_tested": len(columns),
+        **report_body,
+    }
@@ -0,0 +1,33 @@
+"""Fetch concurrency limit across requests and event loops"""
+import asyncio
+import gc
+import threading
+import time
+
+from backend.ml import async_data
+
+
+def test_run_io_limits_concurrency_and_releases_loops(monkeypatch):
+    monkeypatch.setattr(async_data, "FETCH_CONCURRENCY", 2)
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def fetch():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.pop()
+
+    async def burst():
+        await asyncio.gather(*(async_data.run_io(fetch) for _ in range(6)))
+
+    # Each asyncio.run is a new loop; the waits bind the semaphore to it
+    for _ in range(3):
+        asyncio.run(burst())
+        assert max(peak) == 2
+
+    gc.collect()
+    assert len(async_data._semaphores) == 0
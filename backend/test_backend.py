@@ -1,6 +1,6 @@
 """
 Run this script to test if your backend components work
-Usage: python test_backend.py
+Usage (from the repo root): python -m backend.test_backend
 """
 
 print("Testing AlphaCross Backend Components...")
@@ -9,15 +9,15 @@ print("=" * 50)
 # Test 1: Import modules
 print("\n1. Testing imports...")
 try:
-    from ml.data_fetch import fetch_stock_data
-    from ml.features import calculate_features
-    from ml.model_xgb import train_and_predict
-    from ml.backtest import run_backtest
-    from ai.chat import get_chat_response
+    from backend.ml.data_fetch import fetch_stock_data
+    from backend.ml.features import calculate_features
+    from backend.ml.model_xgb import train_and_predict
+    from backend.ml.backtest import backtest_crossover
+    from backend.ai.chat import get_chat_response
     print("✅ All imports successful")
 except Exception as e:
     print(f"❌ Import error: {e}")
-    print("\nMake sure you have __init__.py files in ml/ and ai/ folders")
+    print("\nRun from the repo root: python -m backend.test_backend")
     exit(1)
 
 # Test 2: Fetch data
@@ -66,11 +66,11 @@ except Exception as e:
 # Test 5: Backtest
 print("\n5. Testing backtest...")
 try:
-    results = run_backtest(df)
+    summary = backtest_crossover(df, 'INFY')['summary']
     print(f"✅ Backtest completed:")
-    print(f"   Trades: {results['trades']}")
-    print(f"   Win Rate: {results['win_rate']}%")
-    print(f"   Total Return: {results['total_return']}%")
+    print(f"   Trades: {summary['number_of_trades']}")
+    print(f"   Win Rate: {summary['win_rate_pct']}%")
+    print(f"   Total Return: {summary['pnl_pct']}%")
 except Exception as e:
     print(f"❌ Backtest error: {e}")
     import traceback
@@ -95,4 +95,4 @@ except Exception as e:
 
 print("\n" + "=" * 50)
 print("✅ All tests completed! Backend is ready.")
-print("\nYou can now run: uvicorn main:app --reload")
\ No newline at end of file
+print("\nYou can now run: uvicorn backend.main:app --reload")
\ No newline at end of file
@@ -0,0 +1,238 @@
+"""Vectorized backtests against straightforward per-bar reference loops"""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.ml.backtest import crossover_trades, exit_rule_grid, run_advanced_backtest, run_exit_sweep
+from backend.ml.data_fetch import fetch_stock_data
+from backend.ml.engine import StrategyEngine
+from backend.ml.features import calculate_features
+from backend.ml.portfolio import simulate_portfolio
+
+SIGNAL_CONFIG = {"strategy_type": "double", "ma_type": "EMA", "short_period": 10, "long_period": 30}
+
+
+def loop_advanced_backtest(df: pd.DataFrame, symbol: str, config: dict) -> list:
+    """The original row-by-row single-position backtest"""
+    trades = []
+    state = "FLAT"
+    entry_data = {}
+    just_exited = False
+
+    for i in range(len(df)):
+        row = df.iloc[i]
+        price = float(row["Close"])
+        is_last_candle = i == len(df) - 1
+
+        if state == "FLAT":
+            if row.get("entry_signal", False) and not just_exited:
+                state = "LONG"
+                entry_data = {
+                    "symbol": symbol,
+                    "entry_date": df.index[i].strftime("%Y-%m-%d"),
+                    "entry_price": price,
+                    "days_held": 0,
+                }
+            just_exited = False
+
+        elif state == "LONG":
+            entry_data["days_held"] += 1
+            ret_pct = (price - entry_data["entry_price"]) / entry_data["entry_price"] * 100
+
+            exit_reason = None
+            if ret_pct <= -config["stop_loss_pct"]:
+                exit_reason = "Stop Loss"
+            elif ret_pct >= config["take_profit_pct"]:
+                exit_reason = "Take Profit"
+            elif entry_data["days_held"] >= config["max_holding_days"]:
+                exit_reason = "Max Days"
+            elif row.get("exit_signal", False):
+                exit_reason = "Strategy Signal"
+            elif is_last_candle:
+                exit_reason = "Forced EOD Exit"
+
+            if exit_reason:
+                trades.append({
+                    **entry_data,
+                    "exit_date": df.index[i].strftime("%Y-%m-%d"),
+                    "exit_price": price,
+                    "profit_pct": round(ret_pct, 2),
+                    "exit_reason": exit_reason,
+                })
+                state = "FLAT"
+                just_exited = True
+
+    return trades
+
+
+def loop_crossover_trades(df: pd.DataFrame, symbol: str, stop_loss: float, take_profit: float) -> list:
+    """Bar-by-bar version of the universe backtest's crossover trades"""
+    close = df["Close"].to_numpy(dtype=float)
+    fast = df["EMA_20"].to_numpy(dtype=float)
+    slow = df["EMA_50"].to_numpy(dtype=float)
+    trades = []
+    entry_i = None
+
+    for i in range(1, len(df)):
+        cross_up = fast[i - 1] <= slow[i - 1] and fast[i] > slow[i]
+        cross_down = fast[i - 1] >= slow[i - 1] and fast[i] < slow[i]
+        if entry_i is None:
+            if cross_up:
+                entry_i = i
+            continue
+
+        pnl = (close[i] - close[entry_i]) / close[entry_i]
+        if cross_down or pnl <= -stop_loss or pnl >= take_profit:
+            trades.append({
+                "symbol": symbol,
+                "entry_date": str(df.index[entry_i].date()),
+                "exit_date": str(df.index[i].date()),
+                "entry_price": round(float(close[entry_i]), 2),
+                "exit_price": round(float(close[i]), 2),
+                "profit_pct": round((close[i] - close[entry_i]) / close[entry_i] * 100, 2),
+                "sector": "Unknown",
+            })
+            entry_i = None
+
+    return trades
+
+
+def loop_portfolio(closes: pd.DataFrame, trades: dict, initial_capital: float,
+                   position_size: float, max_positions: int) -> dict:
+    """Day-by-day portfolio: each day's exits, then its entries in universe order, then the marks"""
+    values = closes.to_numpy(dtype=float)
+    n_trades = len(trades["symbol"])
+    taken, shares = [False] * n_trades, [0.0] * n_trades
+    holdings = {}  # column -> shares
+    cash = initial_capital
+    curves = {"cash": [], "equity": [], "positions": []}
+
+    def mark(row):
+        return sum(quantity * (0.0 if math.isnan(values[row, c]) else values[row, c]) for c, quantity in holdings.items())
+
+    for row in range(len(closes)):
+        for t in range(n_trades):
+            if taken[t] and trades["exit_row"][t] == row:
+                cash += shares[t] * trades["exit_price"][t]
+                del holdings[int(trades["symbol"][t])]
+
+        entries = sorted((int(trades["symbol"][t]), t) for t in range(n_trades) if trades["entry_row"][t] == row)
+        for column, t in entries:
+            if len(holdings) >= max_positions:
+                continue
+            quantity = math.floor(min((cash + mark(row)) * position_size, cash) / trades["entry_price"][t])
+            if quantity >= 1:
+                taken[t], shares[t] = True, float(quantity)
+                holdings[column] = float(quantity)
+                cash -= quantity * trades["entry_price"][t]
+
+        curves["cash"].append(cash)
+        curves["equity"].append(cash + mark(row))
+        curves["positions"].append(len(holdings))
+
+    return {"taken": taken, "shares": shares, **curves}
+
+
+def random_portfolio_case(seed: int):
+    """Random walks with leading gaps and non-overlapping per-symbol trades, some exiting and re-entering on one day"""
+    rng = np.random.default_rng(seed)
+    n_rows, n_symbols = 60, int(rng.integers(2, 7))
+    values = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, (n_rows, n_symbols)), axis=0))
+    starts = rng.integers(0, 10, n_symbols)
+    for column, start in enumerate(starts):
+        values[:start, column] = np.nan
+    closes = pd.DataFrame(values, index=pd.bdate_range("2024-01-01", periods=n_rows),
+                          columns=[f"S{c}" for c in range(n_symbols)])
+
+    symbol, entry_row, exit_row = [], [], []
+    for column, start in enumerate(starts):
+        row = int(start) + int(rng.integers(0, 5))
+        while row < n_rows - 1:
+            exit_at = min(row + int(rng.integers(1, 10)), n_rows - 1)
+            symbol.append(column)
+            entry_row.append(row)
+            exit_row.append(exit_at)
+            row = exit_at + int(rng.integers(0, 4))
+
+    symbol, entry_row, exit_row = np.array(symbol), np.array(entry_row), np.array(exit_row)
+    trades = {
+        "symbol": symbol, "entry_row": entry_row, "exit_row": exit_row,
+        "entry_price": values[entry_row, symbol], "exit_price": values[exit_row, symbol],
+    }
+    config = {
+        "initial_capital": float(rng.choice([500.0, 2000.0, 100000.0])),
+        "position_size": float(rng.uniform(0.1, 0.7)),
+        "max_positions": int(rng.integers(1, n_symbols + 1)),
+    }
+    return closes, trades, config
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_portfolio_matches_daily_loop(seed):
+    closes, trades, config = random_portfolio_case(seed)
+    expected = loop_portfolio(closes, trades, **config)
+    actual = simulate_portfolio(closes, trades, **config)
+
+    assert actual["taken"].tolist() == expected["taken"]
+    assert actual["shares"].tolist() == expected["shares"]
+    assert actual["positions"].tolist() == expected["positions"]
+    np.testing.assert_allclose(actual["cash"], expected["cash"], rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(actual["equity"], expected["equity"], rtol=1e-9, atol=1e-6)
+
+
+def test_portfolio_exits_fund_same_day_entries_under_the_cap():
+    closes = pd.DataFrame({"A": [10.0, 20.0, 20.0], "B": [10.0, 10.0, 10.0], "C": [5.0, 5.0, 5.0]},
+                          index=pd.bdate_range("2024-01-01", periods=3))
+    trades = {
+        "symbol": np.array([0, 1, 2]), "entry_row": np.array([0, 1, 1]), "exit_row": np.array([1, 2, 2]),
+        "entry_price": np.array([10.0, 10.0, 5.0]), "exit_price": np.array([20.0, 10.0, 5.0]),
+    }
+
+    # All cash goes into A; its exit on day 1 funds B, sized on the marked-up equity; C is over the cap
+    result = simulate_portfolio(closes, trades, initial_capital=100.0, position_size=1.0, max_positions=1)
+
+    assert result["taken"].tolist() == [True, True, False]
+    assert result["shares"].tolist() == [10.0, 20.0, 0.0]
+    assert result["equity"].tolist() == [100.0, 200.0, 200.0]
+    assert result["positions"].tolist() == [1, 1, 0]
+
+
+@pytest.fixture(scope="module")
+def signals():
+    return StrategyEngine.generate_signals(fetch_stock_data("INFY", period="5y"), SIGNAL_CONFIG)
+
+
+@pytest.fixture(scope="module")
+def featured():
+    return calculate_features(fetch_stock_data("RELIANCE", period="5y"))
+
+
+@pytest.mark.parametrize("config", [
+    {"stop_loss_pct": 5, "take_profit_pct": 15, "max_holding_days": 30},
+    {"stop_loss_pct": 2, "take_profit_pct": 4, "max_holding_days": 5},
+    {"stop_loss_pct": 50, "take_profit_pct": 100, "max_holding_days": 1000},
+])
+def test_advanced_backtest_matches_loop(signals, config):
+    expected = loop_advanced_backtest(signals, "INFY", config)
+    assert expected
+    assert run_advanced_backtest(signals, "INFY", config) == expected
+
+
+def test_exit_sweep_matches_single_runs(signals):
+    configs = exit_rule_grid([2, 5], [4, 15], [5, None])
+    trades_per_config, summary = run_exit_sweep(signals, "INFY", configs)
+
+    assert len(summary) == len(configs)
+    for config, trades in zip(configs, trades_per_config):
+        assert trades == run_advanced_backtest(signals, "INFY", config)
+    assert summary["trades"].tolist() == [len(trades) for trades in trades_per_config]
+
+
+@pytest.mark.parametrize("stop_loss, take_profit", [(0.05, 0.15), (0.02, 0.03), (0.5, 1.0)])
+def test_crossover_trades_match_loop(featured, stop_loss, take_profit):
+    expected = loop_crossover_trades(featured, "RELIANCE", stop_loss, take_profit)
+    assert expected
+    assert crossover_trades(featured, "RELIANCE", stop_loss, take_profit) == expected
+
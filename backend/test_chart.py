@@ -0,0 +1,101 @@
+"""LTTB downsampling and chart payloads against reference implementations"""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.main import build_chart_data, safe_float
+from backend.ml.data_fetch import fetch_stock_data
+from backend.ml.downsample import lttb_indices
+from backend.ml.features import calculate_features
+
+
+def loop_lttb(y: list, threshold: int) -> list:
+    """
+    Textbook LTTB, one bucket at a time. The last bucket ends at n - 1 exactly:
+    floor((threshold - 2) * every) can round one short and drop point n - 2.
+    """
+    n = len(y)
+    every = (n - 2) / (threshold - 2)
+
+    def edge(k):
+        return n - 1 if k == threshold - 2 else math.floor(k * every) + 1
+
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = edge(i + 1)
+        avg_end = n if i + 2 > threshold - 2 else edge(i + 2)
+        avg_x = sum(range(avg_start, avg_end)) / (avg_end - avg_start)
+        avg_y = sum(y[avg_start:avg_end]) / (avg_end - avg_start)
+
+        best, best_area = None, -1.0
+        for j in range(edge(i), edge(i + 1)):
+            area = abs((a - avg_x) * (y[j] - y[a]) - (a - j) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    return selected + [n - 1]
+
+
+def iterrows_chart_data(df: pd.DataFrame) -> list:
+    """The original row-by-row chart payload"""
+    return [{
+        "date": str(idx.date()),
+        "close": round(safe_float(row["Close"]), 2),
+        "ema_20": round(safe_float(row["EMA_20"]), 2),
+        "ema_50": round(safe_float(row["EMA_50"]), 2),
+        "rsi": round(safe_float(row["RSI"]), 2),
+        "volume": int(safe_float(row["Volume"]))
+    } for idx, row in df.iterrows()]
+
+
+@pytest.fixture(scope="module")
+def featured():
+    return calculate_features(fetch_stock_data("HDFCBANK", period="2y"))
+
+
+@pytest.mark.parametrize("n, threshold", [(10, 3), (10, 5), (11, 4), (100, 7), (997, 50), (1000, 999)])
+def test_lttb_matches_loop(n, threshold):
+    y = np.random.default_rng(n + threshold).standard_normal(n).cumsum()
+    assert lttb_indices(y, threshold).tolist() == loop_lttb(y.tolist(), threshold)
+
+
+def test_lttb_buckets_keep_one_point_each_and_the_ends():
+    n, threshold = 10, 5
+    # Buckets between the kept ends: [1, 3), [3, 6), [6, 9)
+    selected = lttb_indices(np.arange(n, dtype=float) ** 2, threshold)
+
+    assert len(selected) == threshold
+    assert selected[0] == 0 and selected[-1] == n - 1
+    for position, (start, end) in zip(selected[1:-1], [(1, 3), (3, 6), (6, 9)]):
+        assert start <= position < end
+
+
+def test_lttb_keeps_spikes():
+    y = np.zeros(500)
+    y[123], y[377] = 10.0, -10.0
+    selected = lttb_indices(y, 20)
+    assert 123 in selected and 377 in selected
+
+
+@pytest.mark.parametrize("threshold", [None, 2, 10, 11])
+def test_lttb_short_series_pass_through(threshold):
+    assert lttb_indices(np.arange(10.0), threshold).tolist() == list(range(10))
+
+
+def test_chart_rows_match_iterrows(featured):
+    expected = iterrows_chart_data(featured)
+    assert build_chart_data(featured) == expected
+
+    columns = build_chart_data(featured, format="columns")
+    assert [dict(zip(columns, values)) for values in zip(*columns.values())] == expected
+
+
+def test_chart_downsampled_rows_are_a_subset(featured):
+    keep = lttb_indices(featured["Close"].to_numpy(dtype=float), 100)
+    expected = iterrows_chart_data(featured.iloc[keep])
+    assert len(expected) == 100
+    assert build_chart_data(featured, max_points=100) == expected
@@ -0,0 +1,72 @@
+"""Accept / Accept-Encoding negotiation through one tabular endpoint"""
+import msgpack
+import pyarrow as pa
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.ml import encoding
+
+client = TestClient(app)
+CHART = "/chart/INFY?period=1y"
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+@pytest.fixture(scope="module")
+def chart_json():
+    response = client.get(CHART, headers=IDENTITY)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == encoding.JSON
+    assert response.headers["vary"] == "Accept, Accept-Encoding"
+    return response.json()
+
+
+def test_msgpack_round_trip(chart_json):
+    response = client.get(CHART, headers={"Accept": encoding.MSGPACK, **IDENTITY})
+    assert response.headers["content-type"] == encoding.MSGPACK
+    assert msgpack.unpackb(response.content) == chart_json
+
+
+@pytest.mark.parametrize("format", ["rows", "columns"])
+def test_arrow_round_trip(chart_json, format):
+    response = client.get(f"{CHART}&format={format}", headers={"Accept": encoding.ARROW, **IDENTITY})
+    assert response.headers["content-type"] == encoding.ARROW
+
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column_names == ["date", "close", "ema_20", "ema_50", "rsi", "volume"]
+    assert table.to_pylist() == chart_json["data"]
+
+
+@pytest.mark.parametrize("accept, media_type", [
+    ("application/json;q=0.5, application/x-msgpack;q=0.9", encoding.MSGPACK),
+    ("application/x-msgpack;q=0, */*;q=0.1", encoding.JSON),
+    ("text/html, application/vnd.apache.arrow.stream;q=0.8", encoding.ARROW),
+])
+def test_q_values_pick_the_format(accept, media_type):
+    response = client.get(f"{CHART}&max_points=3", headers={"Accept": accept})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == media_type
+
+
+@pytest.mark.parametrize("accept", ["text/html", "application/json;q=0, application/x-msgpack;q=0"])
+def test_unacceptable_formats_are_406(accept):
+    response = client.get(CHART, headers={"Accept": accept})
+    assert response.status_code == 406
+
+
+def test_arrow_needs_a_tabular_view():
+    with pytest.raises(HTTPException) as raised:
+        encoding.negotiate(encoding.ARROW, tabular=False)
+    assert raised.value.status_code == 406
+
+
+def test_gzip_over_threshold_only(chart_json):
+    response = client.get(CHART, headers={"Accept-Encoding": "br;q=0, gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == chart_json
+
+    small = client.get(f"{CHART}&max_points=3", headers={"Accept-Encoding": "gzip"})
+    assert len(small.content) < encoding.COMPRESS_MIN_BYTES
+    assert "content-encoding" not in small.headers
@@ -0,0 +1,66 @@
+"""Moving-average kernels and batched sweep signals against reference implementations"""
+import numpy as np
+import pandas as pd
+import pytest
+from ta.momentum import KAMAIndicator
+from ta.trend import WMAIndicator
+
+from backend.ml.data_fetch import fetch_stock_data
+from backend.ml.engine import MACache, StrategyEngine, _hma, _kama, _signal_matrices, _strategy_combos, _wma
+
+
+@pytest.fixture(scope="module")
+def prices():
+    return fetch_stock_data("TCS", period="2y")
+
+
+def rolling_wma(close: pd.Series, period: int) -> pd.Series:
+    weights = np.arange(1, period + 1, dtype=float)
+    return close.rolling(period).apply(lambda window: np.dot(window, weights) / weights.sum(), raw=True)
+
+
+@pytest.mark.parametrize("period", [2, 9, 20, 50])
+def test_wma_matches_ta(prices, period):
+    close = prices["Close"]
+    expected = WMAIndicator(close=close, window=period).wma().to_numpy()
+    np.testing.assert_allclose(_wma(close.to_numpy(), period), expected, rtol=1e-10, equal_nan=True)
+
+
+@pytest.mark.parametrize("period", [9, 16, 30])
+def test_hma_matches_rolling_definition(prices, period):
+    close = prices["Close"]
+    half, root = period // 2, int(np.sqrt(period))
+    expected = rolling_wma(2 * rolling_wma(close, half) - rolling_wma(close, period), root).to_numpy()
+    np.testing.assert_allclose(_hma(close.to_numpy(), period), expected, rtol=1e-10, equal_nan=True)
+
+
+@pytest.mark.parametrize("period", [10, 20])
+def test_kama_matches_ta(prices, period):
+    close = prices["Close"]
+    expected = KAMAIndicator(close=close, window=period).kama().to_numpy()
+    np.testing.assert_allclose(_kama(close.to_numpy(), period), expected, rtol=1e-10, equal_nan=True)
+
+
+def test_short_history_is_all_nan():
+    assert np.isnan(_wma(np.arange(5, dtype=float), 10)).all()
+    assert np.isnan(_kama(np.arange(5, dtype=float), 10)).all()
+
+
+def test_signal_matrices_match_generate_signals(prices):
+    grid = {"strategy_type": ["single", "double", "triple"], "ma_type": ["SMA", "EMA", "HMA", "KAMA"],
+            "short_period": [5, 10], "medium_period": [20], "long_period": [30, 50]}
+    combos = _strategy_combos(grid)
+    cache = MACache()
+    entry, exit_ = _signal_matrices(prices, "TCS", combos, cache)
+    assert cache.hits > 0
+
+    for j, (strategy_type, ma_type, short, medium, long) in enumerate(combos):
+        expected = StrategyEngine.generate_signals(prices, {
+            "strategy_type": strategy_type, "ma_type": ma_type,
+            "short_period": short, "medium_period": medium, "long_period": long,
+        })
+        rows = prices.index.get_indexer(expected.index)
+        warm_up = np.setdiff1d(np.arange(len(prices)), rows)
+        assert not entry[warm_up, j].any() and not exit_[warm_up, j].any()
+        np.testing.assert_array_equal(entry[rows, j], expected["entry_signal"].to_numpy(dtype=bool))
+        np.testing.assert_array_equal(exit_[rows, j], expected["exit_signal"].to_numpy(dtype=bool))
@@ -0,0 +1,120 @@
+"""Panel and streaming indicators against the per-symbol batch calculate_features"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.ml import universe_screen
+from backend.ml.data_fetch import fetch_many
+from backend.ml.features import (
+    PANEL_FEATURES, calculate_features, calculate_panel_features, close_panel, panel_latest, panel_symbol_frame
+)
+from backend.ml.streaming import IndicatorStateCache, SymbolIndicators
+
+SYMBOLS = ["INFY", "TCS", "RELIANCE", "HDFCBANK", "ITC"]
+STREAM_COLUMNS = ["Close"] + PANEL_FEATURES + ["Signal"]
+SCREEN_BUCKETS = ["bullish", "bearish", "neutral"]
+
+
+@pytest.fixture(scope="module")
+def frames():
+    frames = fetch_many(SYMBOLS, period="1y")
+    # A shorter history and an interior gap, as real universes have
+    frames["TCS"] = frames["TCS"].iloc[40:]
+    frames["ITC"] = frames["ITC"].drop(frames["ITC"].index[100])
+    return frames
+
+
+@pytest.fixture(scope="module")
+def panel(frames):
+    return calculate_panel_features(close_panel(frames))
+
+
+def test_panel_matches_per_symbol_features(frames, panel):
+    for symbol in ["INFY", "TCS", "RELIANCE", "HDFCBANK"]:
+        expected = calculate_features(frames[symbol])
+        actual = panel_symbol_frame(panel, symbol)
+        assert actual.index.equals(expected.index)
+        for column in ["Close"] + PANEL_FEATURES + ["Signal", "Target"]:
+            np.testing.assert_allclose(actual[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float),
+                                       rtol=1e-9, atol=1e-12, err_msg=f"{symbol} {column}")
+
+
+def test_panel_forward_fills_interior_gaps(frames, panel):
+    missing = frames["HDFCBANK"].index.difference(frames["ITC"].index)
+    assert len(missing) == 1
+    assert panel["Close"].loc[missing[0], "ITC"] == panel["Close"]["ITC"].shift(1).loc[missing[0]]
+
+
+def test_panel_latest_is_last_valid_row(frames, panel):
+    latest = panel_latest(panel)
+    for symbol in ["INFY", "TCS"]:
+        expected = calculate_features(frames[symbol]).iloc[-1]
+        assert latest.loc[symbol, "date"] == expected.name
+        for column in PANEL_FEATURES:
+            assert latest.loc[symbol, column] == pytest.approx(expected[column], rel=1e-9)
+
+
+def test_streaming_matches_batch(frames):
+    df = frames["INFY"]
+    expected = calculate_features(df)
+    state = SymbolIndicators()
+    rows = {}
+    for date, close in zip(df.index, df["Close"]):
+        row = state.update(close, date)
+        if state.ready:
+            rows[date] = row
+
+    streamed = pd.DataFrame.from_dict(rows, orient="index")
+    # The batch frame also drops the last two rows, whose Target is not known yet
+    streamed = streamed.loc[expected.index]
+    for column in STREAM_COLUMNS:
+        np.testing.assert_allclose(streamed[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float),
+                                   rtol=1e-9, atol=1e-12, err_msg=column)
+
+
+def test_streaming_replaces_repeated_bar_and_round_trips(frames, tmp_path):
+    df = frames["RELIANCE"]
+    cache = IndicatorStateCache(tmp_path / "state.json")
+    cache.seed("RELIANCE", df.iloc[:-1])
+    last_date, last_close = df.index[-1], float(df["Close"].iloc[-1])
+
+    # An intraday refresh of the last bar, then its final close
+    cache.update("RELIANCE", last_close * 1.05, last_date)
+    final = cache.update("RELIANCE", last_close, last_date)
+    assert final == SymbolIndicators.from_history(df).last
+
+    cache.save()
+    restored = IndicatorStateCache(tmp_path / "state.json").load()
+    assert restored.latest() == cache.latest()
+
+
+def test_sync_seeds_then_replays_only_new_bars(frames):
+    closes = close_panel(frames)
+    cache = IndicatorStateCache()
+    assert cache.sync(closes.iloc[:-5]) == {"seeded": len(SYMBOLS), "updated": 0}
+
+    # The last synced bar was a partial close; the next panel has its final value
+    partial = closes.iloc[:-5].copy()
+    partial.iloc[-1] *= 1.05
+    cache = IndicatorStateCache()
+    cache.sync(partial)
+    assert cache.sync(closes) == {"seeded": 0, "updated": len(SYMBOLS)}
+
+    for symbol in SYMBOLS:
+        expected = SymbolIndicators.from_history(closes[symbol].dropna().to_frame("Close"))
+        assert cache.get(symbol).last == expected.last
+
+
+def test_screen_latest_serves_cached_rows(frames, monkeypatch):
+    cache = IndicatorStateCache()
+    cache.seed_many(frames)
+    monkeypatch.setattr(universe_screen, "indicator_cache", cache)
+    universe = [{"Symbol": symbol, "Industry": "Test"} for symbol in SYMBOLS]
+    monkeypatch.setattr(universe_screen, "fetch_nse500_symbols", lambda: universe)
+
+    result = universe_screen.screen_latest()
+
+    assert sum(result["counts"].values()) == len(SYMBOLS)
+    assert result["as_of"] == max(frames[symbol].index[-1] for symbol in SYMBOLS).strftime("%Y-%m-%d")
+    infy = next(item for bucket in SCREEN_BUCKETS for item in result[bucket] if item["symbol"] == "INFY")
+    assert infy["ema_20"] == round(SymbolIndicators.from_history(frames["INFY"]).last["EMA_20"], 2)
@@ -0,0 +1,133 @@
+"""JobManager lifecycle with a stub job kind"""
+import json
+import threading
+import time
+
+import pytest
+
+from backend.ml import jobs
+
+
+class StubRunner:
+    """Reports `steps` progress calls, each waiting for `release` once it is cleared"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+
+    def __call__(self, params: dict, progress) -> dict:
+        self.started.set()
+        for step in range(params.get("steps", 3)):
+            self.release.wait(5)
+            progress(step + 1, params.get("steps", 3))
+        if params.get("unserializable"):
+            return {"value": object()}
+        return {"steps": params.get("steps", 3)}
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    runner = StubRunner()
+    monkeypatch.setitem(jobs.JOB_KINDS, "stub", (runner, lambda params: {"steps": params.get("steps", 3)}, "steps"))
+    return runner
+
+
+@pytest.fixture
+def manager(tmp_path, runner):
+    manager = jobs.JobManager(workers=1, job_dir=tmp_path)
+    yield manager
+    manager.shutdown()
+
+
+def wait_for(manager, job_id: str, statuses=jobs.FINISHED) -> dict:
+    deadline = time.time() + 5
+    while manager.get(job_id)["status"] not in statuses:
+        assert time.time() < deadline, manager.get(job_id)
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+
+def test_submit_runs_and_persists(manager, tmp_path):
+    job, deduplicated = manager.submit("stub", {"steps": 2})
+    assert not deduplicated
+
+    job = wait_for(manager, job["id"])
+    assert job["status"] == "completed"
+    assert job["result"] == {"steps": 2}
+    assert job["progress"] == {"steps_done": 2, "steps_total": 2}
+    assert json.loads((tmp_path / f"{job['id']}.json").read_text())["status"] == "completed"
+    assert "result" not in jobs.public_view(job)
+
+    with pytest.raises(ValueError):
+        manager.submit("unknown", {})
+
+
+def test_duplicate_submissions_reuse_the_job(manager, runner):
+    runner.release.clear()
+    job, _ = manager.submit("stub", {"steps": 2})
+    pending, deduplicated = manager.submit("stub", {"steps": 2})
+    assert deduplicated and pending["id"] == job["id"]
+
+    runner.release.set()
+    wait_for(manager, job["id"])
+    completed, deduplicated = manager.submit("stub", {"steps": 2})
+    assert deduplicated and completed["id"] == job["id"]
+
+    forced, deduplicated = manager.submit("stub", {"steps": 2, "force_refresh": True})
+    assert not deduplicated and forced["id"] != job["id"]
+
+
+def test_cancel_running_and_queued(manager, runner):
+    runner.release.clear()
+    running, _ = manager.submit("stub", {"steps": 5})
+    queued, _ = manager.submit("stub", {"steps": 6})
+    assert runner.started.wait(5)
+
+    assert manager.cancel(queued["id"])["status"] == "cancelled"
+    manager.cancel(running["id"])
+    runner.release.set()
+
+    assert wait_for(manager, running["id"])["status"] == "cancelled"
+    assert manager.cancel("missing") is None
+
+
+def test_unserializable_result_fails_the_job(manager):
+    job, _ = manager.submit("stub", {"steps": 1, "unserializable": True})
+
+    job = wait_for(manager, job["id"])
+    assert job["status"] == "failed"
+    assert "Could not store" in job["error"]
+
+
+def test_restart_interrupts_only_orphaned_jobs(tmp_path, runner):
+    now = time.time()
+    records = {
+        "own": {"owner": jobs._owner(), "status": "running", "heartbeat_ts": now},
+        "stale": {"owner": "other-host:1", "status": "queued", "heartbeat_ts": now - 3600},
+        "live": {"owner": "other-host:1", "status": "running", "heartbeat_ts": now},
+        "done": {"owner": "other-host:1", "status": "completed", "heartbeat_ts": now - 3600},
+    }
+    for job_id, record in records.items():
+        job = {"id": job_id, "kind": "stub", "key": job_id, "submitted_ts": now, "finished_ts": now, **record}
+        (tmp_path / f"{job_id}.json").write_text(json.dumps(job))
+
+    manager = jobs.JobManager(workers=1, job_dir=tmp_path)
+    try:
+        assert manager.get("own")["status"] == "interrupted"
+        assert manager.get("stale")["status"] == "interrupted"
+        assert manager.get("done")["status"] == "completed"
+        # Another live process's job is neither loaded nor rewritten
+        assert manager.get("live") is None
+        assert json.loads((tmp_path / "live.json").read_text())["status"] == "running"
+    finally:
+        manager.shutdown()
+
+
+def test_job_manager_is_created_lazily():
+    jobs.shutdown_job_manager()
+    assert jobs._manager is None
+    manager = jobs.get_job_manager()
+    assert jobs.get_job_manager() is manager
+    jobs.shutdown_job_manager()
+    assert jobs._manager is None
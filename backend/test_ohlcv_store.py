@@ -0,0 +1,140 @@
+"""OHLCV store helpers and incremental appends through fetch_stock_data"""
+import pandas as pd
+import pytest
+
+from backend.ml import data_fetch, ohlcv_store
+from backend.ml.providers import EXCHANGE_TZ, SyntheticProvider
+from backend.ml.streaming import IndicatorStateCache, SymbolIndicators
+
+
+def bars(dates: list, close: float = 100.0) -> pd.DataFrame:
+    index = pd.DatetimeIndex(dates).tz_localize(EXCHANGE_TZ)
+    return pd.DataFrame({col: close for col in data_fetch.REQUIRED_COLS}, index=index)
+
+
+def test_merge_appends_and_replaces_overlap():
+    stored = bars(["2025-01-01", "2025-01-02", "2025-01-03"], close=100.0)
+    new = bars(["2025-01-03", "2025-01-06"], close=101.0)
+
+    merged = ohlcv_store.merge(stored, new)
+
+    assert list(merged.index.strftime("%Y-%m-%d")) == ["2025-01-01", "2025-01-02", "2025-01-03", "2025-01-06"]
+    assert merged["Close"].tolist() == [100.0, 100.0, 101.0, 101.0]
+    assert ohlcv_store.merge(None, new) is new
+
+
+def test_covers():
+    df = bars(list(pd.bdate_range("2024-01-01", periods=300)))
+
+    assert not ohlcv_store.covers(df, {}, "1y")
+    assert not ohlcv_store.covers(None, {"covered_from": "max"}, "1y")
+    assert ohlcv_store.covers(df, {"covered_from": "max"}, "max")
+    assert not ohlcv_store.covers(df, {"covered_from": "2024-01-01"}, "max")
+    assert ohlcv_store.covers(df, {"covered_from": "2024-01-01"}, "5d")
+    assert not ohlcv_store.covers(df.tail(3), {"covered_from": "2024-01-01"}, "5d")
+
+    one_year_ago = str(ohlcv_store.period_start("1y", tz=EXCHANGE_TZ).date())
+    assert ohlcv_store.covers(df, {"covered_from": one_year_ago}, "1y")
+    assert ohlcv_store.covers(df, {"covered_from": one_year_ago}, "6mo")
+    assert not ohlcv_store.covers(df, {"covered_from": one_year_ago}, "2y")
+
+
+def test_slice_period():
+    df = bars(list(pd.bdate_range("2024-01-01", "2025-06-30")))
+    as_of = df.index[-1]
+
+    assert len(ohlcv_store.slice_period(df, "5d", as_of=as_of)) == 5
+    assert ohlcv_store.slice_period(df, "max", as_of=as_of).equals(df)
+    six_months = ohlcv_store.slice_period(df, "6mo", as_of=as_of)
+    assert six_months.index[0] >= pd.Timestamp("2024-12-30", tz=EXCHANGE_TZ)
+    assert six_months.index[0] - pd.Timedelta(days=4) < pd.Timestamp("2024-12-30", tz=EXCHANGE_TZ)
+    assert ohlcv_store.slice_period(df, "ytd", as_of=as_of).index[0] == pd.Timestamp("2025-01-01", tz=EXCHANGE_TZ)
+
+    with pytest.raises(ValueError):
+        ohlcv_store.slice_period(df, "foo")
+
+
+class OnlineSynthetic(SyntheticProvider):
+    """Synthetic prices served like an upstream API, so the store is used; records each request"""
+
+    offline = False
+
+    def __init__(self, end_date: str):
+        super().__init__(seed=7, end_date=end_date)
+        self.requests = []
+
+    def history(self, ticker: str, period: str = None, start: str = None) -> pd.DataFrame:
+        self.requests.append({"period": period, "start": start})
+        return super().history(ticker, period=period, start=start)
+
+
+@pytest.fixture
+def provider(monkeypatch, tmp_path):
+    provider = OnlineSynthetic("2025-06-20")
+    monkeypatch.setattr(data_fetch, "get_provider", lambda: provider)
+    monkeypatch.setattr(ohlcv_store, "STORE_DIR", tmp_path)
+    monkeypatch.setattr(ohlcv_store, "STORE_ENABLED", True)
+    return provider
+
+
+def test_fetch_appends_only_new_bars(provider, monkeypatch):
+    first = data_fetch.fetch_stock_data("INFY", period="max")
+    assert provider.requests == [{"period": "max", "start": None}]
+
+    # Within the refresh interval the store answers alone
+    data_fetch.fetch_stock_data("INFY", period="max")
+    assert len(provider.requests) == 1
+
+    # A week later, after the refresh interval: only bars from the last stored date are requested
+    provider.end_date = "2025-06-27"
+    monkeypatch.setattr(ohlcv_store, "REFRESH_SECONDS", 0)
+    updated = data_fetch.fetch_stock_data("INFY", period="max")
+
+    assert provider.requests[-1] == {"period": None, "start": first.index[-1].strftime("%Y-%m-%d")}
+    assert len(updated) == len(first) + 5
+    expected = provider.history("INFY.NS", period="max")[data_fetch.REQUIRED_COLS]
+    pd.testing.assert_frame_equal(updated, expected, check_freq=False)
+
+    stored, meta = ohlcv_store.load("INFY.NS")
+    assert meta["covered_from"] == "max"
+    assert len(stored) == len(updated)
+
+
+def test_store_appends_feed_indicator_state(provider, monkeypatch):
+    cache = IndicatorStateCache()
+    monkeypatch.setattr(data_fetch, "indicator_cache", cache)
+    cache.seed("INFY", data_fetch.fetch_stock_data("INFY", period="max"))
+
+    provider.end_date = "2025-06-27"
+    monkeypatch.setattr(ohlcv_store, "REFRESH_SECONDS", 0)
+    updated = data_fetch.fetch_stock_data("INFY", period="max")
+
+    assert cache.get("INFY").last == SymbolIndicators.from_history(updated).last
+
+
+def test_fetch_many_redownloads_stored_coverage_after_corporate_action(provider, monkeypatch):
+    data_fetch.fetch_many(["INFY", "TCS"], period="max")
+
+    # A week later INFY pays a dividend, so its whole adjusted history changes
+    provider.end_date = "2025-06-27"
+    monkeypatch.setattr(ohlcv_store, "REFRESH_SECONDS", 0)
+    history = provider.history
+
+    def with_dividend(ticker: str, period: str = None, start: str = None) -> pd.DataFrame:
+        df = history(ticker, period=period, start=start)
+        if ticker == "INFY.NS" and start is not None:
+            df["Dividends"] = 0.0
+            df.iloc[-1, df.columns.get_loc("Dividends")] = 5.0
+        return df
+
+    monkeypatch.setattr(provider, "history", with_dividend)
+    provider.requests.clear()
+    data_fetch.fetch_many(["INFY", "TCS"], period="1y")
+
+    # One incremental batch for both, then INFY alone over its stored "max" coverage
+    assert provider.requests[-1] == {"period": "max", "start": None}
+    assert {"period": "1y", "start": None} not in provider.requests
+    stored, meta = ohlcv_store.load("INFY.NS")
+    assert meta["covered_from"] == "max"
+    pd.testing.assert_frame_equal(stored, with_dividend("INFY.NS", period="max")[data_fetch.REQUIRED_COLS],
+                                  check_freq=False)
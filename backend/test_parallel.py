@@ -0,0 +1,55 @@
+"""Process-pool map_shared against serial computation"""
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+from backend.ml import parallel
+from backend.ml.universe_backtest import backtest_universe
+
+
+def column_sums(arrays: dict, items: list, scale: float = 1.0) -> list:
+    return [float(arrays["matrix"][:, column].sum() * scale) for column in items]
+
+
+def exit_on_first_item(arrays: dict, items: list) -> list:
+    os._exit(1)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def pool():
+    yield
+    parallel.shutdown_pool()
+
+
+def test_map_shared_matches_serial():
+    matrix = np.random.default_rng(0).standard_normal((250, 37))
+    items = list(range(37))[::-1]
+    collected = []
+
+    results = parallel.map_shared(column_sums, {"matrix": matrix}, items, workers=2, scale=2.0,
+                                  on_chunk=lambda n, chunk: collected.append(n))
+
+    assert results == column_sums({"matrix": matrix}, items, scale=2.0)
+    assert sum(collected) == len(items)
+
+
+def test_map_shared_replaces_broken_pool():
+    arrays = {"matrix": np.ones((3, 2))}
+    with pytest.raises(BrokenProcessPool):
+        parallel.map_shared(exit_on_first_item, arrays, [0, 1], workers=2)
+
+    assert parallel.map_shared(column_sums, arrays, [0, 1], workers=2) == [3.0, 3.0]
+
+
+def test_universe_backtest_process_matches_serial():
+    config = {"max_stocks": 30, "period": "1y"}
+    serial = backtest_universe({**config, "compute_mode": "serial"})
+    progress = []
+    process = backtest_universe({**config, "compute_mode": "process"},
+                                progress=lambda done, total, trades: progress.append(done))
+
+    assert serial["total_trades"] > 0
+    assert process == serial
+    assert progress[-1] == 30
@@ -0,0 +1,43 @@
+"""Provider base class and replay fixtures"""
+import gc
+import weakref
+
+import pandas as pd
+import pytest
+
+from backend.ml.providers import EXCHANGE_TZ, MarketDataProvider, ReplayProvider
+
+
+def write_fixture(path, close: float):
+    dates = pd.bdate_range("2025-01-01", periods=5)
+    pd.DataFrame({"Date": dates, "Open": close, "High": close, "Low": close, "Close": close, "Volume": 1000}).to_csv(path, index=False)
+
+
+def test_provider_must_implement_history():
+    class NoHistory(MarketDataProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        MarketDataProvider()
+    with pytest.raises(TypeError):
+        NoHistory()
+
+
+def test_replay_caches_per_instance(tmp_path):
+    write_fixture(tmp_path / "INFY.csv", close=100.0)
+    provider = ReplayProvider(tmp_path)
+
+    df = provider.history("INFY.NS", period="max")
+    assert len(df) == 5 and df.index.tz is not None and str(df.index.tz) == EXCHANGE_TZ
+    assert provider.history("MISSING.NS").empty
+
+    # Fixtures are read once per instance; a new provider sees the changed file
+    write_fixture(tmp_path / "INFY.csv", close=200.0)
+    assert provider.history("INFY.NS", period="max")["Close"].iloc[-1] == 100.0
+    assert ReplayProvider(tmp_path).history("INFY.NS", period="max")["Close"].iloc[-1] == 200.0
+
+    # The cache does not keep the provider alive
+    ref = weakref.ref(provider)
+    del provider
+    gc.collect()
+    assert ref() is None
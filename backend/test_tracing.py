@@ -0,0 +1,30 @@
+"""Forced traces and /debug/* access control"""
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.ml import tracing
+
+client = TestClient(app)
+
+
+def test_debug_disabled_without_token(monkeypatch):
+    monkeypatch.setattr(tracing, "DEBUG_TOKEN", None)
+
+    response = client.get("/ping", headers={"X-Trace": "1", "X-Debug-Token": "anything"})
+    assert "x-trace-id" not in response.headers
+    assert client.get("/debug/traces").status_code == 403
+    assert client.get("/debug/traces/abc", headers={"X-Debug-Token": "anything"}).status_code == 403
+
+
+@pytest.mark.parametrize("token, status", [(None, 403), ("wrong", 403), ("secret", 200)])
+def test_debug_token_required(monkeypatch, token, status):
+    monkeypatch.setattr(tracing, "DEBUG_TOKEN", "secret")
+    headers = {"X-Debug-Token": token} if token else {}
+
+    response = client.get("/ping", headers={"X-Trace": "1", **headers})
+    assert ("x-trace-id" in response.headers) == (status == 200)
+    assert client.get("/debug/traces", headers=headers).status_code == status
+    if status == 200:
+        trace_id = response.headers["x-trace-id"]
+        assert client.get(f"/debug/traces/{trace_id}", headers=headers).json()["trace_id"] == trace_id
@@ -0,0 +1,34 @@
+"""Walk-forward fold layout and config validation"""
+import pytest
+
+from backend.ml.walk_forward import rolling_folds, walk_forward
+
+
+def test_rolling_folds():
+    assert rolling_folds(10, 4, 2) == [(0, 4, 4, 6), (2, 6, 6, 8), (4, 8, 8, 10)]
+    assert rolling_folds(10, 4, 2, step_bars=3) == [(0, 4, 4, 6), (3, 7, 7, 9)]
+    assert rolling_folds(10, 4, 2, expanding=True)[-1] == (0, 8, 8, 10)
+    assert rolling_folds(5, 4, 2) == []
+
+
+@pytest.mark.parametrize("train_bars, test_bars, step_bars", [(126, 0, None), (0, 42, None), (126, 42, 0), (126, 42, -5)])
+def test_rolling_folds_rejects_non_positive_sizes(train_bars, test_bars, step_bars):
+    with pytest.raises(ValueError):
+        rolling_folds(300, train_bars, test_bars, step_bars)
+
+
+@pytest.mark.parametrize("override", [
+    {"test_bars": 0}, {"train_bars": -1}, {"step_bars": 0}, {"step_bars": -3}, {"test_bars": 2.5}, {"train_bars": "126"},
+])
+def test_walk_forward_rejects_invalid_window_sizes(override):
+    with pytest.raises(ValueError):
+        walk_forward({"max_stocks": 2, **override})
+
+
+def test_walkforward_endpoint_returns_400():
+    from fastapi.testclient import TestClient
+    from backend.main import app
+
+    response = TestClient(app).post("/walkforward", json={"test_bars": 0})
+    assert response.status_code == 400
+    assert "test_bars" in response.json()["detail"]
@@ -19,6 +19,19 @@ export const api = {
     }
   },
 
+  // Get the whole stock view (data, prediction, chart, summary, backtest) in one call
+  getSnapshot: async (symbol, include) => {
+    try {
+      const response = await axios.get(`${API_URL}/snapshot/${symbol}`, {
+        params: include ? { include: include.join(',') } : undefined
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching snapshot:', error);
+      throw error;
+    }
+  },
+
   // Get ML prediction
   getPrediction: async (symbol) => {
     try {
@@ -164,6 +177,76 @@ export const api = {
     }
   },
 
+  // Stream the NSE 500 screen: onEvent gets start / result / summary events as they arrive
+  streamScreenUniverse: async (config, onEvent) => {
+    const params = new URLSearchParams();
+    Object.entries(config).forEach(([key, value]) => {
+      if (value !== undefined && value !== null) params.append(key, value);
+    });
+
+    const response = await fetch(`${API_URL}/screen/universe/stream?${params}`);
+    if (!response.ok) {
+      throw new Error(`Screen stream failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line)));
+    }
+    if (buffer.trim()) onEvent(JSON.parse(buffer));
+  },
+
+  // Queue a universe backtest job; returns the job (id, status, progress)
+  submitUniverseBacktestJob: async (config) => {
+    try {
+      const response = await axios.post(`${API_URL}/jobs/backtest/universe`, config);
+      return response.data;
+    } catch (error) {
+      console.error('Error submitting universe backtest job:', error);
+      throw error;
+    }
+  },
+
+  // Job status and progress
+  getJob: async (jobId) => {
+    try {
+      const response = await axios.get(`${API_URL}/jobs/${jobId}`);
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching job:', error);
+      throw error;
+    }
+  },
+
+  // Result of a completed job
+  getJobResult: async (jobId) => {
+    try {
+      const response = await axios.get(`${API_URL}/jobs/${jobId}/result`);
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching job result:', error);
+      throw error;
+    }
+  },
+
+  // Cancel a queued or running job
+  cancelJob: async (jobId) => {
+    try {
+      const response = await axios.post(`${API_URL}/jobs/${jobId}/cancel`);
+      return response.data;
+    } catch (error) {
+      console.error('Error cancelling job:', error);
+      throw error;
+    }
+  },
+
   // Run NSE 500 universe backtest
   runUniverseBacktest: async (config) => {
     try {
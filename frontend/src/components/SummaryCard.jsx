@@ -2,14 +2,20 @@ import React, { useState, useEffect } from 'react';
 import { FileText, RefreshCw, Sparkles } from 'lucide-react';
 import api from '../api/api';
 
-const SummaryCard = ({ symbol }) => {
+const SummaryCard = ({ symbol, initialSummary }) => {
   const [summary, setSummary] = useState(null);
   const [loading, setLoading] = useState(true);
   const [refreshing, setRefreshing] = useState(false);
 
   useEffect(() => {
-    loadSummary();
-  }, [symbol]);
+    // The dashboard snapshot already carries the summary; only fetch when it doesn't
+    if (initialSummary) {
+      setSummary(initialSummary);
+      setLoading(false);
+    } else {
+      loadSummary();
+    }
+  }, [symbol, initialSummary]);
 
   const loadSummary = async () => {
     try {
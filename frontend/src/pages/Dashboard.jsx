@@ -20,6 +20,7 @@ const Dashboard = () => {
   const [chartData, setChartData] = useState([]);
   const [refreshing, setRefreshing] = useState(false);
   const [stats, setStats] = useState(null);
+  const [summary, setSummary] = useState(null);
 
   useEffect(() => {
     loadAllData();
@@ -30,17 +31,15 @@ const Dashboard = () => {
     setError(null);
 
     try {
-      const [data, pred, back, chart] = await Promise.all([
-        api.getStockData(selectedStock),
-        api.getPrediction(selectedStock),
-        api.getBacktest(selectedStock),
-        api.getChartData(selectedStock)
-      ]);
+      // One round trip: the backend fetches and computes features once for every section
+      const snapshot = await api.getSnapshot(selectedStock);
+      const back = snapshot.backtest;
 
-      setStockData(data);
-      setPrediction(pred);
+      setStockData(snapshot.data);
+      setPrediction(snapshot.prediction);
       setBacktest(back);
-      setChartData(chart);
+      setChartData(snapshot.chart || []);
+      setSummary(snapshot.summary);
       
       // Calculate quick stats
       if (back && back.summary) {
@@ -198,7 +197,7 @@ const Dashboard = () => {
 
         {/* AI Summary Card */}
         <div className="mb-6 animate-fade-in" style={{ animationDelay: '0.5s' }}>
-          <SummaryCard symbol={selectedStock} />
+          <SummaryCard symbol={selectedStock} initialSummary={summary && summary.summary} />
         </div>
 
         {/* Top Movers Screener */}
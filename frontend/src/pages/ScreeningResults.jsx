@@ -8,6 +8,7 @@ const ScreeningResults = ({ onSelectStock }) => {
   const [filter, setFilter] = useState('all');
   const [searchTerm, setSearchTerm] = useState('');
   const [maxStocks, setMaxStocks] = useState(500); // Changed from 50 to 500
+  const [progress, setProgress] = useState(null);
 
   useEffect(() => {
     runScreening();
@@ -20,16 +21,32 @@ const ScreeningResults = ({ onSelectStock }) => {
         max_stocks: maxStocks, // This will now be 500
         criteria: 'ema_crossover'
       };
-      const data = await api.screenUniverse(config);
-      setResults(data);
+      // Results fill in as the backend classifies each chunk of the universe
+      await api.streamScreenUniverse(config, (event) => {
+        if (event.event === 'start') {
+          setResults({ bullish: [], bearish: [], neutral: [], counts: { bullish: 0, bearish: 0, neutral: 0 } });
+          setProgress({ done: 0, total: event.total });
+        } else if (event.event === 'result') {
+          setResults((prev) => ({
+            ...prev,
+            [event.bucket]: [...prev[event.bucket], event.item],
+            counts: event.counts
+          }));
+          setProgress({ done: event.done, total: event.total });
+        } else if (event.event === 'summary') {
+          setResults((prev) => ({ ...prev, counts: event.counts, timestamp: event.timestamp }));
+          setProgress(null);
+        }
+      });
     } catch (error) {
       console.error('Error screening universe:', error);
     } finally {
       setLoading(false);
+      setProgress(null);
     }
   };
 
-  if (loading) {
+  if (loading && !results) {
     return (
       <div className="min-h-screen bg-gradient-to-br from-gray-900 via-gray-800 to-gray-900 text-white flex items-center justify-center">
         <div className="text-center">
@@ -83,7 +100,7 @@ const ScreeningResults = ({ onSelectStock }) => {
               disabled={loading}
               className="px-6 py-3 bg-gradient-to-r from-blue-600 to-purple-600 hover:from-blue-700 hover:to-purple-700 rounded-xl font-semibold transition-all disabled:opacity-50 shadow-lg"
             >
-              {loading ? 'Scanning...' : 'Refresh Scan'}
+              {loading ? (progress ? `Scanning... ${progress.done}/${progress.total}` : 'Scanning...') : 'Refresh Scan'}
             </button>
           </div>
         </div>
@@ -1,5 +1,8 @@
-import React, { useState } from 'react';
-import { BarChart3, TrendingUp, Award, DollarSign, Play, Settings, Loader2, AlertCircle, TrendingDown, Target } from 'lucide-react';
+import React, { useState, useEffect, useRef } from 'react';
+import { BarChart3, TrendingUp, Award, DollarSign, Play, Settings, Loader2, AlertCircle, TrendingDown, Target, XCircle } from 'lucide-react';
+import api from '../api/api';
+
+const POLL_INTERVAL_MS = 1000;
 
 const UniverseBacktestDashboard = () => {
   const [running, setRunning] = useState(false);
@@ -10,40 +13,82 @@ const UniverseBacktestDashboard = () => {
     initial_capital: 100000,
     position_size: 0.1,
     stop_loss: 0.05,
-    take_profit: 0.15
+    take_profit: 0.15,
+    max_positions: 10
   });
 
+  const [job, setJob] = useState(null);
+  const pollRef = useRef(null);
+
+  const stopPolling = () => {
+    if (pollRef.current) {
+      clearTimeout(pollRef.current);
+      pollRef.current = null;
+    }
+  };
+
+  useEffect(() => stopPolling, []);
+
+  // The backtest runs as a background job; poll its progress until it finishes
+  const pollJob = async (jobId) => {
+    try {
+      const current = await api.getJob(jobId);
+      setJob(current);
+
+      if (current.status === 'queued' || current.status === 'running') {
+        pollRef.current = setTimeout(() => pollJob(jobId), POLL_INTERVAL_MS);
+        return;
+      }
+
+      if (current.status === 'completed') {
+        const data = await api.getJobResult(jobId);
+        if (data.status === 'error') {
+          setError(data.message);
+        } else {
+          setResults(data);
+        }
+      } else if (current.status === 'cancelled') {
+        setError('Backtest cancelled.');
+      } else {
+        setError(current.error || 'Backtest failed.');
+      }
+      setRunning(false);
+    } catch (err) {
+      setError('Failed to run universe backtest. Please check if backend is running.');
+      console.error('Backtest error:', err);
+      setRunning(false);
+    }
+  };
+
   const runBacktest = async () => {
+    stopPolling();
     setRunning(true);
     setError(null);
     setResults(null);
+    setJob(null);
     
     try {
-      const response = await fetch('http://127.0.0.1:8000/backtest/universe', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(config)
-      });
-      
-      if (!response.ok) {
-        throw new Error('Backtest failed');
-      }
-      
-      const data = await response.json();
-      
-      if (data.status === 'error') {
-        setError(data.message);
-      } else {
-        setResults(data);
-      }
+      const submitted = await api.submitUniverseBacktestJob(config);
+      setJob(submitted);
+      pollJob(submitted.id);
     } catch (err) {
       setError('Failed to run universe backtest. Please check if backend is running.');
       console.error('Backtest error:', err);
-    } finally {
       setRunning(false);
     }
   };
 
+  const cancelBacktest = async () => {
+    if (!job) return;
+    try {
+      setJob(await api.cancelJob(job.id));
+    } catch (err) {
+      console.error('Cancel error:', err);
+    }
+  };
+
+  const progress = job && job.progress;
+
   return (
     <div className="min-h-screen bg-gradient-to-br from-gray-900 via-gray-800 to-gray-900 text-white p-6">
       <div className="max-w-7xl mx-auto">
@@ -125,6 +170,19 @@ const UniverseBacktestDashboard = () => {
                 step="1"
               />
             </div>
+
+            <div>
+              <label className="block text-sm text-gray-400 mb-2">Max Open Positions</label>
+              <input
+                type="number"
+                value={config.max_positions}
+                onChange={(e) => setConfig({...config, max_positions: parseInt(e.target.value)})}
+                className="w-full px-4 py-2 bg-gray-700 border border-gray-600 rounded-lg text-white focus:outline-none focus:border-blue-500"
+                min="1"
+                max="100"
+                step="1"
+              />
+            </div>
           </div>
 
           <button
@@ -135,7 +193,9 @@ const UniverseBacktestDashboard = () => {
             {running ? (
               <>
                 <Loader2 className="w-5 h-5 animate-spin" />
-                Running Backtest...
+                {progress && progress.symbols_total
+                  ? `Running Backtest... ${progress.symbols_done}/${progress.symbols_total} stocks, ${progress.trades} trades`
+                  : 'Running Backtest...'}
               </>
             ) : (
               <>
@@ -144,6 +204,17 @@ const UniverseBacktestDashboard = () => {
               </>
             )}
           </button>
+
+          {running && job && (
+            <button
+              onClick={cancelBacktest}
+              disabled={job.cancel_requested}
+              className="w-full md:w-auto mt-3 px-6 py-3 bg-gray-700 hover:bg-gray-600 rounded-xl font-semibold inline-flex items-center justify-center gap-2 transition-all disabled:opacity-50 disabled:cursor-not-allowed"
+            >
+              <XCircle className="w-5 h-5" />
+              {job.cancel_requested ? 'Cancelling...' : 'Cancel'}
+            </button>
+          )}
         </div>
 
         {/* Error Message */}
@@ -218,6 +289,24 @@ const UniverseBacktestDashboard = () => {
                     <span className="text-gray-400">Average Loss</span>
                     <span className="text-red-400 font-semibold">{results.avg_loss}%</span>
                   </div>
+                  {results.max_drawdown !== undefined && (
+                    <div className="flex justify-between items-center">
+                      <span className="text-gray-400">Max Drawdown</span>
+                      <span className="text-red-400 font-semibold">{results.max_drawdown}%</span>
+                    </div>
+                  )}
+                  {results.sharpe !== undefined && (
+                    <div className="flex justify-between items-center">
+                      <span className="text-gray-400">Sharpe Ratio</span>
+                      <span className="text-blue-400 font-semibold">{results.sharpe}</span>
+                    </div>
+                  )}
+                  {results.skipped_signals !== undefined && (
+                    <div className="flex justify-between items-center">
+                      <span className="text-gray-400">Signals Skipped (cash / position limit)</span>
+                      <span className="text-gray-300 font-semibold">{results.skipped_signals} of {results.signals}</span>
+                    </div>
+                  )}
                   {results.best_trade && (
                     <div className="flex justify-between items-center">
                       <span className="text-gray-400">Best Trade</span>